@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the memory used by regular (``__dict__`` based) instance and compact
+(``__slots__`` based) instance of a constant tree.
+
+Usage::
+
+    python benchmarks/bench_compact_memory.py
+"""
+
+from __future__ import print_function
+import gc
+import tracemalloc
+from constant2 import Constant
+
+
+def make_tree(n_node, fanout=100):
+    """Create a two level constant tree having about ``n_node`` nested class.
+    """
+    groups = dict()
+    for i in range(max(n_node // fanout, 1)):
+        leaves = dict()
+        for j in range(fanout):
+            leaves["Leaf%s" % j] = type(str("Leaf%s" % j), (Constant,), {
+                "id": j, "name": "leaf-%s-%s" % (i, j), "weight": j * 0.5,
+            })
+        leaves["id"] = i
+        groups["Group%s" % i] = type(str("Group%s" % i), (Constant,), leaves)
+    return type(str("Root"), (Constant,), groups)
+
+
+def measure(klass, **kwargs):
+    """Return the bytes allocated by creating an instance of ``klass``.
+    """
+    klass(**kwargs)  # warm up, generated instance class is created once
+    gc.collect()
+    tracemalloc.start()
+    instance = klass(**kwargs)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del instance
+    return size
+
+
+def main():
+    print("%10s %16s %16s %8s" % ("nodes", "dict (bytes)", "slots (bytes)", "ratio"))
+    for n_node in (10 ** 3, 10 ** 4, 10 ** 5):
+        Root = make_tree(n_node)
+        dict_size = measure(Root)
+        slots_size = measure(Root, compact=True)
+        print("%10s %16s %16s %8.2f" % (
+            n_node, dict_size, slots_size, float(dict_size) / slots_size))
+
+
+if __name__ == "__main__":
+    main()
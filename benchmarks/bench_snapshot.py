@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the time of restoring a constant tree from a snapshot with the ways
+of creating it again:
+
+- ``define``: define the classes in Python.
+- ``load``: ``Constant.load`` the tree from JSON text.
+- ``define+index``: define the classes and build the manifest and the value
+  index of every class by ``Freeze``, the snapshot of a frozen tree stores
+  them, so ``restore`` has them ready.
+
+Usage::
+
+    python benchmarks/bench_snapshot.py
+"""
+
+from __future__ import print_function
+import os
+import json
+import time
+import tempfile
+from constant2 import Constant
+
+
+def make_tree(n_node, fanout=100):
+    """Create a two level constant tree having about ``n_node`` nested class.
+    """
+    groups = dict()
+    for i in range(max(n_node // fanout, 1)):
+        leaves = dict()
+        for j in range(fanout):
+            leaves["Leaf%s" % j] = type(str("Leaf%s" % j), (Constant,), {
+                "id": j, "name": "leaf-%s-%s" % (i, j), "weight": j * 0.5,
+            })
+        leaves["id"] = i
+        groups["Group%s" % i] = type(str("Group%s" % i), (Constant,), leaves)
+    return type(str("Root"), (Constant,), groups)
+
+
+def best_of(n, func):
+    """Return the min time of running ``func`` ``n`` times, and the result.
+    """
+    best = None
+    for _ in range(n):
+        start = time.time()
+        result = func()
+        elapsed = time.time() - start
+        if (best is None) or (elapsed < best):
+            best = elapsed
+    return best, result
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "tree.snapshot")
+    print("%8s %10s %10s %16s %12s" % (
+        "nodes", "define (s)", "load (s)", "define+index (s)", "restore (s)"))
+    for n_node in (10 ** 3, 10 ** 4, 5 * 10 ** 4):
+        define_time, tree = best_of(3, lambda: make_tree(n_node))
+        text = json.dumps(tree.dump())
+        load_time, _ = best_of(3, lambda: Constant.load(json.loads(text)))
+        index_time, tree = best_of(3, lambda: make_tree(n_node).Freeze())
+        tree.Snapshot(path)
+        restore_time, _ = best_of(3, lambda: Constant.Restore(path))
+        print("%8s %10.4f %10.4f %16.4f %12.4f" % (
+            n_node, define_time, load_time, index_time, restore_time))
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
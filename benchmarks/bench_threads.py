@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Stress ``GetFirst`` and ``GetAll`` from 32 threads while another thread keeps
+modifying the tree, and check every result and the creation index of
+instance created concurrently.
+
+Usage::
+
+    python benchmarks/bench_threads.py
+"""
+
+from __future__ import print_function
+import time
+import random
+import threading
+from constant2 import Constant
+
+N_THREAD = 32
+N_ENTITY = 1000
+N_LOOKUP = 2000
+
+
+def make_tree():
+    attrs = dict()
+    for i in range(N_ENTITY):
+        name = str("E%s" % i)
+        attrs[name] = type(name, (Constant,), {
+            "id": i, "group": i % 10, "name": "entity-%s" % i,
+        })
+    return type(str("Entity"), (Constant,), attrs)
+
+
+def reader(Entity, errors, seed):
+    rnd = random.Random(seed)
+    for _ in range(N_LOOKUP):
+        i = rnd.randrange(N_ENTITY)
+        klass = Entity.GetFirst("id", i)
+        if (klass is None) or (klass.id != i):
+            errors.append(("GetFirst", i, klass))
+        group = Entity.GetAll("group", i % 10)
+        if len(group) != N_ENTITY // 10:
+            errors.append(("GetAll", i % 10, len(group)))
+
+
+def writer(Entity, stop):
+    rnd = random.Random(0)
+    while not stop.is_set():
+        klass = getattr(Entity, "E%s" % rnd.randrange(N_ENTITY))
+        klass.name = "entity-%s" % rnd.random()
+        time.sleep(0.001)
+
+
+def creator(Klass, indexes):
+    for _ in range(N_LOOKUP):
+        indexes.append(Klass().__creation_index__)
+
+
+def run(n_thread, target, args_list):
+    threads = [
+        threading.Thread(target=target, args=args)
+        for args in args_list[:n_thread]
+    ]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.time() - start
+
+
+def main():
+    Entity = make_tree()
+    errors = list()
+    elapsed = run(1, reader, [(Entity, errors, 0)])
+    print("1 thread: %.0f lookup/s" % (2 * N_LOOKUP / elapsed))
+
+    stop = threading.Event()
+    writer_thread = threading.Thread(target=writer, args=(Entity, stop))
+    writer_thread.start()
+    elapsed = run(N_THREAD, reader, [
+        (Entity, errors, seed) for seed in range(N_THREAD)])
+    stop.set()
+    writer_thread.join()
+    print("%s thread with a writer: %.0f lookup/s, %s wrong result" % (
+        N_THREAD, 2 * N_LOOKUP * N_THREAD / elapsed, len(errors)))
+
+    indexes = list()
+    run(N_THREAD, creator, [(Entity.E0, indexes)] * N_THREAD)
+    print("%s instance created by %s thread, %s duplicate creation index" % (
+        len(indexes), N_THREAD, len(indexes) - len(set(indexes))))
+
+
+if __name__ == "__main__":
+    main()
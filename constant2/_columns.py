@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Columnar view of nested Constant class attributes and vectorized filtering,
+see :meth:`constant2._constant2._Constant.ToColumns`.
+
+A column is a ``numpy.ndarray`` if NumPy is installed, otherwise an
+``array.array`` for number column and a tuple for others.
+"""
+
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+try:
+    from .pkg.sixmini import integer_types
+    from ._query import Condition, operators
+except:  # pragma: no cover
+    from constant2.pkg.sixmini import integer_types
+    from constant2._query import Condition, operators
+
+_missing = object()
+
+_INT64_MIN, _INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+try:
+    array("q")
+    _int_typecode = "q"
+except ValueError:  # pragma: no cover, python2
+    _int_typecode = "l"
+
+
+def _is_int(value):
+    return isinstance(value, integer_types) and not isinstance(value, bool)
+
+
+def _is_float(value):
+    return isinstance(value, float)
+
+
+# int beyond it can't be converted to float exactly
+_FLOAT_EXACT_MAX = 2 ** 53
+
+
+def _column_kind(values):
+    """Column keeps the exact python value, so it gives the same result as
+    comparing the attribute of each class.
+
+    :returns: "int", "float", "bool" or "object".
+    """
+    present = [v for v in values if v is not _missing]
+    if not present:
+        return "object"
+    if all(_is_int(v) for v in present):
+        if not all(_INT64_MIN <= v <= _INT64_MAX for v in present):
+            return "object"
+        return "int"
+    if all(_is_int(v) or _is_float(v) for v in present):
+        if not all(-_FLOAT_EXACT_MAX <= v <= _FLOAT_EXACT_MAX
+                   for v in present if _is_int(v)):
+            return "object"
+        return "float"
+    if all(isinstance(v, bool) for v in present) and \
+            len(present) == len(values):
+        return "bool"
+    return "object"
+
+
+def _make_column(values, kind):
+    """Missing value is NaN in float column, 0 in int column, None in object
+    column, use :meth:`Columns.present` to tell.
+    """
+    if kind == "int":
+        values = [0 if v is _missing else v for v in values]
+    elif kind == "float":
+        values = [float("nan") if v is _missing else v for v in values]
+    elif kind == "object":
+        values = [None if v is _missing else v for v in values]
+
+    if np is not None:
+        if kind == "int":
+            return np.array(values, dtype=np.int64)
+        if kind == "float":
+            return np.array(values, dtype=np.float64)
+        if kind == "bool":
+            return np.array(values, dtype=np.bool_)
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+
+    if kind == "int":
+        return array(_int_typecode, values)
+    if kind == "float":
+        return array("d", values)
+    return tuple(values)
+
+
+class Columns(object):
+    """Columnar view of the attributes of nested class, row ``i`` of every
+    column is ``klasses[i]``. Column is built on first access.
+
+    :param klasses: nested class, in row order.
+    :param attrs: sorted name of all non-class attributes of the nested
+        class, inherited attribute included.
+
+    .. versionadded:: 0.0.14
+    """
+    __slots__ = ("klasses", "attrs", "_columns", "_present")
+
+    def __init__(self, klasses, attrs):
+        self.klasses = tuple(klasses)
+        self.attrs = tuple(attrs)
+        self._columns = dict()
+        self._present = dict()
+
+    def __len__(self):
+        return len(self.klasses)
+
+    def __iter__(self):
+        return iter(self.attrs)
+
+    def __contains__(self, attr):
+        return attr in self.attrs
+
+    def __repr__(self):
+        return "Columns(rows=%d, attrs=%r)" % (len(self.klasses), self.attrs)
+
+    def _build(self, attr):
+        if attr not in self.attrs:
+            raise KeyError(attr)
+        values = [getattr(klass, attr, _missing) for klass in self.klasses]
+        self._columns[attr] = _make_column(values, _column_kind(values))
+        self._present[attr] = _as_mask([v is not _missing for v in values])
+
+    def __getitem__(self, attr):
+        """Column of an attribute.
+        """
+        try:
+            return self._columns[attr]
+        except KeyError:
+            self._build(attr)
+            return self._columns[attr]
+
+    def present(self, attr):
+        """Boolean mask of rows having the attribute.
+        """
+        try:
+            return self._present[attr]
+        except KeyError:
+            self._build(attr)
+            return self._present[attr]
+
+    def select(self, mask):
+        """Map a boolean mask back to nested class.
+        """
+        if (np is not None) and isinstance(mask, np.ndarray):
+            return [self.klasses[i] for i in np.flatnonzero(mask)]
+        return [klass for klass, ok in zip(self.klasses, mask) if ok]
+
+
+def _as_mask(flags):
+    if np is not None:
+        return np.array(flags, dtype=np.bool_)
+    return flags
+
+
+def _is_number_operand(value):
+    return _is_int(value) or _is_float(value)
+
+
+def _vectorized_mask(column, op, operand):
+    """Evaluate a condition by NumPy, return None if it can't be vectorized.
+    """
+    if (np is None) or (column.dtype.kind not in "iuf"):
+        return None
+    if op in ("eq", "ne"):
+        if not _is_number_operand(operand):
+            return None
+        if _is_float(operand) and not math.isinf(operand):
+            # same as constant2._index.is_close, infinity only equals itself
+            tolerance = max(0.000001 * abs(operand), 1e-12)
+            with np.errstate(invalid="ignore"):
+                mask = (column == operand) | \
+                    (np.abs(column - operand) <= tolerance)
+        else:
+            mask = column == operand
+        return mask if op == "eq" else ~mask
+    if op in ("gt", "gte", "lt", "lte"):
+        if not _is_number_operand(operand):
+            return None
+        with np.errstate(invalid="ignore"):
+            return {
+                "gt": np.greater, "gte": np.greater_equal,
+                "lt": np.less, "lte": np.less_equal,
+            }[op](column, operand)
+    if op == "between":
+        lo, hi = operand
+        if not (_is_number_operand(lo) and _is_number_operand(hi)):
+            return None
+        with np.errstate(invalid="ignore"):
+            return (column >= lo) & (column <= hi)
+    if op == "in":
+        if not all(_is_number_operand(v) for v in operand):
+            return None
+        return np.isin(column, list(operand))
+    return None
+
+
+def _loop_mask(column, op, operand):
+    func = operators[op]
+    flags = list()
+    for value in column:
+        try:
+            flags.append(bool(func(value, operand)))
+        except Exception:
+            flags.append(False)
+    return _as_mask(flags)
+
+
+def condition_mask(columns, condition):
+    """Boolean mask of rows meet a :class:`~constant2._query.Condition`,
+    row doesn't have the attribute never matches.
+    """
+    if condition.attr not in columns:
+        return _as_mask([False] * len(columns))
+    column = columns[condition.attr]
+    present = columns.present(condition.attr)
+    mask = _vectorized_mask(column, condition.op, condition.operand)
+    if mask is None:
+        mask = _loop_mask(column, condition.op, condition.operand)
+    return _and(mask, present)
+
+
+def _and(mask1, mask2):
+    if np is not None:
+        return np.logical_and(mask1, mask2)
+    return [bool(a and b) for a, b in zip(mask1, mask2)]
+
+
+def _call_expr(expr, columns):
+    """Call ``expr``, without NumPy, a ``TypeError``, for example comparing
+    an ``array.array`` to a number, is raised with a hint.
+    """
+    try:
+        result = expr(columns)
+        len(result)
+        return result
+    except TypeError as e:
+        if np is not None:
+            raise
+        raise TypeError(
+            "%s. NumPy is not installed, column is an array.array or a "
+            "tuple and doesn't support element wise operator, expr has to "
+            "return a list of flags, for example "
+            "[price > 2 for price in columns['price']]" % e)
+
+
+def filter_columns(columns, expr=None, conditions=None):
+    """Nested class meet all conditions and the ``expr`` mask.
+
+    :param expr: function takes the :class:`Columns`, returns a boolean mask.
+        Without NumPy, it has to build the mask from plain column, see
+        :func:`_call_expr`.
+    :param conditions: dict of ``attr__op: operand``, see
+        :class:`~constant2._query.Condition`.
+    """
+    mask = _as_mask([True] * len(columns))
+    for key, operand in (conditions or {}).items():
+        mask = _and(mask, condition_mask(columns, Condition(key, operand)))
+    if expr is not None:
+        result = _call_expr(expr, columns)
+        if len(result) != len(columns):
+            raise ValueError(
+                "expr returns %d flags for %d rows" % (
+                    len(result), len(columns)))
+        mask = _and(mask, result)
+    return columns.select(mask)
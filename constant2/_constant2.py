@@ -3,26 +3,90 @@
 
 from __future__ import print_function, unicode_literals
 import inspect
-from copy import deepcopy
+import gc
+import heapq
+from bisect import bisect_left
+from collections import deque
+from itertools import count, islice
 from pprint import pprint
 from collections import OrderedDict
 
 try:
-    from .pkg.pylru import lrudecorator
+    from types import MappingProxyType
+except ImportError:  # pragma: no cover, python2
+    from collections import Mapping
+
+    class MappingProxyType(Mapping):
+        """Read only view of a mapping, the same as
+        ``types.MappingProxyType`` of python3.
+        """
+        __slots__ = ("_mapping",)
+
+        def __init__(self, mapping):
+            self._mapping = mapping
+
+        def __getitem__(self, key):
+            return self._mapping[key]
+
+        def __iter__(self):
+            return iter(self._mapping)
+
+        def __len__(self):
+            return len(self._mapping)
+
+        def __contains__(self, key):
+            return key in self._mapping
+
+        def copy(self):
+            return self._mapping.copy()
+
+        def __repr__(self):
+            return "mappingproxy(%r)" % (self._mapping,)
+
+try:
     from .pkg.sixmini import integer_types, string_types, add_metaclass
     from .pkg.inspect_mate import (
         is_class_method, is_regular_method, get_all_attributes,
     )
-    from .pkg.pytest import approx
     from .pkg.superjson import json
+    from ._index import (
+        HashIndex, is_number, is_equal, get_index, get_cache,
+        next_generation, get_generation, cache_info, stripe_lock,
+        add_parent, iter_parents,
+    )
+    from ._query import Condition, Query
+    from ._relationship import Relationship, register, on_change
+    from . import _join
+    from ._snapshot import source_key, snapshot, restore
+    from . import _serialize
+    from . import _fingerprint
+    from . import _diff
+    from ._columns import Columns, filter_columns
+    from . import _records
+    from . import _group
+    from ._copy import make_plan, CowProxy
 except:  # pragma: no cover
-    from constant2.pkg.pylru import lrudecorator
     from constant2.pkg.sixmini import integer_types, string_types, add_metaclass
     from constant2.pkg.inspect_mate import (
         is_class_method, is_regular_method, get_all_attributes,
     )
-    from constant2.pkg.pytest import approx
     from constant2.pkg.superjson import json
+    from constant2._index import (
+        HashIndex, is_number, is_equal, get_index, get_cache,
+        next_generation, get_generation, cache_info, stripe_lock,
+        add_parent, iter_parents,
+    )
+    from constant2._query import Condition, Query
+    from constant2._relationship import Relationship, register, on_change
+    from constant2 import _join
+    from constant2._snapshot import source_key, snapshot, restore
+    from constant2 import _serialize
+    from constant2 import _fingerprint
+    from constant2 import _diff
+    from constant2._columns import Columns, filter_columns
+    from constant2 import _records
+    from constant2 import _group
+    from constant2._copy import make_plan, CowProxy
 
 try:
     del json._dumpers["collections.OrderedDict"]
@@ -30,34 +94,640 @@ except KeyError:  # pragma: no cover
     pass
 
 
+def _is_builtin_name(attr):
+    return attr.startswith("__") or attr.endswith("__")
+
+
+class _Manifest(object):
+    """Reflection result of a :class:`Constant` class.
+
+    It is built on first read, and rebuilt only after the class, or one of
+    its base class, is modified through :meth:`Meta.__setattr__` or
+    :meth:`Meta.__delattr__`. Class with a single Constant base class derives
+    it from the manifest of the base class without reflection.
+
+    :param names: sorted name of all attributes that is not a nested
+        Constant class.
+    :param items: sorted (attr, value) pairs of all non-class attributes.
+    :param subclasses: (attr, klass) pairs of all nested Constant class,
+        ordered by attribute name.
+
+    .. versionadded:: 0.0.14
+    """
+    __slots__ = ("names", "items", "subclasses")
+
+    def __init__(self, names, items, subclasses):
+        self.names = names
+        self.items = items
+        self.subclasses = subclasses
+
+
+def _build_manifest(klass):
+    names, items, subclasses = list(), list(), list()
+    # get_all_attributes returns attributes ordered by name
+    for attr, value in get_all_attributes(klass):
+        if inspect.isclass(value):
+            if issubclass(value, Constant):
+                subclasses.append((attr, value))
+                add_parent(value, klass)
+                continue
+        else:
+            items.append((attr, value))
+        names.append(attr)
+    return _Manifest(tuple(names), tuple(items), tuple(subclasses))
+
+
+_scalar_types = frozenset(
+    (type(None), bool, float, bytes) + integer_types + string_types)
+
+
+def _derive_manifest(klass, base_manifest, attrs):
+    """Manifest of a class derived from a single base class, built from the
+    manifest of the base class and it's own attributes without reflection.
+    Works the same way as :func:`_build_manifest`.
+    """
+    others = set(base_manifest.names)
+    items = dict(base_manifest.items)
+    subclasses = dict(base_manifest.subclasses)
+    others.difference_update(items)
+    others.difference_update(subclasses)
+    for attr, value in attrs.items():
+        if _is_builtin_name(attr):
+            continue
+        if others:
+            others.discard(attr)
+        if subclasses:
+            subclasses.pop(attr, None)
+        if type(value) in _scalar_types:  # fast path, most value is scalar
+            items[attr] = value
+            continue
+        items.pop(attr, None)
+        if isinstance(value, type):
+            if issubclass(value, Constant):
+                subclasses[attr] = value
+            else:
+                others.add(attr)
+            continue
+        if hasattr(type(value), "__get__"):
+            # same as reflection, descriptor is read through the class
+            value = getattr(klass, attr)
+            if inspect.isroutine(value):
+                continue
+        elif inspect.isbuiltin(value):
+            continue
+        items[attr] = value
+    names = others.union(items) if others else items
+    # attribute name is unique, value is never compared
+    manifest = _Manifest(
+        tuple(sorted(names)),
+        tuple(sorted(items.items())),
+        tuple(sorted(subclasses.items())),
+    )
+    for _, subclass in manifest.subclasses:
+        add_parent(subclass, klass)
+    return manifest
+
+
+def _get_manifest(klass, materialize=True):
+    """Get the cached :class:`_Manifest` of a Constant class, rebuild it if it
+    has been invalidated.
+
+    :param materialize: if False, nested class of a lazy loaded class is not
+        created, ``subclasses`` of the manifest could be incomplete.
+    """
+    # instance class generated for a Constant class shares it's manifest
+    klass = klass.__dict__.get("__constant__", klass)
+    if materialize and klass.__dict__.get("__raw_children__"):
+        for attr in list(klass.__raw_children__):
+            _materialize(klass, attr)
+    manifest = klass.__dict__.get("__manifest__")
+    if manifest is None:
+        bases = klass.__bases__
+        # reflection is only used for multiple inheritance, where the
+        # attribute lookup order is not that simple.
+        if (len(bases) == 1) and isinstance(bases[0], Meta):
+            manifest = _derive_manifest(
+                klass, _get_manifest(bases[0]), klass.__dict__)
+        else:
+            manifest = _build_manifest(klass)
+        type.__setattr__(klass, "__manifest__", manifest)
+    return manifest
+
+
+def _materialize(klass, attr):
+    """Create the nested class of a lazy loaded class from it's raw data.
+    Thread safe, it is created only once.
+    """
+    with stripe_lock(klass):
+        raw_children = klass.__dict__["__raw_children__"]
+        if attr not in raw_children:  # created by another thread
+            return klass.__dict__[attr]
+        name, data = raw_children[attr]
+        subclass = _serialize.load_shallow(name, data, Constant)
+        type.__setattr__(klass, attr, subclass)
+        add_parent(subclass, klass)
+        # removed after the class is set, so a reader without the lock
+        # always finds it in one of them, see Meta.__getattr__
+        del raw_children[attr]
+        type.__setattr__(klass, "__manifest__", None)
+        return subclass
+
+
+def _is_frozen(klass):
+    return klass.__dict__.get("__frozen__", False)
+
+
+def _find(klass, attr, value, e, sort_by):
+    """Find all nested class that ``subclass.attr == value``, float value is
+    compared with tolerance.
+
+    The index is cached, the result is not, lookup by value is already O(1)
+    and caching every queried value would grow without limit.
+    """
+    if isinstance(value, float) and is_number(value):
+        return get_index(klass, "sorted", attr, sort_by).find(value, e)
+    return get_index(klass, "hash", attr, sort_by).find(value)
+
+
+def _sort_key(sort_by):
+    return lambda pair: getattr(pair[1], sort_by)
+
+
+def _sorted_subclasses(klass, sort_by, reverse):
+    """Nested class sorted by ``sort_by`` as a tuple of (attr, value) pairs.
+    The sorted view is stored in the per class cache, so it is rebuilt only
+    after the tree is changed.
+    """
+    subclasses = _get_manifest(klass).subclasses
+    cache = get_cache(klass)
+    key = ("subclasses", sort_by, reverse)
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+
+    view = tuple(sorted(subclasses, key=_sort_key(sort_by), reverse=reverse))
+    cache[key] = view
+    return view
+
+
+def _walk_dfs(klass):
+    # stack of (path prefix, iterator of nested class), a class already on
+    # the current path is skipped to break reference cycle.
+    stack = [("", iter(_get_manifest(klass).subclasses))]
+    on_path = [klass, ]
+    while stack:
+        prefix, subclasses = stack[-1]
+        for attr, subclass in subclasses:
+            if subclass in on_path:
+                continue
+            path = prefix + attr
+            yield path, subclass
+            stack.append((path + ".", iter(_get_manifest(subclass).subclasses)))
+            on_path.append(subclass)
+            break
+        else:
+            stack.pop()
+            on_path.pop()
+
+
+def _walk_bfs(klass):
+    # queue of (path prefix, class, classes from root to the class)
+    queue = deque([("", klass, (klass,))])
+    while queue:
+        prefix, klass, ancestors = queue.popleft()
+        for attr, subclass in _get_manifest(klass).subclasses:
+            if subclass in ancestors:
+                continue
+            path = prefix + attr
+            yield path, subclass
+            queue.append((path + ".", subclass, ancestors + (subclass,)))
+
+
+_walkers = {
+    "dfs": _walk_dfs,
+    "bfs": _walk_bfs,
+}
+
+
+def _get_path_index(klass):
+    """Get the ``({path: klass}, sorted path list)`` pair of all nested class,
+    build it on first use.
+    """
+    cache = get_cache(klass)
+    try:
+        return cache[("path",)]
+    except KeyError:
+        pass
+
+    mapper = dict(_walk_dfs(klass))
+    path_index = (mapper, sorted(mapper))
+    cache[("path",)] = path_index
+    return path_index
+
+
+def _get_deep_index(klass, attr):
+    """Get the :class:`~constant2._index.HashIndex` maps the value of ``attr``
+    to (dotted path, klass) of all nested class at any depth, build it on
+    first use. Only the attribute defined in the nested class itself is
+    used, same as :meth:`_Constant.GetFirst`.
+    """
+    key = ("deep", attr)
+    try:
+        return get_cache(klass)[key]
+    except KeyError:
+        pass
+
+    with stripe_lock(klass):
+        cache = get_cache(klass)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        pairs = list()
+        for path, subclass in _walk_dfs(klass):
+            try:
+                value = subclass.__dict__[attr]
+            except KeyError:
+                continue
+            pairs.append((value, (path, subclass)))
+        index = HashIndex(pairs)
+        cache[key] = index
+        return index
+
+
+_missing_policies = {"none", "skip", "raise"}
+
+
+def _resolve_ids(id_list, find, on_missing):
+    """Resolve id one by one.
+
+    :param find: a function takes an id, returns list of matched object.
+    :param on_missing: "none", "skip" or "raise".
+    """
+    if on_missing not in _missing_policies:
+        raise ValueError(
+            "on_missing has to be one of %s" % sorted(_missing_policies))
+
+    def resolve():
+        for id_ in id_list:
+            matched = find(id_)
+            if matched:
+                yield matched[0]
+            elif on_missing == "none":
+                yield None
+            elif on_missing == "raise":
+                raise KeyError(id_)
+
+    return resolve()
+
+
+def _iter_derived_classes(klass):
+    """Yield the class itself and all classes inherit from it.
+    """
+    stack = [klass, ]
+    visited = set()
+    while stack:
+        klass = stack.pop()
+        if klass in visited:
+            continue
+        visited.add(klass)
+        yield klass
+        stack.extend(type.__subclasses__(klass))
+
+
+def _invalidate(klass):
+    """Mark everything we cached for this class as outdated.
+
+    Inherited attributes are part of the manifest, so the manifest of all
+    derived class is reset. Index of a class is built from it's nested
+    class, so the class and all class containing it, or inheriting it from
+    a class containing it, at any level, takes a new generation, and their
+    cache becomes invalid, see :func:`~constant2._index.get_cache`.
+    """
+    generation = next_generation()
+    stack = list()
+    for derived_klass in _iter_derived_classes(klass):
+        type.__setattr__(derived_klass, "__manifest__", None)
+        type.__setattr__(derived_klass, "__lazy_class__", None)
+        type.__setattr__(derived_klass, "__compact_class__", None)
+        stack.append(derived_klass)
+
+    visited = set()
+    while stack:
+        klass = stack.pop()
+        if klass in visited:
+            continue
+        visited.add(klass)
+        type.__setattr__(klass, "__generation__", generation)
+        for parent in iter_parents(klass):
+            stack.extend(_iter_derived_classes(parent))
+
+
+def _get_copy_plan(klass):
+    """How to copy each attribute value to a new instance, see
+    :func:`constant2._copy.make_plan`. It is stored in the per class cache.
+    """
+    compact = klass.__dict__.get("__compact_instance__", False)
+    cache = get_cache(klass)
+    key = ("copy_plan", compact)
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+
+    constant_klass = klass.__dict__.get("__constant__", klass)
+    plan = make_plan(
+        _get_manifest(klass).items, constant_klass.__copy_policy__)
+    if compact:
+        # method and property of compact class is not a slot
+        plan = tuple(step for step in plan if step[0] in klass.__slots__)
+    cache[key] = plan
+    return plan
+
+
+# ``next`` of ``itertools.count`` is atomic, instance created in different
+# thread never gets the same creation index.
+_creation_counter = count(1)
+
+
+class _LazySubclass(object):
+    """Descriptor creates the nested Constant instance on first access, then
+    stores it in the instance ``__dict__``, so later access is a normal
+    attribute access.
+    """
+
+    def __init__(self, attr, klass):
+        self.attr = attr
+        self.klass = klass
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.klass
+        value = self.klass(lazy=True)
+        instance.__dict__[self.attr] = value
+        return value
+
+
+class _LazyValue(object):
+    """Descriptor returns the class attribute value the lazy class is built
+    from, mutable value is copied, on first access, then stores it in the
+    instance ``__dict__``.
+    """
+
+    def __init__(self, attr, value, copier):
+        self.attr = attr
+        self.value = value
+        self.copier = copier
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.value
+        if self.copier is None:
+            value = self.value
+        else:
+            value = self.copier(self.value)
+        instance.__dict__[self.attr] = value
+        return value
+
+
+def _reduce_lazy(self):
+    # every attribute and nested instance is created, the generated lazy
+    # class can't be pickled by reference
+    for attr, value in type(self).__dict__.items():
+        if isinstance(value, (_LazyValue, _LazySubclass)):
+            getattr(self, attr)
+    return _reconstruct_lazy, (self.__constant__, self.__dict__.copy())
+
+
+def _reconstruct_lazy(klass, state):
+    """Unpickle a lazy instance of a Constant class.
+    """
+    instance = object.__new__(_get_lazy_class(klass))
+    instance.__dict__.update(state)
+    return instance
+
+
+def _get_lazy_class(klass):
+    """Get the class of lazy instance of a Constant class.
+
+    It inherits from the Constant class, every attribute and nested class is
+    replaced by a descriptor. The descriptor holds the value at the time the
+    lazy class is built, a new lazy class is built after the Constant class
+    is modified, so a lazy instance sees the class as it was when the
+    instance is created, same as an eager instance. A mutable value modified
+    in place is still seen until it is copied on first access.
+    """
+    lazy_klass = klass.__dict__.get("__lazy_class__")
+    if lazy_klass is None:
+        manifest = _get_manifest(klass)
+        attrs = {
+            "__module__": klass.__module__,
+            "__doc__": klass.__doc__,
+            "__constant__": klass,
+            "__lazy_instance__": True,
+            "__reduce__": _reduce_lazy,
+        }
+        for attr, value, copier in _get_copy_plan(klass):
+            attrs[attr] = _LazyValue(attr, value, copier)
+        for attr, subclass in manifest.subclasses:
+            attrs[attr] = _LazySubclass(attr, subclass)
+        # bypass Meta.__new__, everything is already validated
+        lazy_klass = type.__new__(type(klass), klass.__name__, (klass,), attrs)
+        type.__setattr__(klass, "__lazy_class__", lazy_klass)
+    return lazy_klass
+
+
+def _reduce_compact(self):
+    # the generated compact class can't be pickled by reference
+    state = dict()
+    for attr in type(self).__slots__:
+        try:
+            state[attr] = getattr(self, attr)
+        except AttributeError:
+            pass
+    return _reconstruct_compact, (self.__constant__, state)
+
+
+def _reconstruct_compact(klass, state):
+    """Unpickle a compact instance of a Constant class.
+    """
+    instance = object.__new__(_get_compact_class(klass))
+    for attr, value in state.items():
+        setattr(instance, attr, value)
+    return instance
+
+
+def _get_compact_class(klass):
+    """Get the class of compact instance of a Constant class.
+
+    It doesn't inherit from the Constant class, because a subclass can not
+    remove the instance ``__dict__``. It inherits from :class:`_Constant`,
+    uses ``__slots__`` for every attribute and nested class, and copies the
+    methods and properties defined in the Constant class. Class method is
+    bound to the Constant class, so ``cls.attr`` is still the class
+    attribute value. ``isinstance(instance, klass)`` still works, see
+    :meth:`Meta.__instancecheck__`.
+    """
+    compact_klass = klass.__dict__.get("__compact_class__")
+    if compact_klass is None:
+        manifest = _get_manifest(klass)
+        attrs = {
+            "__module__": klass.__module__,
+            "__doc__": klass.__doc__,
+            "__constant__": klass,
+            "__compact_instance__": True,
+            "__reduce__": _reduce_compact,
+        }
+        for base in reversed(klass.__mro__):
+            if base in (object, _Constant, Constant):
+                continue
+            for attr, value in base.__dict__.items():
+                if _is_builtin_name(attr):
+                    continue
+                if isinstance(value, classmethod):
+                    attrs[attr] = staticmethod(getattr(klass, attr))
+                elif inspect.isfunction(value) or \
+                        isinstance(value, (staticmethod, property)):
+                    attrs[attr] = value
+                else:
+                    # overridden by a plain attribute
+                    attrs.pop(attr, None)
+        attrs["__slots__"] = tuple(
+            attr for attr in manifest.names if attr not in attrs
+        ) + tuple(
+            attr for attr, _ in manifest.subclasses
+        ) + ("__creation_index__",)
+        compact_klass = type(str(klass.__name__), (_Constant,), attrs)
+        type.__setattr__(klass, "__compact_class__", compact_klass)
+    return compact_klass
+
+
+def _instance_items(instance):
+    """(attr, value) pairs of non-class attributes of an instance, copy on
+    write proxy is not unwrapped.
+    """
+    l = list()
+    # 为什么这里用类的 manifest 而不是 get_all_attributes(self) ?
+    # 因为有些实例不支持 get_all_attributes(instance) 方法, 会报错。
+    # 所以我们从类里得到所有的属性信息 (已经按名称排好序), 然后获得
+    # 这些属性在实例中对应的值。
+    for attr in _get_manifest(instance.__class__).names:
+        value = getattr(instance, attr)
+
+        # if it is not a instance of class(Constant)
+        if not isinstance(value, Constant):
+            l.append((attr, value))
+
+    return l
+
+
+def _instance_children(instance):
+    """(attr, nested instance) pairs of an instance.
+    """
+    return [
+        (attr, getattr(instance, attr))
+        for attr, _ in _get_manifest(instance.__class__).subclasses
+    ]
+
+
+def _instance_fingerprint(instance):
+    return _fingerprint.compute(instance, _instance_items, _instance_children)
+
+
 class _Constant(object):
     """Generic Constantant.
 
     Inherit from this class to define a data container class.
 
     all nested Constant class automatically inherit from :class:`Constant`.
+
+    Set ``__lazy__ = True`` or ``__compact__ = True`` in the class body to
+    create lazy or compact instance by default, see :meth:`_Constant.__init__`.
+
+    Set ``__copy_policy__`` in the class body to choose how mutable attribute
+    value is copied to instance, ``"deep"``, ``"shallow"``, ``"share"`` or
+    ``"cow"`` (copy on write), or a dict of attr -> policy. Immutable value
+    is never copied. Copy on write value is a proxy, not a builtin list, dict
+    or set, see :mod:`constant2._copy`.
+
+    Set ``__cache_size__`` in the class body to limit the number of entries,
+    such as index, in the cache of the class, see :meth:`_Constant.CacheInfo`.
     """
+    __slots__ = ()
     __creation_index__ = 0  # Used for sorting
-
-    def __init__(self):
+    __lazy__ = False
+    __compact__ = False
+    __copy_policy__ = "deep"
+    __cache_size__ = None
+    __frozen__ = False
+
+    def __new__(cls, lazy=None, compact=None):
+        if lazy is None:
+            lazy = cls.__lazy__
+        if compact is None:
+            compact = cls.__compact__
+        if lazy and compact:
+            raise ValueError("lazy and compact can not be used together")
+        if lazy:
+            cls = _get_lazy_class(cls)
+        elif compact:
+            # __init__ is not called automatically, because compact class
+            # is not a subclass of cls
+            instance = super(_Constant, cls).__new__(_get_compact_class(cls))
+            instance.__init__()
+            return instance
+        return super(_Constant, cls).__new__(cls)
+
+    def __init__(self, lazy=None, compact=None):
         """
 
+        :param lazy: if True, creating the instance is O(1). Nested Constant
+            instance is created on first access, mutable attribute value is
+            copied on first access. It sees the class as it was when the
+            instance is created, same as an eager instance, and it can be
+            pickled. Default is the ``__lazy__`` class attribute.
+        :param compact: if True, the instance and all nested instance store
+            attributes in ``__slots__`` instead of ``__dict__``, which uses
+            much less memory. ``type(instance)`` is a generated class, use
+            ``isinstance`` to check the type. Default is the ``__compact__``
+            class attribute.
+
         .. versionadded:: 0.0.3
-        """
-        for attr, value in self.__class__.Items():
-            value = deepcopy(value)
-            setattr(self, attr, value)
 
-        for attr, Subclass in self.Subclasses():
-            value = Subclass()
-            setattr(self, attr, value)
+        .. versionchanged:: 0.0.14
 
-        self.__creation_index__ = Constant.__creation_index__
-        Constant.__creation_index__ += 1
+            add ``lazy`` and ``compact`` parameter. Immutable attribute value
+            is shared instead of deep copied, mutable value is copied by the
+            ``__copy_policy__``.
+        """
+        klass = self.__class__
+        if not klass.__dict__.get("__lazy_instance__", False):
+            for attr, value, copier in _get_copy_plan(klass):
+                if copier is not None:
+                    value = copier(value)
+                setattr(self, attr, value)
+
+            if klass.__dict__.get("__compact_instance__", False):
+                # there is no class attribute to fall back to
+                constant_klass = klass.__constant__
+                for attr in _get_manifest(klass).names:
+                    if (attr in klass.__slots__) and not hasattr(self, attr):
+                        setattr(self, attr, getattr(constant_klass, attr))
+
+                for attr, Subclass in self.Subclasses():
+                    value = Subclass(compact=True)
+                    setattr(self, attr, value)
+            else:
+                for attr, Subclass in self.Subclasses():
+                    value = Subclass()
+                    setattr(self, attr, value)
+
+        self.__creation_index__ = next(_creation_counter)
 
     def __repr__(self):
         items_str = ", ".join([
-            "%s=%r" % (attr, value) for attr, value in self.items()
+            "%s=%r" % (attr, value) for attr, value in _instance_items(self)
         ])
         nested_str = ", ".join([
             "%s=%r" % (attr, subclass) for attr, subclass in self.subclasses()
@@ -93,14 +763,13 @@ class _Constant(object):
             [("a", 1), ("b", 2)]
 
         .. versionadded:: 0.0.5
-        """
-        l = list()
-        for attr, value in get_all_attributes(cls):
-            # if it's not a class(Constant)
-            if not inspect.isclass(value):
-                l.append((attr, value))
 
-        return list(sorted(l, key=lambda x: x[0]))
+        .. versionchanged:: 0.0.14
+
+            read from the per class manifest, no reflection is needed.
+        """
+        manifest = _get_manifest(cls, materialize=False)
+        return list(manifest.items)
 
     def items(self):
         """non-class attributes ordered by alphabetical order.
@@ -122,24 +791,115 @@ class _Constant(object):
             [("a", 1), ("b", 2)]
 
         .. versionchanged:: 0.0.5
-        """
-        l = list()
-        # 为什么这里是 get_all_attributes(self.__class__) 而不是
-        # get_all_attributes(self) ? 因为有些实例不支持
-        # get_all_attributes(instance) 方法, 会报错。
-        # 所以我们从类里得到所有的属性信息, 然后获得这些属性在实例中
-        # 对应的值。
-        for attr, value in get_all_attributes(self.__class__):
-            value = getattr(self, attr)
 
-            # if it is not a instance of class(Constant)
-            if not isinstance(value, Constant):
-                l.append((attr, value))
+        .. versionchanged:: 0.0.14
 
-        return list(sorted(l, key=lambda x: x[0]))
+            copy on write value is returned as the builtin list, dict or set
+            owned by the instance, see :mod:`constant2._copy`.
+        """
+        return [
+            (attr, value.own() if isinstance(value, CowProxy) else value)
+            for attr, value in _instance_items(self)
+        ]
 
     def __eq__(self, other):
-        return self.items() == other.items()
+        """Two instance are equal if all attributes are equal by ``==``, and
+        so are all nested instance. It stops at the first difference.
+
+        .. versionchanged:: 0.0.14
+
+            nested instance is also compared.
+        """
+        if self is other:
+            return True
+        if not isinstance(other, _Constant):
+            return False
+        stack = [(self, other)]
+        while stack:
+            instance, other = stack.pop()
+            if instance is other:
+                continue
+            if _instance_items(instance) != _instance_items(other):
+                return False
+            children = _instance_children(instance)
+            other_children = _instance_children(other)
+            if [attr for attr, _ in children] != \
+                    [attr for attr, _ in other_children]:
+                return False
+            stack.extend(
+                (child, other_child) for (_, child), (_, other_child)
+                in zip(children, other_children))
+        return True
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    @classmethod
+    def Fingerprint(cls):
+        """Content hash of this class, a sha256 hex digest of all non-class
+        attributes and the fingerprint of all nested class. Class having
+        the same attributes and nested class has the same fingerprint,
+        it can be used as a cache key or to detect change.
+
+        It is cached for every class in the tree, and invalidated when the
+        class or any of it's nested class is changed, so the unchanged
+        subtree is not hashed again.
+
+        .. versionadded:: 0.0.14
+        """
+        # fingerprint is stored in the cache it was read from, if the class
+        # is changed meanwhile, the outdated fingerprint is never seen.
+        caches = dict()
+
+        def get_cached(klass):
+            cache = caches[klass] = get_cache(klass)
+            return cache.get(("fingerprint",))
+
+        def set_cached(klass, value):
+            caches[klass][("fingerprint",)] = value
+
+        return _fingerprint.compute(
+            cls,
+            lambda klass: _get_manifest(klass).items,
+            lambda klass: _get_manifest(klass).subclasses,
+            get_cached,
+            set_cached,
+        )
+
+    @classmethod
+    def CacheInfo(cls):
+        """Statistics of the cache of this class, counted since the class is
+        created. Every class has it's own cache, it stores index and other
+        result derived from the nested class.
+
+        Example::
+
+            >>> Product.CacheInfo()
+            CacheInfo(hits=120, misses=3, evictions=0, size=3, maxsize=None)
+
+        :returns: :class:`~constant2._index.CacheInfo` namedtuple.
+
+        .. versionadded:: 0.0.14
+        """
+        return cache_info(cls)
+
+    @classmethod
+    def Generation(cls):
+        """A number changes whenever this class or any of it's nested class,
+        at any level, is changed. Cache derived from the class tree can be
+        validated by it in O(1).
+
+        .. versionadded:: 0.0.14
+        """
+        return get_generation(cls)
+
+    def fingerprint(self):
+        """Content hash of this instance, see :meth:`_Constant.Fingerprint`.
+        Instance attribute can be edited, so it is computed on every call.
+
+        .. versionadded:: 0.0.14
+        """
+        return _instance_fingerprint(self)
 
     @classmethod
     def Keys(cls):
@@ -147,7 +907,8 @@ class _Constant(object):
 
         .. versionadded:: 0.0.5
         """
-        return [attr for attr, _ in cls.Items()]
+        manifest = _get_manifest(cls, materialize=False)
+        return [attr for attr, _ in manifest.items]
 
     def keys(self):
         """All non-class attribute name list.
@@ -162,7 +923,8 @@ class _Constant(object):
 
         .. versionadded:: 0.0.5
         """
-        return [value for _, value in cls.Items()]
+        manifest = _get_manifest(cls, materialize=False)
+        return [value for _, value in manifest.items]
 
     def values(self):
         """All non-class attribute value list.
@@ -176,8 +938,21 @@ class _Constant(object):
         """Return regular class variable and it's value as a dictionary data.
 
         .. versionadded:: 0.0.5
+
+        .. versionchanged:: 0.0.14
+
+            returns a read only ``MappingProxyType`` view for frozen class.
         """
-        return dict(cls.Items())
+        if _is_frozen(cls):
+            cache = get_cache(cls)
+            try:
+                namespace = cache[("namespace",)]
+            except KeyError:
+                namespace = dict(
+                    _get_manifest(cls, materialize=False).items)
+                cache[("namespace",)] = namespace
+            return MappingProxyType(namespace)
+        return dict(_get_manifest(cls, materialize=False).items)
 
     def to_dict(self):
         """Return regular class variable and it's value as a dictionary data.
@@ -210,22 +985,52 @@ class _Constant(object):
         [("C", MyClass.C), ("D", MyClass.D)]
 
         .. versionadded:: 0.0.3
+
+        .. versionchanged:: 0.0.14
+
+            read from the per class manifest, no reflection is needed. The
+            sorted result is cached per ``(sort_by, reverse)``.
         """
-        l = list()
-        for attr, value in get_all_attributes(cls):
-            try:
-                if issubclass(value, Constant):
-                    l.append((attr, value))
-            except:
-                pass
+        if sort_by is None:
+            sort_by = "__creation_index__"
+        return list(_sorted_subclasses(cls, sort_by, reverse))
+
+    @classmethod
+    def IterSubclasses(cls, sort_by=None, reverse=False, offset=0, limit=None):
+        """Iterate a page of :meth:`_Constant.Subclasses`.
 
+        If the sorted view is not cached yet, only the first
+        ``offset + limit`` nested class is selected by a heap, a full sort is
+        not needed.
+
+        Example::
+
+            >>> list(MyClass.IterSubclasses(
+            ...     sort_by="priority", reverse=True, limit=10))
+
+        :param offset: number of nested class to skip.
+        :param limit: max number of nested class to yield, None means no
+            limit.
+        :returns: iterator of (attr, value) pairs.
+
+        .. versionadded:: 0.0.14
+        """
         if sort_by is None:
             sort_by = "__creation_index__"
+        if offset < 0:
+            raise ValueError("offset has to be >= 0")
+        if (limit is not None) and (limit < 0):
+            raise ValueError("limit has to be >= 0")
 
-        l = list(
-            sorted(l, key=lambda x: getattr(x[1], sort_by), reverse=reverse))
+        if limit is None:
+            return islice(_sorted_subclasses(cls, sort_by, reverse), offset, None)
 
-        return l
+        subclasses = _get_manifest(cls).subclasses
+        view = get_cache(cls).get(("subclasses", sort_by, reverse))
+        if view is None:
+            select = heapq.nlargest if reverse else heapq.nsmallest
+            view = select(offset + limit, subclasses, key=_sort_key(sort_by))
+        return islice(view, offset, offset + limit)
 
     def subclasses(self, sort_by=None, reverse=False):
         """Get all nested Constant class instance and it's name pair.
@@ -258,8 +1063,15 @@ class _Constant(object):
             l.append((attr, value))
         return l
 
+    def iter_subclasses(self, sort_by=None, reverse=False, offset=0, limit=None):
+        """Instance version of :meth:`_Constant.IterSubclasses`.
+
+        .. versionadded:: 0.0.14
+        """
+        for attr, _ in self.IterSubclasses(sort_by, reverse, offset, limit):
+            yield attr, getattr(self, attr)
+
     @classmethod
-    @lrudecorator(size=64)
     def GetFirst(cls, attr, value, e=0.000001, sort_by="__name__"):
         """Get the first nested Constant class that met ``klass.attr == value``.
 
@@ -269,14 +1081,15 @@ class _Constant(object):
         :param sort_by: nested class is ordered by <sort_by> attribute.
 
         .. versionadded:: 0.0.5
-        """
-        for _, klass in cls.Subclasses(sort_by=sort_by):
-            try:
-                if klass.__dict__[attr] == approx(value, e):
-                    return klass
-            except:
-                pass
 
+        .. versionchanged:: 0.0.14
+
+            use a hash index of ``attr``, built on first call. Float value
+            is looked up by a sorted index.
+        """
+        matched = _find(cls, attr, value, e, sort_by)
+        if matched:
+            return matched[0]
         return None
 
     def get_first(self, attr, value, e=0.000001,
@@ -292,15 +1105,14 @@ class _Constant(object):
         """
         for _, klass in self.subclasses(sort_by, reverse):
             try:
-                if getattr(klass, attr) == approx(value, e):
+                if is_equal(getattr(klass, attr), value, e):
                     return klass
-            except:
+            except AttributeError:
                 pass
 
         return None
 
     @classmethod
-    @lrudecorator(size=64)
     def GetAll(cls, attr, value, e=0.000001, sort_by="__name__"):
         """Get all nested Constant class that met ``klass.attr == value``.
 
@@ -310,16 +1122,13 @@ class _Constant(object):
         :param sort_by: nested class is ordered by <sort_by> attribute.
 
         .. versionadded:: 0.0.5
-        """
-        matched = list()
-        for _, klass in cls.Subclasses(sort_by=sort_by):
-            try:
-                if klass.__dict__[attr] == approx(value, e):
-                    matched.append(klass)
-            except:  # pragma: no cover
-                pass
 
-        return matched
+        .. versionchanged:: 0.0.14
+
+            use a hash index of ``attr``, built on first call. Float value
+            is looked up by a sorted index.
+        """
+        return list(_find(cls, attr, value, e, sort_by))
 
     def get_all(self, attr, value, e=0.000001,
                 sort_by="__name__", reverse=False):
@@ -335,13 +1144,316 @@ class _Constant(object):
         matched = list()
         for _, klass in self.subclasses(sort_by, reverse):
             try:
-                if getattr(klass, attr) == approx(value, e):
+                if is_equal(getattr(klass, attr), value, e):
                     matched.append(klass)
-            except:  # pragma: no cover
+            except AttributeError:
                 pass
 
         return matched
 
+    @classmethod
+    def GetRange(cls, attr, lo=None, hi=None):
+        """Get all nested Constant class that met ``lo <= klass.attr <= hi``,
+        ordered by ``klass.attr``. Inherited attribute is also used.
+
+        Non-number value is ignored. It uses a sorted index of ``attr``,
+        built on first call.
+
+        :param attr: attribute name.
+        :param lo: lower bound, ``None`` means no lower bound.
+        :param hi: upper bound, ``None`` means no upper bound.
+
+        .. versionadded:: 0.0.14
+        """
+        return get_index(cls, "sorted", attr, inherited=True).range(lo, hi)
+
+    def get_range(self, attr, lo=None, hi=None):
+        """Get all nested Constant instance that met
+        ``lo <= instance.attr <= hi``, ordered by ``instance.attr``.
+
+        :param attr: attribute name.
+        :param lo: lower bound, ``None`` means no lower bound.
+        :param hi: upper bound, ``None`` means no upper bound.
+
+        .. versionadded:: 0.0.14
+        """
+        matched = list()
+        for _, instance in self.subclasses():
+            value = getattr(instance, attr, None)
+            if not is_number(value):
+                continue
+            if (lo is not None) and (value < lo):
+                continue
+            if (hi is not None) and (value > hi):
+                continue
+            matched.append((value, instance))
+        matched.sort(key=lambda x: x[0])
+        return [instance for _, instance in matched]
+
+    @classmethod
+    def Where(cls, **conditions):
+        """Query nested Constant class by multiple conditions, all conditions
+        has to be met. Inherited attribute is also used.
+
+        Example::
+
+            >>> Product.Where(category="food", price__between=(10, 20),
+            ...               weight__lt=5, tags__pred=lambda t: "new" in t)
+
+        :param conditions: ``attr=value`` or ``attr__op=value``, op is one
+            of ``eq, ne, gt, gte, lt, lte, in, between, pred``.
+        :returns: a lazy :class:`~constant2._query.Query`, iterate it or
+            call ``.first()``, ``.all()``, ``.count()``.
+
+        The condition having the fewest candidates by index is used to find
+        candidates, other conditions are checked one by one.
+
+        .. versionadded:: 0.0.14
+        """
+        return Query(
+            [Condition(key, value) for key, value in conditions.items()],
+            klass=cls,
+        )
+
+    @classmethod
+    def ToColumns(cls, sort_by="__name__"):
+        """Columnar view of the attributes of all nested Constant class,
+        inherited attribute included. Column is a ``numpy.ndarray`` if NumPy
+        is installed, otherwise ``array.array`` or tuple.
+
+        Example::
+
+            >>> columns = Product.ToColumns()
+            >>> columns.klasses  # row i of every column is klasses[i]
+            (Product.Apple, Product.Banana, ...)
+            >>> columns["price"]
+            array([1.5, 0.5, ...])
+
+        Missing value is NaN in float column, 0 in int column and None in
+        others, use ``columns.present(attr)`` to tell. Int beyond int64, or
+        beyond 2 ** 53 mixed with float, is kept in an object column, value
+        is never rounded. The view is cached per class.
+
+        :returns: :class:`~constant2._columns.Columns`.
+
+        .. versionadded:: 0.0.14
+        """
+        cache = get_cache(cls)
+        key = ("columns", sort_by)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
+        klasses = [klass for _, klass in cls.Subclasses(sort_by=sort_by)]
+        attrs = set()
+        for klass in klasses:
+            attrs.update(attr for attr, _ in _get_manifest(klass).items)
+        columns = Columns(klasses, sorted(attrs))
+        cache[key] = columns
+        return columns
+
+    @classmethod
+    def Filter(cls, expr=None, **conditions):
+        """Vectorized version of :meth:`_Constant.Where`, conditions are
+        evaluated over the columns of :meth:`_Constant.ToColumns` as boolean
+        mask.
+
+        Example::
+
+            >>> Product.Filter(price__between=(10, 20), weight__lt=5)
+            >>> Product.Filter(
+            ...     lambda c: (c["price"] * c["weight"] > 100) & c["active"])
+
+        :param expr: function takes the columns, returns a boolean mask of
+            all rows. Element wise expression like ``c["price"] > 2`` needs
+            NumPy, without it the column is an ``array.array`` or a tuple,
+            ``expr`` has to return a list of flags, otherwise a
+            ``TypeError`` is raised.
+        :param conditions: same as :meth:`_Constant.Where`.
+        :returns: list of nested class, ordered by name.
+
+        .. versionadded:: 0.0.14
+        """
+        return filter_columns(cls.ToColumns(), expr, conditions)
+
+    @classmethod
+    def GroupBy(cls, attr):
+        """Group nested Constant class by the value of ``attr``, inherited
+        attribute included. Class doesn't have the attribute is skipped.
+
+        Example::
+
+            >>> EmployeeEntity.GroupBy("department")
+            mappingproxy({"HR": (E1_Alice, E3_Cathy), "IT": (E2_Bob,)})
+
+        Groups are computed in one pass over :meth:`_Constant.ToColumns`,
+        the result is cached until the class tree changes.
+
+        :returns: read only mapping of value -> tuple of class, ordered by
+            name of the first class of the group.
+        :raises TypeError: if any value is unhashable, for example a list.
+
+        .. versionadded:: 0.0.14
+        """
+        cache = get_cache(cls)
+        key = ("group_by", attr)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+
+        result = MappingProxyType(_group.group_by(cls.ToColumns(), attr))
+        cache[key] = result
+        return result
+
+    @classmethod
+    def Aggregate(cls, attr, func, by=None):
+        """Aggregate the value of ``attr`` of all nested Constant class
+        having it, or of each group if ``by`` is given.
+
+        Example::
+
+            >>> Product.Aggregate("weight", "sum", by="category")
+            mappingproxy({"fruit": 3.5, "meat": 12.0})
+            >>> Product.Aggregate("price", "max")
+            20
+
+        Number column is aggregated by NumPy if it is installed, the result
+        is the same python value as without NumPy, except the rounding
+        error of float sum. The result is cached until the class tree
+        changes.
+
+        :param func: ``"count"``, ``"sum"``, ``"min"``, ``"max"``,
+            ``"mean"`` or a function takes a list of values. ``"min"`` and
+            ``"max"`` ignore NaN, unless all values are NaN.
+        :param by: attribute name to group by, see :meth:`_Constant.GroupBy`,
+            the value has to be hashable.
+        :returns: a single value, or a read only mapping of group value ->
+            value if ``by`` is given.
+
+        .. versionadded:: 0.0.14
+        """
+        cache = get_cache(cls)
+        key = ("aggregate", attr, func, by)
+        try:
+            return cache[key]
+        except (KeyError, TypeError):
+            pass
+
+        result = _group.aggregate(cls.ToColumns(), attr, func, by)
+        if by is not None:
+            result = MappingProxyType(result)
+        try:
+            cache[key] = result
+        except TypeError:  # unhashable func
+            pass
+        return result
+
+    def where(self, **conditions):
+        """Query nested Constant instance by multiple conditions, see
+        :meth:`_Constant.Where`. Instance attribute can be edited, so it
+        checks all nested instance.
+
+        .. versionadded:: 0.0.14
+        """
+        return Query(
+            [Condition(key, value) for key, value in conditions.items()],
+            instance=self,
+        )
+
+    @classmethod
+    def Walk(cls, order="dfs"):
+        """Yield (dotted path, klass) of all nested Constant class at any
+        depth, for example ``("Fruit.Apple.RedApple", Food.Fruit.Apple.RedApple)``.
+
+        Nested class of the same level are visited in attribute name order,
+        no intermediate list is built. A class already on the path from the
+        root is not visited again, so reference cycle won't loop forever.
+
+        :param order: "dfs" for depth-first, "bfs" for breadth-first.
+
+        .. versionadded:: 0.0.14
+        """
+        try:
+            walker = _walkers[order]
+        except KeyError:
+            raise ValueError("order has to be one of %s" % sorted(_walkers))
+        return walker(cls)
+
+    @classmethod
+    def Lookup(cls, path):
+        """Get nested Constant class by dotted path, for example
+        ``Food.Lookup("Fruit.Apple.RedApple")``, ``None`` if not found.
+
+        It uses a path index of the whole tree, built on first call.
+
+        .. versionadded:: 0.0.14
+        """
+        return _get_path_index(cls)[0].get(path)
+
+    @classmethod
+    def FindDeep(cls, attr, value):
+        """Find the nested Constant class at any depth that
+        ``klass.attr == value``, like ``Enum._value2member_map_`` of the
+        whole tree.
+
+        Example::
+
+            >>> Status.FindDeep("code", 404)
+            ("Client.NotFound", Status.Client.NotFound)
+
+        It uses a reverse index of ``attr`` over the whole tree, built on
+        first call, value is looked up in O(1). Value is compared by ``==``,
+        there is no tolerance for float.
+
+        :returns: (dotted path, klass), ``None`` if not found.
+        :raises ValueError: if more than one nested class has the value.
+
+        .. versionadded:: 0.0.14
+        """
+        matched = _get_deep_index(cls, attr).find(value)
+        if not matched:
+            return None
+        path, klass = matched[0]
+        for _, other_klass in matched[1:]:
+            if other_klass is not klass:
+                raise ValueError("%s=%r is ambiguous, found at %s" % (
+                    attr, value, ", ".join(p for p, _ in matched)))
+        return path, klass
+
+    @classmethod
+    def FindDeepAll(cls, attr, value):
+        """Find all nested Constant class at any depth that
+        ``klass.attr == value``, see :meth:`_Constant.FindDeep`.
+
+        :returns: list of (dotted path, klass), in :meth:`_Constant.Walk`
+            depth-first order.
+
+        .. versionadded:: 0.0.14
+        """
+        return list(_get_deep_index(cls, attr).find(value))
+
+    @classmethod
+    def IterPrefix(cls, prefix):
+        """Yield (dotted path, klass) of the nested Constant class at
+        ``prefix`` and all nested class under it, ordered by path.
+
+        :param prefix: dotted path, ``""`` means all nested class.
+
+        .. versionadded:: 0.0.14
+        """
+        mapper, paths = _get_path_index(cls)
+        if prefix:
+            if prefix in mapper:
+                yield prefix, mapper[prefix]
+            prefix = prefix + "."
+        for i in range(bisect_left(paths, prefix), len(paths)):
+            path = paths[i]
+            if not path.startswith(prefix):
+                break
+            yield path, mapper[path]
+
     @classmethod
     def ToIds(cls, klass_list, id_field="id"):
         return [getattr(klass, id_field) for klass in klass_list]
@@ -350,11 +1462,72 @@ class _Constant(object):
         return [getattr(instance, id_field) for instance in instance_list]
 
     @classmethod
-    def ToClasses(cls, klass_id_list, id_field="id"):
-        return [cls.GetFirst(id_field, klass_id) for klass_id in klass_id_list]
+    def ToClasses(cls, klass_id_list, id_field="id", on_missing="none"):
+        """Resolve list of id to list of nested Constant class.
+
+        :param klass_id_list: list of id.
+        :param id_field: the attribute name of id.
+        :param on_missing: what to do if an id is not found. "none": use
+            ``None``; "skip": ignore it; "raise": raise ``KeyError``.
+
+        .. versionchanged:: 0.0.14
+
+            the id map is built only once, N id are resolved in O(N).
+        """
+        return list(cls.IterClasses(klass_id_list, id_field, on_missing))
+
+    @classmethod
+    def IterClasses(cls, klass_id_list, id_field="id", on_missing="none"):
+        """Streaming version of :meth:`_Constant.ToClasses`, it also accepts
+        an iterator of id.
+
+        .. versionadded:: 0.0.14
+        """
+        return _resolve_ids(
+            klass_id_list,
+            lambda klass_id: _find(
+                cls, id_field, klass_id, 0.000001, "__name__"),
+            on_missing,
+        )
+
+    def to_instances(self, instance_id_list, id_field="id", on_missing="none"):
+        """Resolve list of id to list of nested Constant instance.
+
+        :param instance_id_list: list of id.
+        :param id_field: the attribute name of id.
+        :param on_missing: what to do if an id is not found. "none": use
+            ``None``; "skip": ignore it; "raise": raise ``KeyError``.
+
+        .. versionchanged:: 0.0.14
+
+            the id map is built only once, N id are resolved in O(N).
+        """
+        return list(self.iter_instances(
+            instance_id_list, id_field, on_missing))
+
+    def iter_instances(self, instance_id_list, id_field="id", on_missing="none"):
+        """Streaming version of :meth:`_Constant.to_instances`, it also
+        accepts an iterator of id.
+
+        .. versionadded:: 0.0.14
+        """
+        # instance attribute can be edited, so the id map is built per call
+        pairs = [
+            (getattr(instance, id_field), instance)
+            for _, instance in self.subclasses(sort_by="__name__")
+            if hasattr(instance, id_field)
+        ]
+        index = HashIndex(pairs)
+
+        def find(instance_id):
+            if isinstance(instance_id, float):
+                return [
+                    instance for value, instance in pairs
+                    if is_equal(value, instance_id, 0.000001)
+                ]
+            return index.find(instance_id)
 
-    def to_instances(self, instance_id_list, id_field="id"):
-        return [self.get_first(id_field, instance_id) for instance_id in instance_id_list]
+        return _resolve_ids(instance_id_list, find, on_missing)
 
     @classmethod
     def SubIds(cls, id_field="id", sort_by=None, reverse=False):
@@ -397,76 +1570,350 @@ class _Constant(object):
         :param other_entity_backpopulate_field: str
         :param is_many_to_one: bool
         :return:
+
+        .. versionchanged:: 0.0.14
+
+            the relationship is registered, after the forward field of an
+            entity is changed, for example ``Employee.department``, only the
+            affected back populated field is updated, calling it again is not
+            needed. Entity is matched by identity instead of ``__name__``,
+            entity not in this class is ignored.
         """
-        data = dict()
-        for _, other_klass in other_entity_klass.Subclasses():
-            other_field_value = getattr(
-                other_klass, this_entity_backpopulate_field)
-            if isinstance(other_field_value, (tuple, list)):
-                for self_klass in other_field_value:
-                    self_key = self_klass.__name__
-                    try:
-                        data[self_key].append(other_klass)
-                    except KeyError:
-                        data[self_key] = [other_klass, ]
-            else:
-                if other_field_value is not None:
-                    self_klass = other_field_value
-                    self_key = self_klass.__name__
-                    try:
-                        data[self_key].append(other_klass)
-                    except KeyError:
-                        data[self_key] = [other_klass, ]
-
-        if is_many_to_one:
-            new_data = dict()
-            for key, value in data.items():
-                try:
-                    new_data[key] = value[0]
-                except:  # pragma: no cover
-                    pass
-            data = new_data
-
-        for self_key, other_klass_list in data.items():
-            setattr(getattr(cls, self_key),
-                    other_entity_backpopulate_field, other_klass_list)
+        register(other_entity_klass, [
+            Relationship(
+                cls,
+                other_entity_klass,
+                this_entity_backpopulate_field,
+                other_entity_backpopulate_field,
+                is_many_to_one,
+            ),
+        ])
+
+    @classmethod
+    def BackAssignMany(cls, relationships):
+        """Bulk version of :meth:`_Constant.BackAssign`, assign multiple
+        relationships having this class as the source entity in one pass.
+
+        Example::
+
+            >>> EmployeeEntity.BackAssignMany([
+            ...     (DepartmentEntity, "department", "employees"),
+            ...     (TagEntity, "tags", "employees"),
+            ... ])
+
+        :param relationships: list of ``(other_entity_klass,
+            this_entity_field, other_entity_backpopulate_field)`` or
+            ``(..., is_many_to_one)`` tuple. ``this_entity_field`` is the
+            field of this side entity refers to other side entity.
+
+        .. versionadded:: 0.0.14
+        """
+        register(cls, [
+            Relationship(spec[0], cls, *spec[1:])
+            for spec in relationships
+        ])
+
+    @classmethod
+    def Join(cls, *hops):
+        """Follow relationship fields from this entity, return all entities
+        reached by the last hop. For example all tags of all employees in
+        the department of Alice::
+
+            >>> EmployeeEntity.Alice.Join("department", "employees", "tags")
+            frozenset({TagEntity.Senior, TagEntity.Python, ...})
+
+        Field value can be an entity, a list of entity or None. Adjacency
+        list of each entity and result of each hop is memoized until any
+        entity it has read is changed, at most
+        :data:`constant2._join.MEMO_SIZE` results are kept.
+
+        :param hops: field names.
+        :returns: frozenset.
+
+        .. versionadded:: 0.0.14
+        """
+        return _join.join(cls, hops)
+
+    @classmethod
+    def Traverse(cls, field, max_depth=None):
+        """Follow the same relationship field repeatedly from this entity,
+        for example all managers above an employee::
+
+            >>> EmployeeEntity.Alice.Traverse("manager")
+
+        Entity already reached is not visited again, so it stops on cycle.
+        This entity is not included unless it is on a cycle.
+
+        :param field: field name.
+        :param max_depth: max number of hops, None means no limit.
+        :returns: frozenset.
+
+        .. versionadded:: 0.0.14
+        """
+        return _join.traverse(cls, field, max_depth)
+
+    @classmethod
+    def Freeze(cls):
+        """Make this class, all nested class and their base class immutable,
+        and build the manifest, dotted path index and value index of all
+        attributes in advance.
+
+        Setting or deleting attribute of a frozen class raises
+        ``AttributeError``. Since nothing can change, ``Subclasses``
+        returns a cached result, ``GetFirst``, ``GetAll`` use the index built
+        in advance, ``ToDict`` returns a read only ``MappingProxyType`` view. Attribute
+        value itself, for example a list, is not frozen.
+
+        :returns: the class itself.
+
+        .. versionadded:: 0.0.14
+        """
+        klass_list = [cls, ] + [klass for _, klass in cls.Walk()]
+
+        # inherited attribute is part of the nested class
+        frozen = set()
+        for klass in klass_list:
+            for base in klass.__mro__:
+                if isinstance(base, Meta) and (base is not Constant) and \
+                        (base not in frozen):
+                    frozen.add(base)
+                    type.__setattr__(base, "__frozen__", True)
+                    _get_manifest(base)
+
+        _get_path_index(cls)
+        for klass in set(klass_list):
+            attrs = set()
+            numbers = set()
+            for _, subclass in _get_manifest(klass).subclasses:
+                for attr, value in _get_manifest(subclass).items:
+                    attrs.add(attr)
+                    if isinstance(value, float):
+                        numbers.add(attr)
+            for attr in attrs:
+                get_index(klass, "hash", attr, "__name__")
+            for attr in numbers:
+                get_index(klass, "sorted", attr, "__name__")
+        return cls
+
+    @classmethod
+    def Diff(cls, old, new):
+        """Compare two version of a class tree.
+
+        Only attribute and nested class defined in the class itself is
+        compared, inherited one is not, so the patch can always be applied.
+        Nested class having the same :meth:`_Constant.Fingerprint` is
+        skipped, so the cost is proportional to the size of the change once
+        the fingerprint is cached.
+
+        Example::
+
+            >>> diff = Constant.Diff(OldFood, NewFood)
+            >>> diff.added, diff.removed, diff.changed
+            (["Fruit.Kiwi"], ["Meat"], ["Fruit.Apple.id"])
+            >>> OldFood.Patch(diff.ops)  # now it is the same as NewFood
+
+        :returns: a :class:`~constant2._diff.TreeDiff`.
+
+        .. versionadded:: 0.0.14
+        """
+        return _diff.diff(
+            old, new,
+            lambda klass: [
+                (attr, value) for attr, value in _get_manifest(klass).items
+                if attr in klass.__dict__
+            ],
+            lambda klass: [
+                (attr, subclass)
+                for attr, subclass in _get_manifest(klass).subclasses
+                if attr in klass.__dict__
+            ],
+            lambda klass: klass.Fingerprint(),
+        )
+
+    @classmethod
+    def Patch(cls, ops):
+        """Apply patch operations, for example ``TreeDiff.ops``, to this
+        class tree in place. Nested class is created from it's dumped data.
+
+        All operation is checked before any is applied, the tree is not
+        modified if any of them is invalid, for example removing an inherited
+        attribute or a path doesn't exist.
+
+        :param ops: list of ``{"op": "add" | "replace" | "remove",
+            "path": dotted path, "value": value}``.
+        :returns: the class itself.
+        :raises ValueError: if any operation can't be applied.
+
+        .. versionadded:: 0.0.14
+        """
+        _diff.patch(cls, ops, cls.load)
+        return cls
 
     @classmethod
     def dump(cls):
         """Dump data into a dict.
 
         .. versionadded:: 0.0.2
+
+        .. versionchanged:: 0.0.14
+
+            iterative implementation, works with tree deeper than the
+            recursion limit. Raise ``ValueError`` if the class contains
+            itself.
         """
-        d = OrderedDict(cls.Items())
-        d["__classname__"] = cls.__name__
-        for attr, klass in cls.Subclasses():
-            d[attr] = klass.dump()
-        return OrderedDict([(cls.__name__, d)])
+        return _serialize.dump_tree(cls)
 
     @classmethod
-    def load(cls, data):
+    def load(cls, data, lazy=False):
         """Construct a Constant class from it's dict data.
 
+        :param lazy: if True, only the top level class is created, nested
+            class is created from it's data on first access. ``Items``,
+            ``Keys``, ``Values``, ``ToDict`` don't create nested class,
+            ``Subclasses`` creates nested class of one level.
+
         .. versionadded:: 0.0.2
+
+        .. versionchanged:: 0.0.14
+
+            iterative implementation. Nested class data in the
+            :meth:`_Constant.dump` format, ``{"attr": {"ClassName": {...}}}``,
+            is also loaded as nested class. Add ``lazy`` parameter.
+        """
+        if lazy:
+            name, data = _serialize.get_root_data(data)
+            return _serialize.load_shallow(name, data, Constant)
+        return _serialize.load_tree(data, Constant)
+
+    @classmethod
+    def FromRecords(cls, name, records, key, base=None):
+        """Create a Constant class having one nested entity class per record.
+
+        Example::
+
+            >>> EmployeeEntity = Constant.FromRecords(
+            ...     "EmployeeEntity",
+            ...     [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}],
+            ...     key=lambda record: "E%s_%s" % (record["id"], record["name"]),
+            ...     base=Employee,
+            ... )
+            >>> EmployeeEntity.E1_Alice.name
+            'Alice'
+
+        All records share the same fields, the schema is validated once
+        with the first record. Entity class is created in a single pass,
+        records are consumed one at a time. It costs about the same as
+        defining the classes one by one, manifest is built on first read.
+
+        :param name: name of the created class.
+        :param records: iterable of dict.
+        :param key: field name, or a function takes a record returns the
+            name of the entity class.
+        :param base: base class of the entity class, default is
+            :class:`Constant`.
+        :returns: subclass of ``cls``.
+
+        .. versionadded:: 0.0.14
+        """
+        if base is None:
+            base = Constant
+        metaclass = type(base)
+
+        def make_class(klass_name, attrs):
+            # manifest is derived from the base class on first read
+            attrs["__qualname__"] = "%s.%s" % (name, klass_name)
+            return type.__new__(metaclass, str(klass_name), (base,), attrs)
+
+        # lots of class is created and none of them is garbage
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            nested = OrderedDict(_records.iter_classes(
+                records, key, make_class, _reserved_attrs))
+            return type(cls)(str(name), (cls,), nested)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    @classmethod
+    def FromCSV(cls, name, fp, key, base=None, converters=None):
+        """Streaming version of :meth:`_Constant.FromRecords`, create entity
+        class from the rows of a csv text file handle, the first row is the
+        header. Rows are read one at a time.
+
+        :param converters: dict of field name -> function converts the text
+            value, for example ``{"id": int}``.
+
+        .. versionadded:: 0.0.14
         """
-        if len(data) == 1:
-            for key, value in data.items():
-                if "__classname__" not in value:  # pragma: no cover
-                    raise ValueError
-                name = key
-                bases = (Constant,)
-                attrs = dict()
-                for k, v in value.items():
-                    if isinstance(v, dict):
-                        if "__classname__" in v:
-                            attrs[k] = cls.load({k: v})
-                        else:
-                            attrs[k] = v
-                    else:
-                        attrs[k] = v
-            return type(name, bases, attrs)
-        else:  # pragma: no cover
-            raise ValueError
+        return cls.FromRecords(
+            name, _records.read_csv(fp, converters), key, base)
+
+    @classmethod
+    def dump_stream(cls, fp):
+        """Streaming version of :meth:`_Constant.dump`, write json to a text
+        file handle piece by piece without building the dict. Attribute value
+        is encoded by superjson.
+
+        .. versionadded:: 0.0.14
+        """
+        _serialize.dump_stream(cls, fp)
+
+    @classmethod
+    def load_stream(cls, fp):
+        """Streaming version of :meth:`_Constant.load`, read json from a text
+        file handle, class is created while parsing. Nesting depth is limited
+        by the recursion limit of the standard library json parser.
+
+        .. versionadded:: 0.0.14
+        """
+        return _serialize.load_stream(fp, Constant)
+
+    @classmethod
+    def Snapshot(cls, path, source=None):
+        """Save this class and all nested class, including manifest and
+        index, to a binary file, restore it by :meth:`_Constant.Restore`.
+
+        Every class is still created by ``type.__new__``, so restoring costs
+        about the same as defining the classes in Python or ``load()``. It
+        saves the time of building the manifest and index, call
+        :meth:`_Constant.Freeze` before taking the snapshot to include all of
+        them, and the time of computing the tree from it's source.
+
+        Example::
+
+            >>> tree = Constant.Restore(path, source=json_text)
+            >>> if tree is None:
+            ...     tree = Constant.load(json.loads(json_text))
+            ...     tree.Snapshot(path, source=json_text)
+
+        Base class and attribute value outside of the tree is pickled by
+        reference, so it has to be importable.
+
+        :param path: file path.
+        :param source: the module, source code, JSON text or data the tree is
+            created from, it's hash is stored in the snapshot.
+
+        .. versionadded:: 0.0.14
+        """
+        klass_list = [cls, ] + [klass for _, klass in cls.Walk()]
+        for klass in klass_list:
+            _get_manifest(klass)
+        snapshot(path, cls, klass_list, source_key(source))
+
+    @classmethod
+    def Restore(cls, path, source=None):
+        """Load a class tree saved by :meth:`_Constant.Snapshot`.
+
+        :param path: file path.
+        :param source: the current source of the tree, if it's hash doesn't
+            match the snapshot, it is outdated. None means don't check.
+        :returns: the root class, or None if the snapshot doesn't exist or
+            is outdated.
+
+        .. versionadded:: 0.0.14
+        """
+        return restore(path, source_key(source))
 
     @classmethod
     def pprint(cls):  # pragma: no cover
@@ -490,13 +1937,25 @@ _reserved_attrs = {
     "items", "keys", "values",
     "ToDict", "to_dict",
     "Subclasses", "subclasses",
+    "IterSubclasses", "iter_subclasses",
     "GetFirst", "get_first",
     "GetAll", "get_all",
+    "GetRange", "get_range",
+    "Where", "where",
+    "ToColumns", "Filter", "GroupBy", "Aggregate",
+    "Walk", "Lookup", "IterPrefix", "FindDeep", "FindDeepAll",
     "ToIds", "to_ids",
     "SubIds", "sub_ids",
-    "BackAssign",
+    "BackAssign", "BackAssignMany",
+    "Join", "Traverse",
+    "Freeze", "Snapshot", "Restore",
+    "Fingerprint", "fingerprint", "Generation", "CacheInfo",
+    "Diff", "Patch",
     "ToClasses", "to_instances",
+    "IterClasses", "iter_instances",
     "dump", "load", "pprint", "jprint",
+    "dump_stream", "load_stream",
+    "FromRecords", "FromCSV",
 }
 
 
@@ -506,7 +1965,7 @@ class Meta(type):
 
     def __new__(cls, name, bases, attrs):
         klass = super(Meta, cls).__new__(cls, name, bases, attrs)
-        for attr in attrs:
+        for attr, value in attrs.items():
             # Make sure reserved attributes are not been overridden
             if attr in _reserved_attrs:
                 if (is_class_method(klass, attr) or is_regular_method(klass, attr)):
@@ -519,15 +1978,58 @@ class Meta(type):
                     raise AttributeError(
                         "%r is not a valid attribute name" % attr
                     )
-
+            elif isinstance(value, Meta):
+                add_parent(value, klass)
+        # the manifest is built on first read, see _get_manifest
         return klass
 
+    def __getattr__(cls, attr):
+        # nested class of a lazy loaded class
+        raw_children = cls.__dict__.get("__raw_children__")
+        if raw_children is not None:
+            if attr in raw_children:
+                return _materialize(cls, attr)
+            # materialized by another thread after the normal lookup
+            if attr in cls.__dict__:
+                return cls.__dict__[attr]
+        raise AttributeError(
+            "type object %r has no attribute %r" % (cls.__name__, attr))
+
+    def __instancecheck__(cls, instance):
+        # compact instance doesn't inherit from it's Constant class
+        klass = type(instance).__dict__.get("__constant__")
+        if klass is not None:
+            return issubclass(klass, cls)
+        return super(Meta, cls).__instancecheck__(instance)
+
+    def __setattr__(cls, attr, value):
+        if _is_frozen(cls):
+            raise AttributeError("%s is frozen" % cls.__name__)
+        super(Meta, cls).__setattr__(attr, value)
+        if not _is_builtin_name(attr):
+            if isinstance(value, Meta):
+                add_parent(value, cls)
+            _invalidate(cls)
+            on_change(cls, attr)
+
+    def __delattr__(cls, attr):
+        if _is_frozen(cls):
+            raise AttributeError("%s is frozen" % cls.__name__)
+        super(Meta, cls).__delattr__(attr)
+        if not _is_builtin_name(attr):
+            _invalidate(cls)
+            on_change(cls, attr)
+
 
 @add_metaclass(Meta)
 class Constant(_Constant):
     pass
 
 
+# manifest of every other class is derived from it
+_get_manifest(Constant)
+
+
 def is_same_dict(d1, d2):
     """Test two dictionary is equal on values. (ignore order)
     """
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+How class attribute value is copied to a new Constant instance, see
+:attr:`constant2._constant2._Constant.__copy_policy__`.
+
+Immutable value is always shared. Mutable value is copied by the policy:
+
+- ``"deep"``: ``copy.deepcopy``, the default.
+- ``"shallow"``: ``copy.copy``.
+- ``"share"``: not copied, all instance and the class share the same object.
+- ``"cow"``: copy on write. list, dict, set containing only immutable value
+  is wrapped by a proxy reading the class value, it is copied on the first
+  modification. Other value is deep copied.
+
+The copy on write proxy implements ``MutableSequence``, ``MutableMapping`` or
+``MutableSet``, plus ``+`` and ``*`` of list and ``|`` of dict, but it is not
+a ``list``, ``dict`` or ``set`` instance, so ``isinstance(value, list)`` is
+False and ``json.dumps`` doesn't accept it. ``items()``, ``values()`` and
+``to_dict()`` of the instance return the builtin value owned by the proxy,
+call :meth:`CowProxy.own` to get it from the attribute directly.
+"""
+
+from copy import copy, deepcopy
+
+try:
+    from collections.abc import MutableSequence, MutableMapping, MutableSet
+except ImportError:  # pragma: no cover, python2
+    from collections import MutableSequence, MutableMapping, MutableSet
+
+try:
+    from .pkg.sixmini import integer_types, string_types
+except:  # pragma: no cover
+    from constant2.pkg.sixmini import integer_types, string_types
+
+_immutable_types = (
+    type(None), bool, float, complex, type,
+) + integer_types + string_types + (bytes,)
+
+
+def is_immutable(value):
+    """Test if a value never needs to be copied.
+    """
+    if isinstance(value, _immutable_types):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        return all(is_immutable(v) for v in value)
+    return False
+
+
+class CowProxy(object):
+    """Base class of copy on write proxy, ``_data`` is the shared value until
+    the proxy is modified.
+    """
+    __slots__ = ("_data", "_owned")
+
+    def __init__(self, data):
+        self._data = data
+        self._owned = False
+
+    def own(self):
+        """Copy the shared value if it is not copied yet, return the value
+        owned by this proxy, modifying it modifies the proxy.
+        """
+        if not self._owned:
+            self._data = copy(self._data)
+            self._owned = True
+        return self._data
+
+    def unwrap(self):
+        """The underlying value, don't modify it.
+        """
+        return self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __contains__(self, value):
+        return value in self._data
+
+    def __eq__(self, other):
+        if isinstance(other, CowProxy):
+            other = other._data
+        return self._data == other
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self._data)
+
+    def __deepcopy__(self, memo):
+        return deepcopy(self._data, memo)
+
+
+class CowList(CowProxy, MutableSequence):
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        return self._data[index]
+
+    def __setitem__(self, index, value):
+        self.own()[index] = value
+
+    def __delitem__(self, index):
+        del self.own()[index]
+
+    def insert(self, index, value):
+        self.own().insert(index, value)
+
+    def sort(self, *args, **kwargs):
+        self.own().sort(*args, **kwargs)
+
+    def copy(self):
+        return list(self._data)
+
+    def __add__(self, other):
+        if isinstance(other, CowProxy):
+            other = other._data
+        return list(self._data) + other
+
+    def __radd__(self, other):
+        return other + list(self._data)
+
+    def __mul__(self, n):
+        return list(self._data) * n
+
+    __rmul__ = __mul__
+
+
+class CowDict(CowProxy, MutableMapping):
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self.own()[key] = value
+
+    def __delitem__(self, key):
+        del self.own()[key]
+
+    def copy(self):
+        return dict(self._data)
+
+    def __or__(self, other):
+        if isinstance(other, CowProxy):
+            other = other._data
+        result = dict(self._data)
+        result.update(other)
+        return result
+
+    def __ror__(self, other):
+        result = dict(other)
+        result.update(self._data)
+        return result
+
+
+class CowSet(CowProxy, MutableSet):
+    __slots__ = ()
+
+    def add(self, value):
+        self.own().add(value)
+
+    def discard(self, value):
+        self.own().discard(value)
+
+    def copy(self):
+        return set(self._data)
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return set(iterable)
+
+
+_cow_classes = {
+    list: CowList,
+    dict: CowDict,
+    set: CowSet,
+}
+
+
+def _is_shallow_immutable(value):
+    if isinstance(value, dict):
+        return all(
+            is_immutable(k) and is_immutable(v) for k, v in value.items())
+    return all(is_immutable(v) for v in value)
+
+
+def _make_cow(value):
+    cow_class = _cow_classes.get(type(value))
+    if (cow_class is None) or (not _is_shallow_immutable(value)):
+        return deepcopy
+    return cow_class
+
+
+policies = {
+    "deep": lambda value: deepcopy,
+    "shallow": lambda value: copy,
+    "share": lambda value: None,
+    "cow": _make_cow,
+}
+
+
+def get_copier(value, policy):
+    """
+    :returns: function copies the value, None if the value can be shared.
+    """
+    if is_immutable(value):
+        return None
+    try:
+        return policies[policy](value)
+    except KeyError:
+        raise ValueError("unknown copy policy %r, choose from %s" % (
+            policy, ", ".join(sorted(policies))))
+
+
+def make_plan(items, policy):
+    """How to copy each attribute value.
+
+    :param items: (attr, value) pairs.
+    :param policy: a policy name, or dict of attr -> policy name, attribute
+        not in the dict uses ``"deep"``.
+    :returns: tuple of (attr, value, copier or None).
+    """
+    plan = list()
+    for attr, value in items:
+        if isinstance(policy, dict):
+            attr_policy = policy.get(attr, "deep")
+        else:
+            attr_policy = policy
+        plan.append((attr, value, get_copier(value, attr_policy)))
+    return tuple(plan)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Structural diff and patch of nested Constant class, see
+:meth:`constant2._constant2._Constant.Diff`.
+
+Patch is a list of operation, similar to json patch::
+
+    {"op": "add", "path": "Fruit.Kiwi", "value": {"Kiwi": {...}}}
+    {"op": "replace", "path": "Fruit.Apple.id", "value": 2}
+    {"op": "remove", "path": "Meat"}
+
+Path is the dotted attribute path from the root class. Value of a nested
+class is it's :meth:`constant2._constant2._Constant.dump` data.
+"""
+
+from copy import deepcopy
+
+try:
+    from ._fingerprint import _encode
+except:  # pragma: no cover
+    from constant2._fingerprint import _encode
+
+
+class TreeDiff(object):
+    """Result of :meth:`constant2._constant2._Constant.Diff`.
+
+    :param added: dotted path of nested class and attribute only in the new
+        tree.
+    :param removed: dotted path of nested class and attribute only in the
+        old tree.
+    :param changed: dotted path of attribute having different value, or
+        changed between nested class and attribute.
+    :param ops: the patch turns the old tree into the new tree, see
+        :meth:`constant2._constant2._Constant.Patch`.
+
+    .. versionadded:: 0.0.14
+    """
+
+    def __init__(self, added, removed, changed, ops):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.ops = ops
+
+    def __bool__(self):
+        return bool(self.ops)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return "TreeDiff(added=%r, removed=%r, changed=%r)" % (
+            self.added, self.removed, self.changed)
+
+
+def _dump_value(value, is_class):
+    return value.dump() if is_class else deepcopy(value)
+
+
+def diff(old, new, get_items, get_subclasses, get_fingerprint):
+    """Compare two class tree, subtree having the same fingerprint is
+    skipped.
+    """
+    added, removed, changed, ops = list(), list(), list(), list()
+    stack = [("", old, new)]
+    while stack:
+        prefix, old, new = stack.pop()
+        if get_fingerprint(old) == get_fingerprint(new):
+            continue
+
+        old_subclasses = dict(get_subclasses(old))
+        new_subclasses = dict(get_subclasses(new))
+        old_values = dict(get_items(old))
+        old_values.update(old_subclasses)
+        new_values = dict(get_items(new))
+        new_values.update(new_subclasses)
+
+        nested = list()
+        for attr in sorted(set(old_values) | set(new_values)):
+            path = prefix + attr
+            if attr not in new_values:
+                removed.append(path)
+                ops.append({"op": "remove", "path": path})
+            elif attr not in old_values:
+                added.append(path)
+                ops.append({
+                    "op": "add", "path": path,
+                    "value": _dump_value(
+                        new_values[attr], attr in new_subclasses),
+                })
+            elif (attr in old_subclasses) and (attr in new_subclasses):
+                nested.append(
+                    (path + ".", old_subclasses[attr], new_subclasses[attr]))
+            elif (attr in old_subclasses) or (attr in new_subclasses) or \
+                    (_encode(old_values[attr]) != _encode(new_values[attr])):
+                changed.append(path)
+                ops.append({
+                    "op": "replace", "path": path,
+                    "value": _dump_value(
+                        new_values[attr], attr in new_subclasses),
+                })
+        stack.extend(reversed(nested))
+
+    return TreeDiff(sorted(added), sorted(removed), sorted(changed), ops)
+
+
+def _is_class_data(value):
+    if isinstance(value, dict) and len(value) == 1:
+        for data in value.values():
+            return isinstance(data, dict) and ("__classname__" in data)
+    return False
+
+
+def _resolve(root, path, changed):
+    """The class having the last attribute of ``path``.
+
+    :param changed: dict of path set or removed by the previous operation ->
+        the new value, or ``_removed``. Class under a path set by the
+        previous operation doesn't exist yet and is not checked.
+    :returns: the parent class, None if it is set by the previous operation.
+    """
+    parent = root
+    prefix = ""
+    for name in path.split(".")[:-1]:
+        prefix = prefix + name
+        if prefix in changed:
+            if not isinstance(changed[prefix], type):
+                raise ValueError("%r is not a nested class" % prefix)
+            return None
+        parent = getattr(parent, name, None)
+        if not isinstance(parent, type):
+            raise ValueError("%r is not a nested class" % prefix)
+        prefix = prefix + "."
+    return parent
+
+
+_removed = object()
+
+
+def patch(root, ops, load):
+    """Apply patch operations to a class tree in place. All operation is
+    checked, and all nested class is created, before the tree is modified.
+
+    :param load: function create class from dumped data.
+    """
+    prepared = list()
+    changed = dict()
+    for op in ops:
+        kind, path = op.get("op"), op.get("path")
+        if kind not in ("add", "replace", "remove"):
+            raise ValueError("unknown patch operation %r" % kind)
+        if not path:
+            raise ValueError("patch operation %r has no path" % kind)
+        parent = _resolve(root, path, changed)
+        attr = path.rpartition(".")[2]
+        if parent is not None:
+            if parent.__dict__.get("__frozen__", False):
+                raise ValueError("can't patch %r, %s is frozen" % (
+                    path, parent.__name__))
+            if kind == "remove":
+                getattr(parent, attr, None)  # create lazy loaded nested class
+            if (kind == "remove") and (attr not in parent.__dict__) and \
+                    (path not in changed):
+                raise ValueError(
+                    "can't remove %r, it is inherited or doesn't exist" %
+                    path)
+        if (kind == "remove") and (changed.get(path) is _removed):
+            raise ValueError("can't remove %r, it is already removed" % path)
+
+        if kind == "remove":
+            value = _removed
+        elif "value" not in op:
+            raise ValueError("patch operation %r has no value" % path)
+        elif _is_class_data(op["value"]):
+            value = load(op["value"])
+        else:
+            value = deepcopy(op["value"])
+        changed[path] = value
+        prepared.append((path, value))
+
+    for path, value in prepared:
+        names = path.split(".")
+        parent = root
+        for name in names[:-1]:
+            parent = getattr(parent, name)
+        if value is _removed:
+            delattr(parent, names[-1])
+        else:
+            setattr(parent, names[-1], value)
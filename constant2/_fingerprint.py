@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Merkle style content hash of nested Constant class and instance, see
+:meth:`constant2._constant2._Constant.Fingerprint`.
+
+The fingerprint of a node is the sha256 of it's non-class attributes and the
+(attribute name, fingerprint) of it's nested nodes, so an unchanged subtree
+has an unchanged fingerprint. Name of the node itself is not included.
+"""
+
+import hashlib
+
+try:
+    from .pkg.sixmini import integer_types, string_types
+    from ._copy import CowProxy
+except:  # pragma: no cover
+    from constant2.pkg.sixmini import integer_types, string_types
+    from constant2._copy import CowProxy
+
+
+def _encode(value):
+    """Deterministic text representation of a value, it doesn't depend on
+    the order of dict and set.
+    """
+    if isinstance(value, CowProxy):
+        value = value.unwrap()
+    if value is None:
+        return "N"
+    if isinstance(value, bool):
+        return "T" if value else "F"
+    if isinstance(value, integer_types):
+        return "i%d" % value
+    if isinstance(value, float):
+        return "f%r" % value
+    if isinstance(value, string_types):
+        return "s%d:%s" % (len(value), value)
+    if isinstance(value, bytes):
+        return "b%d:%r" % (len(value), value)
+    if isinstance(value, (list, tuple)):
+        tag = "l" if isinstance(value, list) else "t"
+        return "%s%d[%s]" % (tag, len(value), ",".join(
+            _encode(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return "S%d[%s]" % (len(value), ",".join(
+            sorted(_encode(v) for v in value)))
+    if isinstance(value, dict):
+        return "d%d{%s}" % (len(value), ",".join(sorted(
+            "%s:%s" % (_encode(k), _encode(v)) for k, v in value.items())))
+    if isinstance(value, type):
+        # class as a value, for example relationship between entities
+        return "c%s.%s" % (
+            value.__module__, getattr(value, "__qualname__", value.__name__))
+    return "r%r" % (value,)
+
+
+def compute(root, get_items, get_children, get_cached=None, set_cached=None):
+    """Compute the fingerprint of a tree, children first, without recursion.
+
+    :param get_items: function takes a node, returns (attr, value) pairs.
+    :param get_children: function takes a node, returns (attr, node) pairs.
+    :param get_cached: function takes a node, returns it's cached
+        fingerprint or None.
+    :param set_cached: function takes a node and it's fingerprint.
+    :returns: hex digest.
+    """
+    fingerprints = dict()  # id(node) -> fingerprint
+    on_path = set()
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not expanded:
+            if id(node) in fingerprints:
+                continue
+            if get_cached is not None:
+                fingerprint = get_cached(node)
+                if fingerprint is not None:
+                    fingerprints[id(node)] = fingerprint
+                    continue
+            if id(node) in on_path:
+                raise ValueError("%r contains itself" % (node,))
+            on_path.add(id(node))
+            stack.append((node, True))
+            for _, child in get_children(node):
+                stack.append((child, False))
+            continue
+
+        sha256 = hashlib.sha256()
+        for attr, value in get_items(node):
+            sha256.update(("%s=%s;" % (attr, _encode(value))).encode("utf-8"))
+        for attr, child in get_children(node):
+            sha256.update(
+                ("%s>%s;" % (attr, fingerprints[id(child)])).encode("utf-8"))
+        fingerprint = sha256.hexdigest()
+        fingerprints[id(node)] = fingerprint
+        on_path.discard(id(node))
+        if set_cached is not None:
+            set_cached(node, fingerprint)
+    return fingerprints[id(root)]
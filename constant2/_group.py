@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Group and aggregate nested Constant class by attribute value, see
+:meth:`constant2._constant2._Constant.GroupBy`. Computed over the columns of
+:meth:`constant2._constant2._Constant.ToColumns`, number column is
+aggregated by NumPy if it is installed.
+"""
+
+import math
+from collections import OrderedDict
+
+try:
+    from ._columns import np, _INT64_MAX
+except:  # pragma: no cover
+    from constant2._columns import np, _INT64_MAX
+
+
+def _mean(values):
+    if not values:
+        raise ValueError("mean() arg is an empty sequence")
+    return float(sum(values)) / len(values)
+
+
+def _is_nan(value):
+    return isinstance(value, float) and math.isnan(value)
+
+
+def _skip_nan(values):
+    """NaN is ignored by min and max, unless all values are NaN, the same as
+    ``numpy.fmin`` and ``numpy.fmax``.
+    """
+    present = [value for value in values if not _is_nan(value)]
+    return present if present else values
+
+
+def _min(values):
+    return min(_skip_nan(values))
+
+
+def _max(values):
+    return max(_skip_nan(values))
+
+
+aggregators = {
+    "count": len,
+    "sum": sum,
+    "min": _min,
+    "max": _max,
+    "mean": _mean,
+}
+
+
+def _to_list(column):
+    # NumPy scalar is converted to python value
+    if (np is not None) and isinstance(column, np.ndarray):
+        return column.tolist()
+    return column
+
+
+def _present_rows(columns, attrs):
+    """Row numbers having all the attributes.
+    """
+    masks = [columns.present(attr) for attr in attrs]
+    return [i for i, flags in enumerate(zip(*masks)) if all(flags)]
+
+
+def _unhashable_error(columns, attr, i):
+    return TypeError(
+        "can't group by %r, value %r of %s is unhashable" % (
+            attr, _to_list(columns[attr])[i], columns.klasses[i].__name__))
+
+
+def group_by(columns, attr):
+    """Nested class grouped by the value of ``attr``, in one pass. Group is
+    ordered by it's first class, class without the attribute is skipped.
+
+    :returns: OrderedDict of value -> tuple of class.
+    :raises TypeError: if any value is unhashable, for example a list.
+    """
+    if attr not in columns:
+        return OrderedDict()
+    column = _to_list(columns[attr])
+    groups = OrderedDict()
+    for i in _present_rows(columns, [attr, ]):
+        try:
+            group = groups.setdefault(column[i], list())
+        except TypeError:
+            raise _unhashable_error(columns, attr, i)
+        group.append(columns.klasses[i])
+    return OrderedDict(
+        (value, tuple(klasses)) for value, klasses in groups.items())
+
+
+def _get_func(func):
+    if callable(func):
+        return func
+    try:
+        return aggregators[func]
+    except KeyError:
+        raise ValueError("unknown aggregate function %r, choose from %s" % (
+            func, ", ".join(sorted(aggregators))))
+
+
+def _vectorized(column, codes, n_group, func):
+    """Aggregate a number column by group code with NumPy, the result is the
+    same as the python aggregate function, except the rounding error of
+    float sum.
+
+    :returns: list of python value by group code, None if it can't be
+        vectorized.
+    """
+    if (np is None) or callable(func) or (column.dtype.kind not in "iuf"):
+        return None
+    counts = np.bincount(codes, minlength=n_group).tolist()
+    if func == "count":
+        return counts
+    if func in ("sum", "mean"):
+        if column.dtype.kind in "iu":
+            # sum of int64 may overflow, python int doesn't
+            largest = max(-int(column.min()), int(column.max()))
+            if largest * len(column) > _INT64_MAX:
+                return None
+            sums = np.zeros(n_group, dtype=np.int64)
+        else:
+            sums = np.zeros(n_group, dtype=np.float64)
+        np.add.at(sums, codes, column)
+        sums = sums.tolist()
+        if func == "mean":
+            return [float(s) / count for s, count in zip(sums, counts)]
+        return sums
+    if column.dtype.kind == "f":
+        # NaN is ignored unless all values of the group are NaN
+        result = np.full(n_group, np.nan)
+        ufunc = np.fmin if func == "min" else np.fmax
+    elif func == "min":
+        # every group has at least one value, start from the other extreme
+        result = np.full(n_group, column.max(), dtype=column.dtype)
+        ufunc = np.minimum
+    else:
+        result = np.full(n_group, column.min(), dtype=column.dtype)
+        ufunc = np.maximum
+    ufunc.at(result, codes, column)
+    return result.tolist()
+
+
+def aggregate(columns, attr, func, by=None):
+    """Aggregate the value of ``attr`` of all nested class having it.
+
+    :param func: "count", "sum", "min", "max", "mean" or a function takes a
+        list of values. "min" and "max" ignore NaN, unless all values are
+        NaN.
+    :param by: if not None, aggregate each group of
+        :func:`group_by` ``by``.
+    :returns: a single value, or OrderedDict of group value -> value if
+        ``by`` is given.
+    :raises TypeError: if any value of ``by`` is unhashable.
+    """
+    python_func = _get_func(func)
+    attrs = [attr, ] if by is None else [attr, by]
+    if any(a not in columns for a in attrs):
+        return python_func([]) if by is None else OrderedDict()
+
+    rows = _present_rows(columns, attrs)
+    column = columns[attr]
+    if by is None:
+        if np is not None and rows:
+            result = _vectorized(
+                column[rows], np.zeros(len(rows), dtype=np.intp), 1, func)
+            if result is not None:
+                return result[0]
+        column = _to_list(column)
+        return python_func([column[i] for i in rows])
+
+    keys = _to_list(columns[by])
+    group_codes = OrderedDict()
+    codes = list()
+    for i in rows:
+        try:
+            codes.append(group_codes.setdefault(keys[i], len(group_codes)))
+        except TypeError:
+            raise _unhashable_error(columns, by, i)
+
+    if np is not None and rows:
+        result = _vectorized(
+            column[rows], np.array(codes, dtype=np.intp),
+            len(group_codes), func)
+        if result is not None:
+            return OrderedDict(zip(group_codes, result))
+
+    column = _to_list(column)
+    values = [list() for _ in group_codes]
+    for code, i in zip(codes, rows):
+        values[code].append(column[i])
+    return OrderedDict(
+        (key, python_func(group_values))
+        for key, group_values in zip(group_codes, values))
@@ -0,0 +1,433 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Index data structures used to answer lookup on nested Constant class.
+"""
+
+import math
+import threading
+import weakref
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, namedtuple
+
+try:
+    from .pkg.sixmini import integer_types
+except:  # pragma: no cover
+    from constant2.pkg.sixmini import integer_types
+
+number_types = integer_types + (float,)
+
+
+def is_close(actual, expected, e):
+    """Float comparison, works the same way as ``actual == approx(expected, e)``.
+
+    :param e: relative tolerance, absolute tolerance is always ``1e-12``.
+    """
+    try:
+        # Short-circuit exact equality.
+        if actual == expected:
+            return True
+        # Infinity is only equal to itself.
+        if math.isinf(abs(expected)):
+            return False
+        return abs(expected - actual) <= max(e * abs(expected), 1e-12)
+    except Exception:
+        return False
+
+
+def is_equal(actual, expected, e):
+    """Use tolerance comparison for float, otherwise use ``==``.
+    """
+    if isinstance(expected, float):
+        return is_close(actual, expected, e)
+    try:
+        return bool(actual == expected)
+    except Exception:
+        return False
+
+
+def is_number(value):
+    """Test if a value can be put in :class:`SortedIndex`.
+    """
+    return isinstance(value, number_types) and value == value  # exclude nan
+
+
+def tolerance_range(value, e):
+    """The ``(lo, hi)`` range of all number that ``is_close(x, value, e)``.
+    """
+    if math.isinf(value):
+        return value, value
+    tolerance = max(e * abs(value), 1e-12)
+    return value - tolerance, value + tolerance
+
+
+class HashIndex(object):
+    """Map attribute value to list of class, classes are ordered by the order
+    they are added.
+
+    - hashable value is looked up in O(1).
+    - unhashable value is compared one by one.
+
+    ``positions`` maps ``id(klass)`` to the order it is first added, it is
+    used to merge the result of multiple value.
+
+    :param pairs: iterable of (value, klass) pairs.
+
+    .. versionadded:: 0.0.14
+    """
+    __slots__ = ("table", "unhashable", "positions")
+
+    def __init__(self, pairs=()):
+        self.table = dict()
+        self.unhashable = list()
+        self.positions = dict()
+        for value, klass in pairs:
+            self.add(value, klass)
+
+    def add(self, value, klass):
+        self.positions.setdefault(id(klass), len(self.positions))
+        try:
+            try:
+                self.table[value].append(klass)
+            except KeyError:
+                self.table[value] = [klass, ]
+        except TypeError:
+            self.unhashable.append((value, klass))
+
+    def __getstate__(self):
+        # positions is keyed by id, which changes after unpickling
+        klasses = dict()
+        for klass_list in self.table.values():
+            for klass in klass_list:
+                klasses[id(klass)] = klass
+        for _, klass in self.unhashable:
+            klasses[id(klass)] = klass
+        positions = [
+            (klasses[klass_id], position)
+            for klass_id, position in self.positions.items()
+        ]
+        return self.table, self.unhashable, positions
+
+    def __setstate__(self, state):
+        self.table, self.unhashable, positions = state
+        self.positions = dict(
+            (id(klass), position) for klass, position in positions)
+
+    def find(self, value):
+        """Find all class that ``klass.attr == value``.
+
+        :returns: a list of class, it could be shared by the index, don't
+            modify it.
+        """
+        try:
+            return self.table.get(value, [])
+        except TypeError:
+            return [
+                klass for v, klass in self.unhashable
+                if is_equal(v, value, 0)
+            ]
+
+
+class SortedIndex(object):
+    """Number value of an attribute in ascending order, supports range query
+    in O(log N + K) by binary search.
+
+    Non-number value and ``nan`` are ignored.
+
+    :param pairs: iterable of (value, klass) pairs, the position of the pair
+        is used to sort the class having the same value.
+
+    .. versionadded:: 0.0.14
+    """
+    __slots__ = ("keys", "entries")
+
+    def __init__(self, pairs=()):
+        decorated = [
+            (value, position, klass)
+            for position, (value, klass) in enumerate(pairs)
+            if is_number(value)
+        ]
+        decorated.sort(key=lambda x: (x[0], x[1]))
+        self.keys = [value for value, _, _ in decorated]
+        self.entries = [(position, klass) for _, position, klass in decorated]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _slice(self, lo=None, hi=None, include_lo=True, include_hi=True):
+        if lo is None:
+            start = 0
+        elif include_lo:
+            start = bisect_left(self.keys, lo)
+        else:
+            start = bisect_right(self.keys, lo)
+
+        if hi is None:
+            end = len(self.keys)
+        elif include_hi:
+            end = bisect_right(self.keys, hi)
+        else:
+            end = bisect_left(self.keys, hi)
+        return start, end
+
+    def count(self, lo=None, hi=None, include_lo=True, include_hi=True):
+        """Number of class that ``lo <= klass.attr <= hi``.
+        """
+        start, end = self._slice(lo, hi, include_lo, include_hi)
+        return max(end - start, 0)
+
+    def range_entries(self, lo=None, hi=None, include_lo=True, include_hi=True):
+        """(position, klass) pairs of all class that
+        ``lo <= klass.attr <= hi``, ordered by value.
+        """
+        start, end = self._slice(lo, hi, include_lo, include_hi)
+        return self.entries[start:end]
+
+    def range(self, lo=None, hi=None):
+        """All class that ``lo <= klass.attr <= hi``, ordered by value.
+
+        :param lo: lower bound, ``None`` means no lower bound.
+        :param hi: upper bound, ``None`` means no upper bound.
+        """
+        start, end = self._slice(lo, hi)
+        return [klass for _, klass in self.entries[start:end]]
+
+    def find(self, value, e=0.000001):
+        """All class that ``klass.attr == approx(value, e)``, ordered by the
+        position they are added.
+        """
+        lo, hi = tolerance_range(value, e)
+        # range boundary may off by float rounding error, search in a
+        # slightly wider range and double check the candidates.
+        if lo != hi:
+            slack = (hi - lo) / 2
+            lo, hi = lo - slack, hi + slack
+        start, end = self._slice(lo, hi)
+        matched = [
+            (position, klass)
+            for (position, klass), v in zip(
+                self.entries[start:end], self.keys[start:end])
+            if is_close(v, value, e)
+        ]
+        matched.sort(key=lambda x: x[0])
+        return [klass for _, klass in matched]
+
+
+# building an index is guarded by one of these locks, picked by the class,
+# so concurrent lookup on the same class builds the index only once, and
+# lookup on different classes rarely waits for each other.
+_stripes = tuple(threading.RLock() for _ in range(64))
+
+
+def stripe_lock(klass):
+    return _stripes[hash(klass) % len(_stripes)]
+
+
+_generation_lock = threading.Lock()
+_generation = [0]  # the last generation number taken
+
+
+def next_generation():
+    """Take a new generation number, it increases on every change of any
+    Constant class.
+    """
+    with _generation_lock:
+        _generation[0] += 1
+        return _generation[0]
+
+
+def get_generation(klass):
+    """Generation of a class, it changes when the class or any nested class
+    is changed. It is 0 if it has never been changed.
+    """
+    klass = klass.__dict__.get("__constant__", klass)
+    return klass.__dict__.get("__generation__", 0)
+
+
+def add_parent(klass, parent):
+    """Register ``parent`` as a Constant class having ``klass`` as a nested
+    class, a change of ``klass`` gives ``parent`` a new generation. Parent is
+    weakly referenced.
+    """
+    parents = klass.__dict__.get("__parents__")
+    if parents is None:
+        # a set of weakref is much lighter than a WeakSet
+        parents = set()
+        type.__setattr__(klass, "__parents__", parents)
+    parents.add(weakref.ref(parent))
+
+
+def iter_parents(klass):
+    """Yield all registered parent of a class that is still alive.
+    """
+    parents = klass.__dict__.get("__parents__")
+    if not parents:
+        return
+    for ref in tuple(parents):
+        parent = ref()
+        if parent is None:
+            parents.discard(ref)
+        else:
+            yield parent
+
+
+CacheInfo = namedtuple("CacheInfo", "hits misses evictions size maxsize")
+
+
+if hasattr(OrderedDict, "move_to_end"):
+    def _move_to_end(d, key):
+        d.move_to_end(key)
+
+    def _pop_oldest(d):
+        d.popitem(last=False)
+else:  # pragma: no cover, python2
+    # OrderedDict.pop and popitem of python2 call the overridden
+    # __getitem__, which moves the key again
+    def _move_to_end(d, key):
+        value = OrderedDict.__getitem__(d, key)
+        OrderedDict.__delitem__(d, key)
+        OrderedDict.__setitem__(d, key, value)
+
+    def _pop_oldest(d):
+        try:
+            key = next(iter(d))
+        except StopIteration:
+            raise KeyError("dictionary is empty")
+        OrderedDict.__delitem__(d, key)
+
+
+class CacheStats(object):
+    """Counters of the cache of a class, kept across generations.
+    """
+    __slots__ = ("hits", "misses", "evictions")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+class Cache(OrderedDict):
+    """A dict valid for one generation. If ``maxsize`` is not None, it keeps
+    at most ``maxsize`` entries, the least recently used one is evicted.
+    """
+
+    def __init__(self, generation, maxsize=None, stats=None):
+        OrderedDict.__init__(self)
+        self.generation = generation
+        self.maxsize = maxsize
+        self.stats = CacheStats() if stats is None else stats
+
+    def __getitem__(self, key):
+        try:
+            value = OrderedDict.__getitem__(self, key)
+        except KeyError:
+            self.stats.misses += 1
+            raise
+        self.stats.hits += 1
+        if self.maxsize is not None:
+            try:
+                _move_to_end(self, key)
+            except KeyError:  # evicted by another thread
+                pass
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        OrderedDict.__setitem__(self, key, value)
+        if self.maxsize is not None:
+            while len(self) > self.maxsize:
+                try:
+                    _pop_oldest(self)
+                except KeyError:  # pragma: no cover, emptied by another thread
+                    break
+                self.stats.evictions += 1
+
+
+def get_cache(klass):
+    """Per class storage for everything derived from the nested class, such
+    as value index. It is valid only for the generation of the class, so it
+    is replaced by an empty one after anything in the tree changes. A value
+    computed from the old tree is stored in the old one and never seen by
+    later lookup.
+
+    Max number of entries is the ``__cache_size__`` class attribute.
+    """
+    namespace = klass.__dict__
+    constant_klass = namespace.get("__constant__")
+    if constant_klass is not None:
+        klass, namespace = constant_klass, constant_klass.__dict__
+    cache = namespace.get("__cache__")
+    generation = namespace.get("__generation__", 0)
+    if (cache is None) or (cache.generation != generation):
+        cache = Cache(
+            generation,
+            getattr(klass, "__cache_size__", None),
+            None if cache is None else cache.stats,
+        )
+        type.__setattr__(klass, "__cache__", cache)
+    return cache
+
+
+def cache_info(klass):
+    """
+    :returns: :class:`CacheInfo` of the cache of a class.
+    """
+    cache = get_cache(klass)
+    stats = cache.stats
+    return CacheInfo(
+        stats.hits, stats.misses, stats.evictions, len(cache), cache.maxsize)
+
+
+index_classes = {
+    "hash": HashIndex,
+    "sorted": SortedIndex,
+}
+
+
+def get_index(klass, kind, attr, sort_by=None, inherited=False):
+    """Get the index of ``attr`` over all nested class, build it on first use.
+
+    :param kind: "hash" for :class:`HashIndex`, "sorted" for
+        :class:`SortedIndex`.
+    :param sort_by: nested class is ordered by <sort_by> attribute.
+    :param inherited: if False, only use the attribute defined in the nested
+        class itself, which is how :meth:`_Constant.GetFirst` works.
+    """
+    key = (kind, attr, sort_by, inherited)
+    try:
+        return get_cache(klass)[key]
+    except KeyError:
+        pass
+
+    with stripe_lock(klass):
+        # it may have been built while waiting for the lock
+        cache = get_cache(klass)
+        try:
+            return cache[key]
+        except KeyError:
+            pass
+        index = index_classes[kind](
+            iter_values(klass, attr, sort_by, inherited))
+        cache[key] = index
+        return index
+
+
+def iter_values(klass, attr, sort_by=None, inherited=False):
+    """Yield (value, subclass) pairs of all nested class having ``attr``.
+    """
+    for _, subclass in klass.Subclasses(sort_by=sort_by):
+        try:
+            if inherited:
+                value = getattr(subclass, attr)
+            else:
+                value = subclass.__dict__[attr]
+        except (KeyError, AttributeError):
+            continue
+        yield value, subclass
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Follow relationship fields between Constant entities, see
+:meth:`constant2._constant2._Constant.Join`.
+"""
+
+from collections import deque
+
+try:
+    from ._index import get_cache, get_generation, Cache
+except:  # pragma: no cover
+    from constant2._index import get_cache, get_generation, Cache
+
+#: max number of memoized results, the least recently used one is evicted.
+MEMO_SIZE = 4096
+
+# (start, hops) or ("traverse", start, field, max_depth) ->
+# (frozenset of reached entities, ((entity, generation), ...)), result of
+# every hop is stored. The result is valid while all entities it has read
+# the field of keep their generation, change of other class doesn't
+# affect it.
+_memo = Cache(0, MEMO_SIZE)
+
+
+def _get_valid(memo, key):
+    """
+    :returns: the memoized (result, dependencies), None if it is not found
+        or any entity it depends on has changed.
+    """
+    entry = memo.get(key)
+    if entry is None:
+        return None
+    for entity, generation in entry[1]:
+        if get_generation(entity) != generation:
+            return None
+    return entry
+
+
+def _is_entity(value):
+    return isinstance(value, type) and hasattr(value, "__creation_index__")
+
+
+def neighbors(entity, field):
+    """Adjacency list of an entity, the value of ``entity.field`` as a tuple.
+    It is stored in the per class cache of the entity.
+    """
+    if not _is_entity(entity):
+        return ()
+    cache = get_cache(entity)
+    key = ("adjacency", field)
+    try:
+        return cache[key]
+    except KeyError:
+        pass
+
+    value = getattr(entity, field, None)
+    if value is None:
+        adjacency = ()
+    elif isinstance(value, (tuple, list, set, frozenset)):
+        adjacency = tuple(v for v in value if v is not None)
+    else:
+        adjacency = (value,)
+    cache[key] = adjacency
+    return adjacency
+
+
+def _read_neighbors(entity, field, dependencies):
+    """:func:`neighbors`, the generation of the entity is recorded in
+    ``dependencies`` before it is read.
+    """
+    if _is_entity(entity):
+        dependencies.setdefault(entity, get_generation(entity))
+    return neighbors(entity, field)
+
+
+def join(start, hops):
+    """All entities reached by following ``hops`` fields from ``start``.
+
+    :returns: frozenset.
+    """
+    if not hops:
+        return frozenset([start, ])
+    memo = _memo
+    entry = _get_valid(memo, (start, hops))
+    if entry is not None:
+        return entry[0]
+
+    # reuse the longest memoized prefix, it could be evicted at any time
+    depth = len(hops) - 1
+    frontier = None
+    dependencies = dict()
+    while depth:
+        entry = _get_valid(memo, (start, hops[:depth]))
+        if entry is not None:
+            frontier, dependencies = entry[0], dict(entry[1])
+            break
+        depth -= 1
+    if frontier is None:
+        frontier = (start,)
+
+    for depth in range(depth + 1, len(hops) + 1):
+        field = hops[depth - 1]
+        reached = set()
+        for entity in frontier:
+            reached.update(_read_neighbors(entity, field, dependencies))
+        frontier = frozenset(reached)
+        memo[(start, hops[:depth])] = (
+            frontier, tuple(dependencies.items()))
+    return frontier
+
+
+def traverse(start, field, max_depth=None):
+    """All entities reachable by following ``field`` repeatedly from
+    ``start``, entity already reached is not visited again so it stops on
+    cycle. ``start`` itself is not included unless it is on a cycle.
+
+    :param max_depth: max number of hops, None means no limit.
+    :returns: frozenset.
+    """
+    memo = _memo
+    key = ("traverse", start, field, max_depth)
+    entry = _get_valid(memo, key)
+    if entry is not None:
+        return entry[0]
+
+    dependencies = dict()
+    reached = set()
+    queue = deque([(start, 0)])
+    while queue:
+        entity, depth = queue.popleft()
+        if (max_depth is not None) and (depth >= max_depth):
+            continue
+        for neighbor in _read_neighbors(entity, field, dependencies):
+            if neighbor not in reached:
+                reached.add(neighbor)
+                queue.append((neighbor, depth + 1))
+
+    result = frozenset(reached)
+    memo[key] = (result, tuple(dependencies.items()))
+    return result
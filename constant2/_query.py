@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Composite query over nested Constant class, see
+:meth:`constant2._constant2._Constant.Where`.
+"""
+
+import operator
+
+try:
+    from ._index import is_equal, is_number, get_index
+except:  # pragma: no cover
+    from constant2._index import is_equal, is_number, get_index
+
+
+def _eq(value, operand):
+    return is_equal(value, operand, 0.000001)
+
+
+def _ne(value, operand):
+    return not is_equal(value, operand, 0.000001)
+
+
+def _in(value, operand):
+    return value in operand
+
+
+def _between(value, operand):
+    lo, hi = operand
+    return lo <= value <= hi
+
+
+def _pred(value, operand):
+    return operand(value)
+
+
+operators = {
+    "eq": _eq,
+    "ne": _ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": _in,
+    "between": _between,
+    "pred": _pred,
+}
+
+# (lo, hi, include_lo, include_hi) of the range operators
+_ranges = {
+    "gt": lambda operand: (operand, None, False, True),
+    "gte": lambda operand: (operand, None, True, True),
+    "lt": lambda operand: (None, operand, True, False),
+    "lte": lambda operand: (None, operand, True, True),
+    "between": lambda operand: (operand[0], operand[1], True, True),
+}
+
+
+def _is_hashable(value):
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+class Condition(object):
+    """A single ``attr <op> operand`` condition.
+
+    :param key: ``"attr"`` or ``"attr__op"``, op is one of
+        ``eq, ne, gt, gte, lt, lte, in, between, pred``. Default op is ``eq``.
+    :param operand: the value to compare with. It's a collection for ``in``,
+        a (lo, hi) pair for ``between`` and a function takes the attribute
+        value returns bool for ``pred``.
+
+    Float value is compared with tolerance in ``eq`` and ``ne``. Object
+    doesn't have the attribute never matches.
+
+    .. versionadded:: 0.0.14
+    """
+    __slots__ = ("attr", "op", "operand")
+
+    def __init__(self, key, operand):
+        attr, _, op = key.rpartition("__")
+        if (not attr) or (op not in operators):
+            attr, op = key, "eq"
+
+        if op == "in":
+            operand = list(operand)
+        elif op == "between":
+            lo, hi = operand
+            operand = (lo, hi)
+        elif op == "pred":
+            if not callable(operand):
+                raise TypeError("operand of %r has to be callable" % key)
+
+        self.attr = attr
+        self.op = op
+        self.operand = operand
+
+    def match(self, obj):
+        try:
+            value = getattr(obj, self.attr)
+        except AttributeError:
+            return False
+        try:
+            return bool(operators[self.op](value, self.operand))
+        except Exception:
+            return False
+
+    def plan(self, klass):
+        """Find candidates by the index of ``klass``.
+
+        :returns: None if no index can be used, otherwise a
+            (estimated number of candidates, function returns the candidates
+            in nested class order) pair.
+        """
+        op, operand = self.op, self.operand
+        if op == "eq":
+            if isinstance(operand, float) and is_number(operand):
+                candidates = get_index(
+                    klass, "sorted", self.attr, inherited=True,
+                ).find(operand)
+            elif _is_hashable(operand):
+                candidates = get_index(
+                    klass, "hash", self.attr, inherited=True,
+                ).find(operand)
+            else:
+                return None
+            return len(candidates), lambda: candidates
+
+        elif op == "in":
+            if not all(
+                    _is_hashable(v) and not isinstance(v, float)
+                    for v in operand):
+                return None
+            index = get_index(klass, "hash", self.attr, inherited=True)
+            matched = list()
+            for value in set(operand):
+                matched.extend(index.find(value))
+
+            def fetch():
+                return sorted(matched, key=lambda k: index.positions[id(k)])
+
+            return len(matched), fetch
+
+        elif op in _ranges:
+            lo, hi, include_lo, include_hi = _ranges[op](operand)
+            for bound in (lo, hi):
+                if (bound is not None) and (not is_number(bound)):
+                    return None
+            index = get_index(klass, "sorted", self.attr, inherited=True)
+
+            def fetch():
+                entries = index.range_entries(lo, hi, include_lo, include_hi)
+                return [k for _, k in sorted(entries)]
+
+            return index.count(lo, hi, include_lo, include_hi), fetch
+
+        return None
+
+
+class Query(object):
+    """Lazy result of :meth:`constant2._constant2._Constant.Where`, iterate
+    it or use :meth:`Query.first`, :meth:`Query.all`, :meth:`Query.count`.
+
+    When querying a class, the condition having the fewest candidates by
+    index is used to find candidates, then other conditions are checked one
+    by one. When querying an instance, all nested instance are checked.
+
+    :param conditions: list of :class:`Condition`.
+    :param klass: the Constant class to query.
+    :param instance: the Constant instance to query.
+
+    .. versionadded:: 0.0.14
+    """
+
+    def __init__(self, conditions, klass=None, instance=None):
+        self.conditions = conditions
+        self.klass = klass
+        self.instance = instance
+
+    def _plan(self):
+        """
+        :returns: (candidates, conditions to check) pair.
+        """
+        if self.instance is not None:
+            candidates = [
+                instance for _, instance in self.instance.subclasses()]
+            return candidates, self.conditions
+
+        best = None
+        for i, condition in enumerate(self.conditions):
+            plan = condition.plan(self.klass)
+            if plan is None:
+                continue
+            if (best is None) or (plan[0] < best[0]):
+                best = (plan[0], i, plan[1])
+
+        if best is None:
+            candidates = [klass for _, klass in self.klass.Subclasses()]
+            return candidates, self.conditions
+
+        _, i, fetch = best
+        return fetch(), self.conditions[:i] + self.conditions[i + 1:]
+
+    def __iter__(self):
+        candidates, conditions = self._plan()
+        for obj in candidates:
+            if all(condition.match(obj) for condition in conditions):
+                yield obj
+
+    def first(self):
+        """The first matched one, or None.
+        """
+        for obj in self:
+            return obj
+        return None
+
+    def all(self):
+        """List of all matched one.
+        """
+        return list(self)
+
+    def count(self):
+        """Number of matched one.
+        """
+        return sum(1 for _ in self)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Create nested entity class in bulk from records, see
+:meth:`constant2._constant2._Constant.FromRecords`.
+"""
+
+import re
+import csv
+
+try:
+    from .pkg.sixmini import string_types
+except:  # pragma: no cover
+    from constant2.pkg.sixmini import string_types
+
+_identifier = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _check_name(name, reserved_attrs, what):
+    if not (isinstance(name, string_types) and _identifier.match(name)):
+        raise ValueError("%r is not a valid %s" % (name, what))
+    if name in reserved_attrs:
+        raise ValueError("%r is a reserved attribute / method name" % name)
+    if name.startswith("__") or name.endswith("__"):
+        raise ValueError("%r is not a valid %s" % (name, what))
+
+
+def check_fields(fields, reserved_attrs):
+    """Validate the schema, the field names of the records.
+    """
+    for field in fields:
+        _check_name(field, reserved_attrs, "field name")
+
+
+def _get_key_func(key):
+    if callable(key):
+        return key
+    return lambda record: record[key]
+
+
+def iter_classes(records, key, make_class, reserved_attrs):
+    """Create a class for each record, one record at a time.
+
+    The schema is taken from the first record and validated once, all other
+    records must have the same fields.
+
+    :param key: field name, or a function takes a record returns the name of
+        the class.
+    :param make_class: function takes the class name and the record dict,
+        returns the class.
+    :returns: iterator of (class name, class).
+    """
+    get_name = _get_key_func(key)
+    fields = None
+    names = set()
+    for i, record in enumerate(records):
+        if fields is None:
+            fields = frozenset(record)
+            check_fields(sorted(fields), reserved_attrs)
+        elif (len(record) != len(fields)) or (fields.difference(record)):
+            raise ValueError(
+                "record %d has fields %r, expected %r" % (
+                    i, sorted(record), sorted(fields)))
+
+        name = get_name(record)
+        _check_name(name, reserved_attrs, "class name")
+        if name in names:
+            raise ValueError("duplicate class name %r in record %d" % (name, i))
+        names.add(name)
+        yield name, make_class(name, dict(record))
+
+
+def read_csv(fp, converters=None):
+    """Yield rows of a csv text file handle as dict, the first row is the
+    header.
+
+    :param converters: dict of field name -> function converts the text
+        value.
+    """
+    converters = list((converters or {}).items())
+    for row in csv.DictReader(fp):
+        for field, convert in converters:
+            row[field] = convert(row[field])
+        yield row
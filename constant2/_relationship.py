@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Registry of relationships declared by
+:meth:`constant2._constant2._Constant.BackAssign`, it keeps the back
+populated field in sync when the forward field is changed.
+"""
+
+import weakref
+from bisect import bisect_left, insort
+
+
+class Relationship(object):
+    """Reverse index of one relationship, for example each ``Employee`` in
+    ``EmployeeEntity`` has a ``department`` field (the forward field), each
+    ``Department`` in ``DepartmentEntity`` has an ``employees`` field (the
+    backward field).
+
+    Entity is keyed by identity. Source entities of a target are ordered by
+    the order of ``source_entity.Subclasses()``. The two containers are
+    weakly referenced, the relationship doesn't keep them alive.
+
+    :param target_entity: the Constant class contains target entities.
+    :param source_entity: the Constant class contains source entities.
+    :param forward_field: field of source entity, a target entity, a list
+        of target entity or None.
+    :param backward_field: field of target entity to assign.
+    :param is_many_to_one: if True, the backward field is the first source
+        entity instead of a list.
+
+    .. versionadded:: 0.0.14
+    """
+    __slots__ = (
+        "_target_ref", "_source_ref",
+        "forward_field", "backward_field", "is_many_to_one",
+        "target_ids", "positions", "bases", "forward", "reverse",
+    )
+
+    def __init__(self,
+                 target_entity,
+                 source_entity,
+                 forward_field,
+                 backward_field,
+                 is_many_to_one=False):
+        self._target_ref = weakref.ref(target_entity)
+        self._source_ref = weakref.ref(source_entity)
+        self.forward_field = forward_field
+        self.backward_field = backward_field
+        self.is_many_to_one = is_many_to_one
+        self.reset()
+
+    @property
+    def target_entity(self):
+        """The target container, None if it is garbage collected.
+        """
+        return self._target_ref()
+
+    @property
+    def source_entity(self):
+        """The source container, None if it is garbage collected.
+        """
+        return self._source_ref()
+
+    @property
+    def key(self):
+        """Identify the relationship among all relationships of the source
+        container.
+        """
+        return (self.forward_field, self._target_ref, self.backward_field)
+
+    def reset(self):
+        self.target_ids = set(
+            id(klass) for _, klass in self.target_entity.Subclasses())
+        self.positions = dict()  # id(source) -> position
+        self.bases = set()  # base classes of all source
+        self.forward = dict()  # id(source) -> list of target
+        self.reverse = dict()  # id(target) -> (target, [(position, source)])
+
+    def resolve(self, value):
+        """Target entities referenced by a forward field value, entity not in
+        the target container is ignored.
+        """
+        if not isinstance(value, (tuple, list)):
+            value = (value,)
+        targets, seen = list(), set()
+        for target in value:
+            if (id(target) in self.target_ids) and (id(target) not in seen):
+                seen.add(id(target))
+                targets.append(target)
+        return targets
+
+    def add_source(self, position, source):
+        if id(source) in self.positions:
+            return
+        self.positions[id(source)] = position
+        self.bases.update(source.__mro__[1:])
+        targets = self.resolve(getattr(source, self.forward_field, None))
+        self.forward[id(source)] = targets
+        for target in targets:
+            self.reverse.setdefault(
+                id(target), (target, list()))[1].append((position, source))
+
+    def build(self):
+        """Rebuild the reverse index from scratch.
+
+        :returns: all target having source entity before or after.
+        """
+        targets = [target for target, _ in self.reverse.values()]
+        self.reset()
+        for position, (_, source) in enumerate(self.source_entity.Subclasses()):
+            self.add_source(position, source)
+        return targets + [target for target, _ in self.reverse.values()]
+
+    def update(self, source):
+        """Update the reverse index after the forward field of a source
+        entity is changed.
+
+        :returns: target entities that the backward field has to be updated.
+        """
+        position = self.positions[id(source)]
+        old_targets = self.forward[id(source)]
+        new_targets = self.resolve(getattr(source, self.forward_field, None))
+        self.forward[id(source)] = new_targets
+
+        old_ids = set(id(target) for target in old_targets)
+        new_ids = set(id(target) for target in new_targets)
+        changed = list()
+        for target in old_targets:
+            if id(target) not in new_ids:
+                entries = self.reverse[id(target)][1]
+                del entries[bisect_left(entries, (position,))]
+                changed.append(target)
+        for target in new_targets:
+            if id(target) not in old_ids:
+                insort(
+                    self.reverse.setdefault(id(target), (target, list()))[1],
+                    (position, source),
+                )
+                changed.append(target)
+        return changed
+
+    def assign(self, targets):
+        """Set the backward field of target entities.
+        """
+        for target in targets:
+            entries = self.reverse.get(id(target), (None, ()))[1]
+            sources = [source for _, source in entries]
+            if self.is_many_to_one:
+                value = sources[0] if sources else None
+            else:
+                value = sources
+            setattr(target, self.backward_field, value)
+
+
+# source container -> {Relationship.key: Relationship}, container is weakly
+# referenced, so dynamically created tree can be garbage collected.
+_registry = weakref.WeakKeyDictionary()
+
+# > 0 when we are assigning the backward field, the change made by us only
+# updates the reverse index of other relationship.
+_assigning = [0, ]
+
+
+def _assign(relationship, targets):
+    _assigning[0] += 1
+    try:
+        relationship.assign(targets)
+    finally:
+        _assigning[0] -= 1
+
+
+def register(source_entity, relationships):
+    """Register relationships having the same source container, build their
+    reverse index in one pass over source entities and assign the backward
+    field.
+
+    :param relationships: list of :class:`Relationship`.
+    """
+    registered = _registry.get(source_entity)
+    if registered is None:
+        registered = _registry[source_entity] = dict()
+    previous_targets = list()
+    for relationship in relationships:
+        previous = registered.get(relationship.key)
+        if previous is not None:
+            previous_targets.append(
+                [target for target, _ in previous.reverse.values()])
+        else:
+            previous_targets.append([])
+
+    for position, (_, source) in enumerate(source_entity.Subclasses()):
+        for relationship in relationships:
+            relationship.add_source(position, source)
+
+    for relationship, targets in zip(relationships, previous_targets):
+        registered[relationship.key] = relationship
+        _assign(
+            relationship,
+            targets + [target for target, _ in relationship.reverse.values()],
+        )
+
+
+def _update(relationship, source_entity, target_entity, klass, attr):
+    """Update one relationship after ``klass.attr`` is set or deleted.
+    """
+    if (klass is source_entity) or (klass is target_entity):
+        # entity is added or removed
+        targets = relationship.build()
+    elif attr != relationship.forward_field:
+        return
+    elif id(klass) in relationship.positions:
+        targets = relationship.update(klass)
+    elif klass in relationship.bases:
+        # the default value in base class is changed
+        targets = relationship.build()
+    else:
+        return
+
+    if not _assigning[0]:
+        _assign(relationship, targets)
+
+
+def on_change(klass, attr):
+    """Called after ``klass.attr`` is set or deleted.
+    """
+    if not _registry:
+        return
+
+    for source_entity, registered in list(_registry.items()):
+        for key, relationship in list(registered.items()):
+            target_entity = relationship.target_entity
+            if target_entity is None:  # garbage collected
+                del registered[key]
+                continue
+            _update(relationship, source_entity, target_entity, klass, attr)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Iterative implementation of :meth:`constant2._constant2._Constant.dump` and
+:meth:`constant2._constant2._Constant.load`, and the streaming version which
+reads and writes json file handle.
+
+Data format of a class::
+
+    {"ClassName": {"attr": value, ..., "__classname__": "ClassName",
+                   "nested_attr": {"NestedClassName": {...}}}}
+
+Nested class in ``{"nested_attr": {"__classname__": ..., ...}}`` format,
+named by the attribute name, is also accepted by load.
+"""
+
+from __future__ import unicode_literals
+import json as _json
+from collections import OrderedDict
+
+try:
+    from .pkg.superjson import json
+except:  # pragma: no cover
+    from constant2.pkg.superjson import json
+
+
+def _check_cycle(klass, on_path):
+    if klass in on_path:
+        raise ValueError(
+            "%s contains itself as a nested class" % klass.__name__)
+
+
+def dump_tree(klass):
+    """Dump a class tree into nested ``OrderedDict``.
+    """
+    root = OrderedDict()
+    on_path = set()
+    # (klass, the dict to put the class data in), klass is removed from
+    # on_path when the dict is None
+    stack = [(klass, root)]
+    while stack:
+        klass, holder = stack.pop()
+        if holder is None:
+            on_path.discard(klass)
+            continue
+        _check_cycle(klass, on_path)
+        on_path.add(klass)
+
+        d = OrderedDict(klass.Items())
+        d["__classname__"] = klass.__name__
+        holder[klass.__name__] = d
+        stack.append((klass, None))
+        children = list()
+        for attr, subclass in klass.Subclasses():
+            d[attr] = OrderedDict()
+            children.append((subclass, d[attr]))
+        stack.extend(reversed(children))
+    return root
+
+
+def _encode(value):
+    return _json.dumps(value, default=json._dump)
+
+
+def dump_stream(klass, fp):
+    """Write the json of a class tree to a text file handle piece by piece,
+    attribute value is encoded by superjson.
+    """
+    write = fp.write
+    on_path = set()
+    # ("class", klass), ("text", text) or ("close", klass)
+    stack = [("class", klass)]
+    while stack:
+        kind, payload = stack.pop()
+        if kind == "text":
+            write(payload)
+            continue
+        if kind == "close":
+            on_path.discard(payload)
+            write("}}")
+            continue
+
+        klass = payload
+        _check_cycle(klass, on_path)
+        on_path.add(klass)
+
+        name = _encode(klass.__name__)
+        write("{%s: {" % name)
+        for attr, value in klass.Items():
+            write("%s: %s, " % (_encode(attr), _encode(value)))
+        write('"__classname__": %s' % name)
+
+        stack.append(("close", klass))
+        for attr, subclass in reversed(klass.Subclasses()):
+            stack.append(("class", subclass))
+            stack.append(("text", ", %s: " % _encode(attr)))
+
+
+def _get_class_data(key, value):
+    """
+    :returns: (class name, class data) if value is a nested class, otherwise
+        None.
+    """
+    if isinstance(value, dict):
+        if "__classname__" in value:
+            return key, value
+        if len(value) == 1:
+            for name, data in value.items():
+                if isinstance(data, dict) and "__classname__" in data:
+                    return name, data
+    return None
+
+
+def get_root_data(data):
+    """
+    :returns: (class name, class data) of the top level class.
+    """
+    class_data = None
+    if len(data) == 1:
+        for key, value in data.items():
+            class_data = _get_class_data(key, value)
+    if (class_data is None) or (class_data[0] != key):
+        raise ValueError("not a valid dumped Constant class data")
+    return class_data
+
+
+def load_tree(data, base):
+    """Create class tree from data, nested class is created before the class
+    containing it.
+
+    :param base: base class of all created class.
+    """
+    name, data = get_root_data(data)
+    result = dict()
+    # ("enter", name, data, holder, key) or ("exit", name, attrs, holder, key)
+    stack = [("enter", name, data, result, "root")]
+    while stack:
+        action, name, data, holder, key = stack.pop()
+        if action == "exit":
+            holder[key] = type(str(name), (base,), data)
+            continue
+
+        attrs = dict()
+        stack.append(("exit", name, attrs, holder, key))
+        for attr, value in data.items():
+            class_data = _get_class_data(attr, value)
+            if class_data is None:
+                attrs[attr] = value
+            else:
+                stack.append(
+                    ("enter", class_data[0], class_data[1], attrs, attr))
+    return result["root"]
+
+
+def load_shallow(name, data, base):
+    """Create a class without creating it's nested class, (class name,
+    class data) of nested class is stored in the ``__raw_children__``
+    attribute.
+    """
+    attrs, raw_children = dict(), dict()
+    for attr, value in data.items():
+        class_data = _get_class_data(attr, value)
+        if class_data is None:
+            attrs[attr] = value
+        else:
+            raw_children[attr] = class_data
+    attrs["__raw_children__"] = raw_children
+    return type(str(name), (base,), attrs)
+
+
+class _ClassData(object):
+    """Attributes of a class in the json stream, the class is created when
+    it's name is known.
+    """
+    __slots__ = ("attrs",)
+
+    def __init__(self, attrs):
+        self.attrs = attrs
+
+
+def load_stream(fp, base):
+    """Create class tree from a json file handle. Class is created while the
+    json is parsed, nested class first, no intermediate dict is built.
+
+    :param base: base class of all created class.
+    """
+
+    def object_pairs_hook(pairs):
+        attrs = dict()
+        is_class = False
+        for key, value in pairs:
+            if key == "__classname__":
+                is_class = True
+            if isinstance(value, _ClassData):
+                if len(pairs) == 1:  # {"ClassName": {...}}
+                    return type(str(key), (base,), value.attrs)
+                value = type(str(key), (base,), value.attrs)
+            attrs[key] = value
+        if is_class:
+            return _ClassData(attrs)
+        return json._object_hook1(attrs)
+
+    klass = _json.load(fp, object_pairs_hook=object_pairs_hook)
+    if not isinstance(klass, type):
+        raise ValueError("not a valid dumped Constant class data")
+    return klass
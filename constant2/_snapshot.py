@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Binary snapshot of a nested Constant class tree, see
+:meth:`constant2._constant2._Constant.Snapshot`.
+
+A snapshot file contains four pickle:
+
+1. header, ``(format version, source key)``.
+2. skeleton, ``(metaclass, name, qualname, bases, is nested class)`` of all
+   class in the tree, base class comes first. Class in the tree is referred by it's
+   position.
+3. own attributes, manifest and cache of all class, which doesn't refer to
+   any class in the tree.
+4. the rest of own attributes, manifest and cache.
+
+Restoring creates all class by ``type.__new__`` with 3. as the namespace,
+then loads 4., in which class in the tree is resolved by
+``persistent_load``. Reserved name check and reflection in ``Meta.__new__``
+are skipped.
+"""
+
+import os
+import gc
+import json
+import hashlib
+import pickle
+from collections import OrderedDict
+
+try:
+    from ._index import Cache, get_generation, add_parent
+except:  # pragma: no cover
+    from constant2._index import Cache, get_generation, add_parent
+
+FORMAT_VERSION = 1
+
+# cache entry stored in the snapshot, by the first item of the key, others
+# are rebuilt on demand, some of them, such as the columns, can't be pickled
+_stored_cache_kinds = {
+    "hash", "sorted", "path", "deep", "subclasses", "fingerprint",
+}
+
+# generated or rebuilt on demand, not stored
+_excluded_attrs = {
+    "__dict__", "__weakref__",
+    "__manifest__", "__cache__", "__parents__", "__generation__",
+    "__lazy_class__", "__compact_class__",
+}
+
+
+def source_key(source):
+    """Hash of the source of a constant tree.
+
+    :param source: None, a module, the source code or JSON text, or the
+        data passed to ``Constant.load``.
+    :returns: None if ``source`` is None, otherwise a hex digest.
+    """
+    if source is None:
+        return None
+    if hasattr(source, "__file__"):  # module
+        path = source.__file__
+        if path.endswith((".pyc", ".pyo")):
+            path = path[:-1]
+        with open(path, "rb") as f:
+            source = f.read()
+    elif not isinstance(source, (bytes, type(u""))):
+        source = json.dumps(source, sort_keys=True)
+    if not isinstance(source, bytes):
+        source = source.encode("utf-8")
+    return hashlib.sha256(source).hexdigest()
+
+
+def _sort_by_base(klass_list):
+    """Sort class so base class in the list comes first.
+    """
+    members = set(klass_list)
+    ordered, visited = list(), set()
+    for klass in klass_list:
+        stack = [(klass, False)]
+        while stack:
+            klass, expanded = stack.pop()
+            if expanded:
+                ordered.append(klass)
+                continue
+            if klass in visited:
+                continue
+            visited.add(klass)
+            stack.append((klass, True))
+            for base in reversed(klass.__bases__):
+                if (base in members) and (base not in visited):
+                    stack.append((base, False))
+    return ordered
+
+
+class _Pickler(pickle.Pickler):
+    """Class in the tree is pickled as it's position.
+    """
+
+    def __init__(self, fp, positions):
+        pickle.Pickler.__init__(self, fp, pickle.HIGHEST_PROTOCOL)
+        self.positions = positions
+        self.linked = False  # True if any class in the tree is pickled
+
+    def persistent_id(self, obj):
+        if isinstance(obj, type):
+            position = self.positions.get(id(obj))
+            if position is not None:
+                self.linked = True
+            return position
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, fp, klass_list):
+        pickle.Unpickler.__init__(self, fp)
+        self.klass_list = klass_list
+
+    def persistent_load(self, pid):
+        return self.klass_list[pid]
+
+
+class _NullWriter(object):
+    def write(self, data):
+        pass
+
+
+_plain_types = (type(None), bool, int, float, type(u""), bytes)
+
+
+def _is_linked(value, positions):
+    """Test if a value refers to any class in the tree.
+    """
+    if isinstance(value, _plain_types):
+        return False
+    pickler = _Pickler(_NullWriter(), positions)
+    pickler.dump(value)
+    return pickler.linked
+
+
+def _wrap(value):
+    # staticmethod and classmethod object can't be pickled
+    if isinstance(value, staticmethod):
+        return ("staticmethod", value.__func__)
+    if isinstance(value, classmethod):
+        return ("classmethod", value.__func__)
+    return None
+
+
+def _unwrap(kind, func):
+    if kind == "staticmethod":
+        return staticmethod(func)
+    return classmethod(func)
+
+
+def _split_attrs(klass, positions):
+    """Split own attributes to those can be passed to ``type.__new__``, and
+    those refer to class in the tree, which have to be set later.
+
+    :returns: two ``(attrs, wrapped)`` pair.
+    """
+    plain, linked = (dict(), dict()), (dict(), dict())
+    namespace = dict(klass.__dict__)
+    for attr in _excluded_attrs:
+        namespace.pop(attr, None)
+    namespace["__manifest__"] = klass.__dict__["__manifest__"]
+    # restored class starts from generation 0, so does it's cache
+    cache = klass.__dict__.get("__cache__")
+    if cache and (cache.generation == get_generation(klass)):
+        # not cache.items(), it calls Cache.__getitem__ on python2
+        namespace["__cache__"] = dict(
+            (key, OrderedDict.__getitem__(cache, key)) for key in list(cache)
+            if key[0] in _stored_cache_kinds
+        )
+
+    for attr, value in namespace.items():
+        packed = _wrap(value)
+        if packed is None:
+            group, value = 0, value
+        else:
+            group, value = 1, packed
+        if _is_linked(value, positions):
+            linked[group][attr] = value
+        else:
+            plain[group][attr] = value
+    return plain, linked
+
+
+def snapshot(path, root, klass_list, key):
+    """Write the snapshot of a tree.
+
+    :param root: the root class.
+    :param klass_list: all class in the tree, manifest has to be built.
+    :param key: source key, see :func:`source_key`.
+    """
+    klass_list = _sort_by_base(klass_list)
+    positions = dict((id(klass), i) for i, klass in enumerate(klass_list))
+
+    nested = set()
+    for klass in klass_list:
+        for _, subclass in klass.__dict__["__manifest__"].subclasses:
+            nested.add(id(subclass))
+
+    skeleton, plain_list, linked_list = list(), list(), list()
+    for klass in klass_list:
+        skeleton.append((
+            type(klass),
+            klass.__name__,
+            getattr(klass, "__qualname__", klass.__name__),
+            tuple(
+                ("node", positions[id(base)]) if id(base) in positions
+                else ("global", base)
+                for base in klass.__bases__
+            ),
+            id(klass) in nested,
+        ))
+        plain, linked = _split_attrs(klass, positions)
+        plain_list.append(plain)
+        linked_list.append(linked)
+
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump((FORMAT_VERSION, key), f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(
+                (positions[id(root)], skeleton), f, pickle.HIGHEST_PROTOCOL)
+            # the memo is shared, object referred by both list is not
+            # duplicated
+            pickler = _Pickler(f, positions)
+            pickler.dump(plain_list)
+            pickler.dump(linked_list)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if hasattr(os, "replace"):
+        os.replace(tmp_path, path)
+    else:  # pragma: no cover
+        os.rename(tmp_path, path)
+
+
+def restore(path, key):
+    """Read the snapshot of a tree.
+
+    :param key: expected source key, None means don't check.
+    :returns: the root class, or None if the file doesn't exist or it is
+        taken from a different source.
+    """
+    if not os.path.exists(path):
+        return None
+
+    # lots of object is created and none of them is garbage
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        with open(path, "rb") as f:
+            format_version, snapshot_key = pickle.load(f)
+            if format_version != FORMAT_VERSION:
+                return None
+            if (key is not None) and (key != snapshot_key):
+                return None
+
+            root_position, skeleton = pickle.load(f)
+            klass_list = list()
+            unpickler = _Unpickler(f, klass_list)
+            plain_list = unpickler.load()
+            for (metaclass, name, qualname, bases, is_nested), \
+                    (attrs, wrapped) in zip(skeleton, plain_list):
+                bases = tuple(
+                    klass_list[base] if kind == "node" else base
+                    for kind, base in bases
+                )
+                attrs["__qualname__"] = qualname
+                if is_nested:
+                    attrs["__parents__"] = set()
+                for attr, (kind, func) in wrapped.items():
+                    attrs[attr] = _unwrap(kind, func)
+                klass_list.append(type.__new__(metaclass, name, bases, attrs))
+            linked_list = unpickler.load()
+
+        for klass, (attrs, wrapped) in zip(klass_list, linked_list):
+            for attr, value in attrs.items():
+                type.__setattr__(klass, attr, value)
+            for attr, (kind, func) in wrapped.items():
+                type.__setattr__(klass, attr, _unwrap(kind, func))
+
+        for klass in klass_list:
+            cache = klass.__dict__.get("__cache__")
+            if cache is not None:
+                restored_cache = Cache(
+                    0, getattr(klass, "__cache_size__", None))
+                restored_cache.update(cache)
+                type.__setattr__(klass, "__cache__", restored_cache)
+            for _, subclass in klass.__dict__["__manifest__"].subclasses:
+                add_parent(subclass, klass)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return klass_list[root_position]
@@ -154,17 +154,17 @@ class TestFood(object):
         assert food.get_first("value", "Hello World") is None
 
     def test_GetFirst_performance(self):
-        st = time.clock()
+        st = time.time()
         for i in range(1000):
             Food.GetFirst("id", 2)
-        elapsed = time.clock() - st
+        elapsed = time.time() - st
         # print("with lfu_cache elapsed %.6f second." % elapsed)
 
     def test_get_first_performance(self):
-        st = time.clock()
+        st = time.time()
         for i in range(1000):
             food.get_first("id", 2)
-        elapsed = time.clock() - st
+        elapsed = time.time() - st
         # print("without lfu_cache elapsed %.6f second." % elapsed)
 
     def test_ToIds(self):
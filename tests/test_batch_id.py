@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+
+
+class Fruit(Constant):
+    id = None
+    name = None
+
+
+class FruitEntity(Constant):
+    class Apple(Fruit):
+        id = 1
+        name = "apple"
+
+    class Banana(Fruit):
+        id = 2
+        name = "banana"
+
+    class Cherry(Fruit):
+        id = 3
+        name = "cherry"
+
+
+fruit_entity = FruitEntity()
+
+
+class TestToClasses(object):
+    def test_ToClasses(self):
+        assert FruitEntity.ToClasses([3, 1, 3]) == [
+            FruitEntity.Cherry, FruitEntity.Apple, FruitEntity.Cherry,
+        ]
+        assert FruitEntity.ToClasses(["cherry", "kiwi"], id_field="name") == [
+            FruitEntity.Cherry, None,
+        ]
+
+    def test_on_missing(self):
+        assert FruitEntity.ToClasses([1, 4]) == [FruitEntity.Apple, None]
+        assert FruitEntity.ToClasses([1, 4], on_missing="skip") == [
+            FruitEntity.Apple,
+        ]
+        with raises(KeyError):
+            FruitEntity.ToClasses([1, 4], on_missing="raise")
+        with raises(ValueError):
+            FruitEntity.ToClasses([1, 4], on_missing="ignore")
+
+    def test_IterClasses(self):
+        ids = iter([2, 4, 1])
+        result = FruitEntity.IterClasses(ids, on_missing="skip")
+        assert next(result) is FruitEntity.Banana
+        assert next(result) is FruitEntity.Apple
+        with raises(StopIteration):
+            next(result)
+
+    def test_to_instances(self):
+        assert fruit_entity.to_instances([3, 1]) == [
+            fruit_entity.Cherry, fruit_entity.Apple,
+        ]
+        assert fruit_entity.to_instances([3, 4], on_missing="skip") == [
+            fruit_entity.Cherry,
+        ]
+        with raises(KeyError):
+            fruit_entity.to_instances([4, ], on_missing="raise")
+
+        result = fruit_entity.iter_instances(iter([2, 4]))
+        assert list(result) == [fruit_entity.Banana, None]
+
+    def test_instance_edited(self):
+        entity = FruitEntity()
+        entity.Apple.id = 10
+        assert entity.to_instances([10, 1]) == [entity.Apple, None]
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
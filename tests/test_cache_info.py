@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from constant2 import Constant
+
+
+def make_entity(n, cache_size=None):
+    attrs = {"__cache_size__": cache_size}
+    for i in range(n):
+        name = str("E%s" % i)
+        attrs[name] = type(name, (Constant,), {
+            "id": i, "code": "c%s" % i, "group": i % 2, "name": "e%s" % i})
+    return type(str("Entity"), (Constant,), attrs)
+
+
+def test_CacheInfo():
+    Entity = make_entity(4)
+    info = Entity.CacheInfo()
+    assert (info.hits, info.misses, info.evictions, info.size) == (0, 0, 0, 0)
+    assert info.maxsize is None
+
+    Entity.GetFirst("id", 1)
+    first = Entity.CacheInfo()
+    assert first.misses > 0
+    assert first.size > 0
+
+    Entity.GetFirst("id", 2)
+    second = Entity.CacheInfo()
+    assert second.hits > first.hits
+    assert second.misses == first.misses
+
+    # counters are kept after the class is changed
+    Entity.E1.id = 10
+    info = Entity.CacheInfo()
+    assert info.hits == second.hits
+    assert info.size == 0
+    assert Entity.GetFirst("id", 10) is Entity.E1
+
+    # every class has it's own cache
+    Other = make_entity(2)
+    assert Other.CacheInfo().hits == 0
+
+
+def test_cache_size():
+    Entity = make_entity(4, cache_size=2)
+    assert Entity.CacheInfo().maxsize == 2
+
+    Entity.GetFirst("id", 1)
+    Entity.GetFirst("code", "c1")
+    Entity.GetFirst("name", "e1")
+    info = Entity.CacheInfo()
+    assert info.size == 2
+    assert info.evictions > 0
+
+    # still correct after eviction
+    assert Entity.GetFirst("id", 1) is Entity.E1
+    assert Entity.GetAll("group", 0) == [Entity.E0, Entity.E2]
+
+    # least recently used is evicted
+    Entity = make_entity(4, cache_size=3)
+    Entity.GetFirst("id", 1)
+    Entity.GetFirst("code", "c1")
+    Entity.GetFirst("id", 2)
+    Entity.GetFirst("name", "e1")  # evicts the index of "code"
+    misses = Entity.CacheInfo().misses
+    Entity.GetFirst("id", 3)
+    assert Entity.CacheInfo().misses == misses
+    Entity.GetFirst("code", "c3")
+    assert Entity.CacheInfo().misses > misses
+
+
+def test_lru_cache():
+    from constant2._index import Cache
+
+    cache = Cache(0, 2)
+    cache["a"], cache["b"] = 1, 2
+    assert cache["a"] == 1  # "b" is the least recently used
+    cache["c"] = 3
+    assert list(cache) == ["a", "c"]
+    assert cache.get("b") is None
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == \
+        (1, 1, 1)
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from array import array
+
+import pytest
+from pytest import raises
+from constant2 import Constant, _columns
+
+
+def make_catalog():
+    class Catalog(Constant):
+        class Apple(Constant):
+            price = 1.5
+            weight = 0.2
+            category = "fruit"
+            active = True
+
+        class Banana(Constant):
+            price = 0.5
+            weight = 0.15
+            category = "fruit"
+            active = False
+
+        class Steak(Constant):
+            price = 12
+            weight = 0.4
+            category = "meat"
+            active = True
+
+        class Rice(Constant):
+            price = 20.000001
+            weight = 5
+            category = "grain"
+            active = True
+
+        class GiftCard(Constant):
+            price = 20
+            category = "other"
+            active = True
+
+    return Catalog
+
+
+def names(klasses):
+    return [klass.__name__ for klass in klasses]
+
+
+def test_ToColumns():
+    Catalog = make_catalog()
+    columns = Catalog.ToColumns()
+    assert names(columns.klasses) == \
+        ["Apple", "Banana", "GiftCard", "Rice", "Steak"]
+    assert columns.attrs == ("active", "category", "price", "weight")
+    assert len(columns) == 5
+    assert "price" in columns
+    assert list(columns["price"]) == [1.5, 0.5, 20, 20.000001, 12]
+    assert list(columns["category"]) == \
+        ["fruit", "fruit", "other", "grain", "meat"]
+    assert list(columns.present("weight")) == [True, True, False, True, True]
+    assert columns["weight"][2] != columns["weight"][2]  # nan
+
+    if _columns.np is None:
+        assert isinstance(columns["price"], array)
+        assert isinstance(columns["category"], tuple)
+    else:  # pragma: no cover
+        assert columns["price"].dtype.kind == "f"
+        assert columns["active"].dtype.kind == "b"
+
+    with raises(KeyError):
+        columns["color"]
+
+    # cached until the tree changes
+    assert Catalog.ToColumns() is columns
+    Catalog.Apple.price = 2.0
+    assert list(Catalog.ToColumns()["price"])[0] == 2.0
+
+
+def test_Filter():
+    Catalog = make_catalog()
+    for conditions in [
+        dict(category="fruit"),
+        dict(price__between=(1, 20), weight__lt=1),
+        dict(price=20.0),
+        dict(price__ne=20.0),
+        dict(weight__gte=0.2),
+        dict(category__in=["meat", "grain"], active=True),
+        dict(price__in=[12, 0.5]),
+        dict(category__pred=lambda c: c.startswith("f")),
+        dict(color="red"),
+    ]:
+        expected = sorted(
+            Catalog.Where(**conditions).all(), key=lambda k: k.__name__)
+        assert Catalog.Filter(**conditions) == expected
+
+    assert names(Catalog.Filter(
+        lambda c: [p * w > 1 for p, w in zip(c["price"], c["weight"])],
+        active=True,
+    )) == ["Rice", "Steak"]
+
+    with raises(ValueError):
+        Catalog.Filter(lambda c: [True])
+
+
+
+def test_partially_missing_int():
+    class Entity(Constant):
+        class A(Constant):
+            id = 2 ** 60 + 1
+            size = 1
+
+        class B(Constant):
+            id = 2 ** 60 + 2
+            size = 0.5
+
+        class C(Constant):
+            size = 2 ** 60 + 1
+
+    columns = Entity.ToColumns()
+    assert list(columns["id"])[:2] == [2 ** 60 + 1, 2 ** 60 + 2]
+    assert list(columns.present("id")) == [True, True, False]
+    # can't be float without rounding
+    assert list(columns["size"]) == [1, 0.5, 2 ** 60 + 1]
+    if _columns.np is not None:  # pragma: no cover
+        assert columns["id"].dtype.kind == "i"
+        assert columns["size"].dtype.kind == "O"
+
+    for conditions in [
+        dict(id=2 ** 60 + 1), dict(id__ne=2 ** 60 + 1), dict(id__gt=2 ** 60),
+        dict(id=0), dict(size=2 ** 60 + 1), dict(size__lt=2 ** 60),
+    ]:
+        expected = sorted(
+            Entity.Where(**conditions).all(), key=lambda k: k.__name__)
+        assert Entity.Filter(**conditions) == expected, conditions
+
+
+def test_Filter_expr_without_numpy(monkeypatch):
+    monkeypatch.setattr(_columns, "np", None)
+    Catalog = make_catalog()
+    with raises(TypeError) as excinfo:
+        Catalog.Filter(lambda c: c["price"] > 2)
+    assert "NumPy is not installed" in str(excinfo.value)
+    assert names(Catalog.Filter(lambda c: [p > 2 for p in c["price"]])) == \
+        ["GiftCard", "Rice", "Steak"]
+
+
+def test_vectorized_mask():
+    np = pytest.importorskip("numpy")
+    nan = float("nan")
+    columns = [
+        np.array([1, 2, 3, 20, -5], dtype=np.int64),
+        np.array([1.5, nan, 20.000001, 20.0, float("inf")]),
+    ]
+    for op, operand in [
+        ("eq", 20), ("eq", 20.0), ("eq", float("inf")), ("eq", nan),
+        ("ne", 20.0), ("ne", 2), ("gt", 2), ("gte", 1.5), ("lt", 3),
+        ("lte", 20), ("between", (1.5, 20)), ("in", [1, 20.0]),
+    ]:
+        for column in columns:
+            mask = _columns._vectorized_mask(column, op, operand)
+            expected = _columns._loop_mask(column.tolist(), op, operand)
+            assert mask.tolist() == expected.tolist(), (op, operand, column)
+
+    # fall back to python loop
+    assert _columns._vectorized_mask(columns[0], "eq", "a") is None
+    assert _columns._vectorized_mask(columns[0], "pred", abs) is None
+    assert _columns._vectorized_mask(
+        np.array(["a", "b"], dtype=object), "eq", "a") is None
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import pickle
+import pytest
+from pytest import raises
+from constant2 import Constant
+
+
+class Food(Constant):
+    class Fruit(Constant):
+        id = 1
+        name = "fruit"
+        tags = ["sweet", ]
+
+        def display_name(self):
+            return self.name.title()
+
+        @classmethod
+        def class_display_name(cls):
+            return cls.name.title()
+
+        class Apple(Constant):
+            id = 1
+            name = "apple"
+
+    class Meat(Constant):
+        id = 2
+        name = "meat"
+        tags = ["protein", ]
+
+
+class Catalog(Constant):
+    __compact__ = True
+
+    class Book(Constant):
+        id = 1
+
+
+def test_no_instance_dict():
+    food = Food(compact=True)
+    assert not hasattr(food, "__dict__")
+    assert not hasattr(food.Fruit, "__dict__")
+    assert not hasattr(food.Fruit.Apple, "__dict__")
+
+
+def test_same_api_as_eager():
+    food = Food(compact=True)
+    eager_food = Food()
+
+    assert isinstance(food, Food)
+    assert isinstance(food, Constant)
+    assert isinstance(food.Fruit, Food.Fruit)
+    assert not isinstance(food.Fruit, Food.Meat)
+
+    assert food.items() == eager_food.items()
+    assert food.Fruit.items() == eager_food.Fruit.items()
+    assert food.Fruit == eager_food.Fruit
+    assert repr(food) == repr(eager_food)
+    assert food.subclasses() == [("Fruit", food.Fruit), ("Meat", food.Meat)]
+    assert food.get_first("id", 2) is food.Meat
+    assert food.to_instances([2, 1]) == [food.Meat, food.Fruit]
+    assert food.Fruit.display_name() == "Fruit"
+
+
+def test_deepcopy():
+    food1 = Food(compact=True)
+    food1.Fruit.tags.append("red")
+    food1.Fruit.id = 3
+
+    food2 = Food(compact=True)
+    assert food2.Fruit.tags == ["sweet", ]
+    assert food2.Fruit.id == 1
+    assert Food.Fruit.tags == ["sweet", ]
+
+
+def test_class_default():
+    catalog = Catalog()
+    assert not hasattr(catalog, "__dict__")
+    assert not hasattr(catalog.Book, "__dict__")
+    assert catalog.Book.id == 1
+
+
+def test_lazy_and_compact():
+    with raises(ValueError):
+        Food(lazy=True, compact=True)
+
+
+def test_methods():
+    fruit = Food(compact=True).Fruit
+    fruit.name = "banana"
+    assert fruit.display_name() == "Banana"
+    assert fruit.class_display_name() == "Fruit"
+
+    class Book(Constant):
+        name = "book"
+
+        @property
+        def upper_name(self):
+            return self.name.upper()
+
+    book = Book(compact=True)
+    assert book.upper_name == "BOOK"
+    assert "upper_name" not in type(book).__slots__
+
+
+@pytest.mark.skipif(
+    sys.version_info[0] < 3,
+    reason="python2 pickles nested class by __name__, not __qualname__")
+def test_pickle():
+    food = Food(compact=True)
+    food.Fruit.tags.append("red")
+    loaded = pickle.loads(pickle.dumps(food))
+    assert isinstance(loaded, Food)
+    assert not hasattr(loaded, "__dict__")
+    assert loaded.Fruit.tags == ["sweet", "red"]
+    assert loaded.Fruit.Apple.name == "apple"
+    assert loaded.__creation_index__ == food.__creation_index__
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+from constant2._copy import CowList, CowDict, CowSet
+
+
+class Item(Constant):
+    id = 1
+    name = "item"
+    ratio = 0.5
+    nothing = None
+    point = (1, 2)
+    labels = frozenset(["a", "b"])
+    nested_tuple = (1, [2, 3])
+    tags = ["new", ]
+    meta = {"color": "red"}
+    codes = {1, 2}
+    matrix = [[1, 2], [3, 4]]
+
+
+def test_immutable_value_is_shared():
+    item = Item()
+    for attr in ["name", "point", "labels"]:
+        assert getattr(item, attr) is getattr(Item, attr)
+
+    # mutable value is deep copied by default
+    for attr in ["nested_tuple", "tags", "meta", "codes", "matrix"]:
+        assert getattr(item, attr) == getattr(Item, attr)
+        assert getattr(item, attr) is not getattr(Item, attr)
+    assert item.matrix[0] is not Item.matrix[0]
+    assert item.nested_tuple[1] is not Item.nested_tuple[1]
+
+
+def test_shallow_and_share():
+    class ShallowItem(Item):
+        __copy_policy__ = "shallow"
+
+    item = ShallowItem()
+    assert item.matrix is not Item.matrix
+    assert item.matrix[0] is Item.matrix[0]
+
+    class SharedItem(Item):
+        __copy_policy__ = {"matrix": "share"}
+
+    item = SharedItem()
+    assert item.matrix is Item.matrix
+    assert item.tags is not Item.tags
+
+
+def test_cow():
+    class CowItem(Item):
+        __copy_policy__ = "cow"
+
+    item1, item2 = CowItem(), CowItem()
+    assert isinstance(item1.tags, CowList)
+    assert isinstance(item1.meta, CowDict)
+    assert isinstance(item1.codes, CowSet)
+    # contains mutable value, deep copied
+    assert isinstance(item1.matrix, list)
+    assert item1.matrix[0] is not Item.matrix[0]
+
+    assert item1.tags == ["new", ]
+    assert item1.tags.unwrap() is Item.tags
+    item1.tags.append("hot")
+    item1.meta["size"] = "L"
+    item1.codes.add(3)
+    assert item1.tags == ["new", "hot"]
+    assert item1.meta == {"color": "red", "size": "L"}
+    assert item1.codes == {1, 2, 3}
+    assert Item.tags == ["new", ]
+    assert Item.meta == {"color": "red"}
+    assert Item.codes == {1, 2}
+    assert item2.tags.unwrap() is Item.tags
+
+    assert item1 != item2
+    item1.tags.pop()
+    del item1.meta["size"]
+    item1.codes.discard(3)
+    assert item1 == item2
+    assert item1 == Item()
+
+
+def test_cow_unwrapped():
+    class CowItem(Item):
+        __copy_policy__ = "cow"
+
+    item = CowItem()
+    assert item.tags + ["hot"] == ["new", "hot"]
+    assert ["hot"] + item.tags == ["hot", "new"]
+    assert item.tags * 2 == ["new", "new"]
+    assert item.meta | {"size": "L"} == {"color": "red", "size": "L"}
+    assert {"size": "L"} | item.meta == {"color": "red", "size": "L"}
+    assert item.codes | {3} == {1, 2, 3}
+    assert item.tags.unwrap() is Item.tags
+
+    data = item.to_dict()
+    assert json.loads(json.dumps(data, default=list))["tags"] == ["new", ]
+    assert type(data["tags"]) is list
+    assert type(data["meta"]) is dict
+    assert type(data["codes"]) is set
+    assert type(dict(item.items())["tags"]) is list
+
+    # returned value is owned by the instance
+    data["tags"].append("hot")
+    assert item.tags == ["new", "hot"]
+    assert Item.tags == ["new", ]
+
+
+def test_lazy_and_compact():
+    class CowItem(Item):
+        __copy_policy__ = "cow"
+
+    item = CowItem(lazy=True)
+    assert isinstance(item.tags, CowList)
+    item = CowItem(compact=True)
+    assert isinstance(item.tags, CowList)
+
+
+def test_invalid_policy():
+    class BadItem(Item):
+        __copy_policy__ = "clone"
+
+    with raises(ValueError):
+        BadItem()
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+
+
+def make_old():
+    class Food(Constant):
+        class Fruit(Constant):
+            id = 1
+
+            class Apple(Constant):
+                id = 2
+                tags = ["red", ]
+
+            class Banana(Constant):
+                id = 3
+
+        class Meat(Constant):
+            id = 4
+
+        class Drink(Constant):
+            id = 5
+
+    return Food
+
+
+def make_new():
+    class Food(Constant):
+        class Fruit(Constant):
+            id = 1
+
+            class Apple(Constant):
+                id = 2
+                tags = ["red", "sweet"]
+                weight = 0.5
+
+            class Banana(Constant):
+                id = 3
+
+            class Kiwi(Constant):
+                id = 6
+
+        class Drink(Constant):
+            id = 5
+
+    return Food
+
+
+def test_Diff():
+    old, new = make_old(), make_new()
+    diff = Constant.Diff(old, new)
+    assert diff.added == ["Fruit.Apple.weight", "Fruit.Kiwi"]
+    assert diff.removed == ["Meat", ]
+    assert diff.changed == ["Fruit.Apple.tags", ]
+    assert diff
+
+    assert not Constant.Diff(old, make_old())
+    assert Constant.Diff(old, make_old()).ops == []
+
+
+def test_Diff_type_change():
+    old, new = make_old(), make_old()
+
+    class Id(Constant):
+        value = 4
+
+    new.Meat.id = Id
+    diff = Constant.Diff(old, new)
+    assert diff.changed == ["Meat.id", ]
+    assert diff.ops == [
+        {"op": "replace", "path": "Meat.id", "value": Id.dump()},
+    ]
+
+
+def test_Patch():
+    old, new = make_old(), make_new()
+    ops = Constant.Diff(old, new).ops
+
+    # patch can be transferred as json
+    ops = json.loads(json.dumps(ops))
+    assert old.Patch(ops) is old
+    assert old.Fingerprint() == new.Fingerprint()
+    assert old.Fruit.Kiwi.id == 6
+    assert not hasattr(old, "Meat")
+
+    with raises(ValueError):
+        old.Patch([{"op": "move", "path": "Drink"}])
+
+
+
+def test_Diff_inherited():
+    class Fruit(Constant):
+        color = "red"
+
+    def make(color):
+        class Food(Constant):
+            class Apple(Fruit):
+                pass
+
+        if color is not None:
+            Food.Apple.color = color
+        return Food
+
+    # inherited attribute is not compared
+    old, new = make("green"), make(None)
+    diff = Constant.Diff(old, new)
+    assert diff.removed == ["Apple.color", ]
+    old.Patch(diff.ops)
+    assert old.Apple.color == "red"
+    assert "color" not in old.Apple.__dict__
+
+    old, new = make(None), make("green")
+    diff = Constant.Diff(old, new)
+    assert diff.added == ["Apple.color", ]
+    old.Patch(diff.ops)
+    assert old.Apple.color == "green"
+    assert Fruit.color == "red"
+
+
+def test_Patch_checked_before_applied():
+    old = make_old()
+    fingerprint = old.Fingerprint()
+    invalid_ops = [
+        [{"op": "remove", "path": "Fruit.Apple.dump"}],  # inherited
+        [{"op": "remove", "path": "Fruit.Cherry"}],
+        [{"op": "replace", "path": "Fruit.Cherry.id", "value": 1}],
+        [{"op": "replace", "path": "Fruit.id.value", "value": 1}],
+        [{"op": "remove", "path": "Meat"}, {"op": "remove", "path": "Meat"}],
+        [{"op": "remove", "path": "Meat"},
+         {"op": "replace", "path": "Meat.id", "value": 1}],
+        [{"op": "replace", "path": "Drink.id"}],
+    ]
+    for ops in invalid_ops:
+        with raises(ValueError):
+            old.Patch([{"op": "replace", "path": "Fruit.id", "value": 9}] + ops)
+        assert old.Fingerprint() == fingerprint
+        assert old.Fruit.id == 1
+
+    # path added by the previous operation
+    old.Patch([
+        {"op": "add", "path": "Fish", "value": make_old().Meat.dump()},
+        {"op": "replace", "path": "Fish.id", "value": 7},
+        {"op": "remove", "path": "Fish.id"},
+        {"op": "add", "path": "Fish.name", "value": "fish"},
+    ])
+    assert not hasattr(old.Fish, "id")
+    assert old.Fish.name == "fish"
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
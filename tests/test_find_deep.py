@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+
+
+def make_status():
+    class Status(Constant):
+        class Success(Constant):
+            code = 200
+
+            class Created(Constant):
+                code = 201
+
+        class Client(Constant):
+            class NotFound(Constant):
+                code = 404
+                tags = ["missing", ]
+
+            class Gone(Constant):
+                code = 410
+                tags = ["missing", ]
+
+        class Legacy(Constant):
+            class Missing(Constant):
+                code = 404
+
+    return Status
+
+
+def test_FindDeep():
+    Status = make_status()
+    assert Status.FindDeep("code", 200) == ("Success", Status.Success)
+    assert Status.FindDeep("code", 201) == \
+        ("Success.Created", Status.Success.Created)
+    assert Status.FindDeep("code", 500) is None
+    assert Status.FindDeep("color", 200) is None
+    assert Status.Client.FindDeep("code", 404) == \
+        ("NotFound", Status.Client.NotFound)
+
+    with raises(ValueError):
+        Status.FindDeep("code", 404)
+    assert Status.FindDeepAll("code", 404) == [
+        ("Client.NotFound", Status.Client.NotFound),
+        ("Legacy.Missing", Status.Legacy.Missing),
+    ]
+
+    # unhashable value
+    assert [path for path, _ in Status.FindDeepAll("tags", ["missing", ])] \
+        == ["Client.Gone", "Client.NotFound"]
+
+
+def test_FindDeep_same_class_at_two_paths():
+    Status = make_status()
+    Status.Legacy.Missing.code = 405
+    Status.Legacy.NotFound = Status.Client.NotFound
+    path, klass = Status.FindDeep("code", 404)
+    assert klass is Status.Client.NotFound
+    assert len(Status.FindDeepAll("code", 404)) == 2
+
+
+def test_FindDeep_updated():
+    Status = make_status()
+    assert Status.FindDeep("code", 201)[1] is Status.Success.Created
+    Status.Success.Created.code = 202
+    assert Status.FindDeep("code", 201) is None
+    assert Status.FindDeep("code", 202)[1] is Status.Success.Created
+
+    class Teapot(Constant):
+        code = 418
+
+    Status.Client.Teapot = Teapot
+    assert Status.FindDeep("code", 418) == ("Client.Teapot", Teapot)
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
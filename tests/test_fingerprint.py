@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+from constant2._index import get_cache
+
+
+def make_tree():
+    class Food(Constant):
+        class Fruit(Constant):
+            id = 1
+            tags = {"sweet", "red"}
+
+            class Apple(Constant):
+                id = 2
+
+        class Meat(Constant):
+            id = 3
+            info = {"b": 2, "a": 1}
+
+    return Food
+
+
+def test_Fingerprint():
+    Food, Food1 = make_tree(), make_tree()
+    fingerprint = Food.Fingerprint()
+    assert fingerprint == Food1.Fingerprint()
+    assert Food.Fruit.Fingerprint() != Food.Meat.Fingerprint()
+
+    Food1.Fruit.Apple.id = 4
+    assert Food1.Fingerprint() != fingerprint
+    assert Food1.Meat.Fingerprint() == Food.Meat.Fingerprint()
+
+    Food1.Fruit.Apple.id = 2
+    assert Food1.Fingerprint() == fingerprint
+
+    del Food1.Meat
+    assert Food1.Fingerprint() != fingerprint
+
+
+def test_Fingerprint_cached():
+    Food = make_tree()
+    Food.Fingerprint()
+    assert ("fingerprint",) in get_cache(Food.Meat)
+
+    Food.Fruit.id = 10
+    assert ("fingerprint",) not in get_cache(Food)
+    assert ("fingerprint",) in get_cache(Food.Meat)
+
+
+def test_Fingerprint_different_type():
+    class A(Constant):
+        value = 1
+
+    class B(Constant):
+        value = 1.0
+
+    class C(Constant):
+        value = "1"
+
+    assert len({A.Fingerprint(), B.Fingerprint(), C.Fingerprint()}) == 3
+
+
+def test_instance():
+    Food = make_tree()
+    food1, food2 = Food(), Food()
+    assert food1 == food2
+    assert food1.fingerprint() == food2.fingerprint()
+
+    food2.Fruit.Apple.id = 5
+    assert food1 != food2
+    assert food1.Meat == food2.Meat
+
+    food2.Fruit.Apple.id = 2
+    food2.Meat.info["c"] = 3
+    assert food1 != food2
+    assert food1 != 1
+
+
+class Money(object):
+    # custom __eq__ with the default repr
+    def __init__(self, amount):
+        self.amount = amount
+
+    def __eq__(self, other):
+        return self.amount == other.amount
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+def test_instance_compared_by_eq():
+    class Price(Constant):
+        value = Money(1)
+
+        class Tax(Constant):
+            rate = 1
+
+    assert Price() == Price()
+
+    price1, price2 = Price(), Price()
+    price2.Tax.rate = 1.0
+    assert price1 == price2
+    price2.Tax.rate = complex(1, 0)
+    assert price1 == price2
+    price2.Tax.rate = 2
+    assert price1 != price2
+
+    price2.Tax.rate = 1
+    price2.value = Money(2)
+    assert price1 != price2
+
+
+def test_cycle():
+    class Node(Constant):
+        class Child(Constant):
+            pass
+
+    Node.Child.parent = Node
+    with raises(ValueError):
+        Node.Fingerprint()
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
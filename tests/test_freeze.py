@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+
+
+def make_tree():
+    class Fruit(Constant):
+        id = None
+        price = None
+
+    class Food(Constant):
+        class Fruit(Constant):
+            class Apple(Fruit):
+                id = 1
+                price = 1.5
+
+            class Banana(Fruit):
+                id = 2
+                price = 0.5
+
+        class Meat(Constant):
+            pass
+
+    return Fruit, Food
+
+
+def test_mutation_raises():
+    Fruit, Food = make_tree()
+    assert Food.Freeze() is Food
+
+    with raises(AttributeError):
+        Food.Fruit.Apple.id = 3
+    with raises(AttributeError):
+        del Food.Fruit.Banana.id
+    with raises(AttributeError):
+        Food.Meat = None
+    # base class is frozen too
+    with raises(AttributeError):
+        Fruit.price = 1.0
+    assert Food.Fruit.Apple.id == 1
+
+    # Constant itself is not frozen
+    class Other(Constant):
+        pass
+
+    Other.a = 1
+
+
+def test_read_api():
+    _, Food = make_tree()
+    Food.Freeze()
+
+    assert Food.Fruit.GetFirst("id", 2) is Food.Fruit.Banana
+    assert Food.Fruit.GetFirst("id", 2) is Food.Fruit.Banana
+    assert Food.Fruit.GetAll("price", 1.5) == [Food.Fruit.Apple, ]
+    assert Food.Fruit.GetFirst("price", 1) is None
+    assert Food.Fruit.GetFirst("price", 1.5) is Food.Fruit.Apple
+
+    subclasses = Food.Fruit.Subclasses()
+    subclasses.pop()
+    assert Food.Fruit.Subclasses() == [
+        ("Apple", Food.Fruit.Apple), ("Banana", Food.Fruit.Banana),
+    ]
+
+    namespace = Food.Fruit.Apple.ToDict()
+    assert namespace == {"id": 1, "price": 1.5}
+    with raises(TypeError):
+        namespace["id"] = 2
+
+    assert Food.Lookup("Fruit.Apple") is Food.Fruit.Apple
+
+
+def test_lookup_does_not_grow_cache():
+    _, Food = make_tree()
+    Food.Freeze()
+    size = Food.Fruit.CacheInfo().size
+    for i in range(1000):
+        assert Food.Fruit.GetFirst("id", 100 + i) is None
+    assert Food.Fruit.CacheInfo().size == size
+
+
+def test_instance():
+    _, Food = make_tree()
+    Food.Freeze()
+
+    food = Food()
+    food.Fruit.Apple.id = 3
+    assert food.Fruit.Apple.id == 3
+    assert Food.Fruit.Apple.id == 1
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
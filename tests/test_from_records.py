@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+from constant2._constant2 import _get_manifest, _build_manifest
+from constant2._index import iter_parents
+
+
+class Employee(Constant):
+    department = None
+    tags = list()
+
+    class Meta(Constant):
+        table = "employee"
+
+
+records = [
+    {"id": 1, "name": "Alice", "tags": ["admin"]},
+    {"id": 2, "name": "Bob", "tags": []},
+    {"id": 3, "name": "Cathy", "tags": []},
+]
+
+
+def key(record):
+    return "E%s_%s" % (record["id"], record["name"])
+
+
+def test_FromRecords():
+    EmployeeEntity = Constant.FromRecords(
+        "EmployeeEntity", iter(records), key=key, base=Employee)
+    assert EmployeeEntity.__name__ == "EmployeeEntity"
+    assert EmployeeEntity.Keys() == []
+    assert [attr for attr, _ in EmployeeEntity.Subclasses()] == \
+        ["E1_Alice", "E2_Bob", "E3_Cathy"]
+
+    alice = EmployeeEntity.E1_Alice
+    assert issubclass(alice, Employee)
+    assert alice.__name__ == "E1_Alice"
+    assert alice.Items() == [
+        ("department", None), ("id", 1), ("name", "Alice"), ("tags", ["admin"]),
+    ]
+    assert EmployeeEntity.GetFirst("name", "Bob") is EmployeeEntity.E2_Bob
+    assert EmployeeEntity().E1_Alice.tags == ["admin"]
+    assert alice.Meta.table == "employee"
+    assert alice in iter_parents(alice.Meta)
+
+    # manifest is the same as the one built by reflection
+    for _, klass in EmployeeEntity.Subclasses():
+        manifest, expected = _get_manifest(klass), _build_manifest(klass)
+        assert manifest.names == expected.names
+        assert manifest.items == expected.items
+        assert manifest.subclasses == expected.subclasses
+
+    # entity class is invalidated like a normal class
+    EmployeeEntity.E2_Bob.name = "Bobby"
+    assert EmployeeEntity.GetFirst("name", "Bobby") is EmployeeEntity.E2_Bob
+
+    # field name as key
+    Entity = Constant.FromRecords(
+        "Entity", [{"code": "A1", "value": 1}], key="code")
+    assert Entity.A1.value == 1
+    assert Entity.A1.__bases__ == (Constant,)
+
+
+def test_FromRecords_invalid():
+    with raises(ValueError):  # fields don't match the schema
+        Constant.FromRecords(
+            "Entity", [{"id": 1, "name": "a"}, {"id": 2}], key="name")
+    with raises(ValueError):
+        Constant.FromRecords(
+            "Entity", [{"id": 1, "name": "a"}, {"id": 2, "title": "b"}],
+            key="name")
+    with raises(ValueError):  # reserved field name
+        Constant.FromRecords("Entity", [{"Items": 1, "name": "a"}], key="name")
+    with raises(ValueError):  # not a valid class name
+        Constant.FromRecords("Entity", [{"id": 1}], key="id")
+    with raises(ValueError):  # duplicate class name
+        Constant.FromRecords(
+            "Entity", [{"name": "a"}, {"name": "a"}], key="name")
+
+
+def test_FromCSV():
+    fp = io.StringIO(u"id,name,salary\n1,Alice,10.5\n2,Bob,20\n")
+    EmployeeEntity = Constant.FromCSV(
+        "EmployeeEntity", fp, key=key, base=Employee,
+        converters={"id": int, "salary": float},
+    )
+    assert EmployeeEntity.E1_Alice.salary == 10.5
+    assert EmployeeEntity.E2_Bob.id == 2
+    assert EmployeeEntity.E2_Bob.tags == []
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from constant2 import Constant
+from constant2._index import get_cache
+
+
+def make_tree():
+    class Company(Constant):
+        class Dept(Constant):
+            class IT(Constant):
+                id = 1
+
+            class HR(Constant):
+                id = 2
+
+        class Office(Constant):
+            id = 3
+
+    return Company
+
+
+def test_Generation():
+    Company = make_tree()
+    assert Company.Generation() == 0
+
+    Company.Dept.IT.name = "IT"
+    generation = Company.Generation()
+    assert generation > 0
+    assert Company.Dept.Generation() == generation
+    assert Company.Dept.IT.Generation() == generation
+    # not changed
+    assert Company.Office.Generation() == 0
+    assert Company.Dept.HR.Generation() == 0
+
+    class Sales(Constant):
+        id = 4
+
+    Company.Dept.Sales = Sales
+    assert Company.Generation() > generation
+    assert Company.Dept.IT.Generation() == generation
+
+
+def test_cache_is_validated_by_generation():
+    Company = make_tree()
+    assert Company.Dept.GetFirst("id", 2) is Company.Dept.HR
+    office_cache = get_cache(Company.Office)
+    office_cache["key"] = "value"
+
+    Company.Dept.HR.id = 5
+    assert Company.Dept.GetFirst("id", 2) is None
+    assert Company.Dept.GetFirst("id", 5) is Company.Dept.HR
+    # cache of unrelated class is kept
+    assert get_cache(Company.Office) is office_cache
+
+    class Sales(Constant):
+        id = 6
+
+    Company.Dept.Sales = Sales
+    assert Company.Dept.GetFirst("id", 6) is Sales
+    assert Company.Lookup("Dept.Sales") is Sales
+
+
+def test_inherited_nested_class():
+    class Base(Constant):
+        class Sub(Constant):
+            id = 1
+
+    class Derived(Base):
+        pass
+
+    assert Derived.GetFirst("id", 1) is Base.Sub
+    Base.Sub.id = 2
+    assert Derived.Generation() == Base.Generation() > 0
+    assert Derived.GetFirst("id", 2) is Base.Sub
+
+
+def test_join_memo_is_validated_by_generation():
+    class Department(Constant):
+        class HR(Constant):
+            id = 1
+
+    class Employee(Constant):
+        class Alice(Constant):
+            department = Department.HR
+
+        class Bob(Constant):
+            department = None
+
+    assert Employee.Bob.Join("department") == frozenset()
+    Employee.Bob.department = Department.HR
+    assert Employee.Bob.Join("department") == frozenset([Department.HR])
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+
+
+class Employee(Constant):
+    department = None
+
+
+def make_employees():
+    class EmployeeEntity(Constant):
+        class Alice(Employee):
+            department = "HR"
+            salary = 100
+            weight = 55.5
+
+        class Bob(Employee):
+            department = "IT"
+            salary = 120
+            weight = 80.0
+
+        class Cathy(Employee):
+            department = "HR"
+            salary = 90
+
+        class Dave(Employee):
+            salary = 70
+            weight = 70.5
+
+        class Eve(Employee):
+            department = "IT"
+
+    return EmployeeEntity
+
+
+def test_GroupBy():
+    EmployeeEntity = make_employees()
+    groups = EmployeeEntity.GroupBy("department")
+    assert list(groups) == ["HR", "IT", None]
+    assert groups["HR"] == (EmployeeEntity.Alice, EmployeeEntity.Cathy)
+    assert groups["IT"] == (EmployeeEntity.Bob, EmployeeEntity.Eve)
+    assert groups[None] == (EmployeeEntity.Dave, )
+
+    # read only, cached
+    with raises(TypeError):
+        groups["HR"] = ()
+    assert EmployeeEntity.GroupBy("department") is groups
+
+    assert list(EmployeeEntity.GroupBy("weight")) == [55.5, 80.0, 70.5]
+    assert dict(EmployeeEntity.GroupBy("color")) == {}
+
+    EmployeeEntity.Dave.department = "IT"
+    assert EmployeeEntity.GroupBy("department")["IT"] == (
+        EmployeeEntity.Bob, EmployeeEntity.Dave, EmployeeEntity.Eve)
+
+
+def test_Aggregate():
+    EmployeeEntity = make_employees()
+    assert EmployeeEntity.Aggregate("salary", "sum") == 380
+    assert EmployeeEntity.Aggregate("salary", "count") == 4
+    assert EmployeeEntity.Aggregate("salary", "min") == 70
+    assert EmployeeEntity.Aggregate("salary", "max") == 120
+    assert EmployeeEntity.Aggregate("weight", "mean") == \
+        pytest.approx(206.0 / 3)
+    assert EmployeeEntity.Aggregate("color", "count") == 0
+
+    result = EmployeeEntity.Aggregate("salary", "sum", by="department")
+    assert dict(result) == {"HR": 190, "IT": 120, None: 70}
+    with raises(TypeError):
+        result["HR"] = 0
+    assert EmployeeEntity.Aggregate("salary", "sum", by="department") \
+        is result
+
+    assert dict(EmployeeEntity.Aggregate(
+        "salary", "min", by="department")) == {"HR": 90, "IT": 120, None: 70}
+    assert dict(EmployeeEntity.Aggregate(
+        "weight", "max", by="department")) == \
+        {"HR": 55.5, "IT": 80.0, None: 70.5}
+    assert dict(EmployeeEntity.Aggregate(
+        "department", "count", by="department")) == \
+        {"HR": 2, "IT": 2, None: 1}
+    assert dict(EmployeeEntity.Aggregate(
+        "salary", sorted, by="department")) == \
+        {"HR": [90, 100], "IT": [120, ], None: [70, ]}
+
+    EmployeeEntity.Eve.salary = 80
+    assert EmployeeEntity.Aggregate("salary", "sum", by="department")["IT"] \
+        == 200
+
+    with raises(ValueError):
+        EmployeeEntity.Aggregate("salary", "median")
+
+
+
+def same(a, b):
+    return (type(a) is type(b)) and ((a == b) or (a != a and b != b))
+
+
+def test_nan():
+    class Measure(Constant):
+        class M1(Constant):
+            value = float("nan")
+            kind = "a"
+
+        class M2(Constant):
+            value = 2.5
+            kind = "a"
+
+        class M3(Constant):
+            value = float("nan")
+            kind = "b"
+
+    assert Measure.Aggregate("value", "max") == 2.5
+    assert Measure.Aggregate("value", "min") == 2.5
+    result = Measure.Aggregate("value", "max", by="kind")
+    assert result["a"] == 2.5
+    assert result["b"] != result["b"]
+
+
+def test_vectorized_same_as_python():
+    np = pytest.importorskip("numpy")
+    from constant2 import _group
+
+    nan = float("nan")
+    codes = [0, 1, 0, 1, 2]
+    for column in [
+        # sum of group 0 can't be represented by float64
+        np.array([10 ** 17 + 1, 3, -8, 10 ** 17 + 3, 5], dtype=np.int64),
+        np.array([1.5, nan, 2.5, -0.5, nan]),
+    ]:
+        values = column.tolist()
+        groups = [
+            [v for v, c in zip(values, codes) if c == code]
+            for code in range(3)
+        ]
+        for func in ["count", "sum", "min", "max", "mean"]:
+            result = _group._vectorized(
+                column, np.array(codes, dtype=np.intp), 3, func)
+            expected = [_group.aggregators[func](group) for group in groups]
+            assert all(map(same, result, expected)), (func, result, expected)
+
+    # int64 may overflow, aggregated by python
+    column = np.array([2 ** 62, 2 ** 62], dtype=np.int64)
+    assert _group._vectorized(
+        column, np.zeros(2, dtype=np.intp), 1, "sum") is None
+
+
+def test_Aggregate_python_value():
+    EmployeeEntity = make_employees()
+    EmployeeEntity.Alice.salary = 10 ** 17 + 1
+    EmployeeEntity.Cathy.salary = 2 ** 62
+    EmployeeEntity.Eve.salary = 2 ** 62
+
+    assert EmployeeEntity.Aggregate("salary", "sum") == \
+        10 ** 17 + 1 + 120 + 2 ** 62 + 70 + 2 ** 62
+    for func in ["count", "sum", "min", "max", "mean"]:
+        for value in EmployeeEntity.Aggregate(
+                "weight", func, by="department").values():
+            assert type(value) in (int, float)
+        for value in EmployeeEntity.Aggregate(
+                "salary", func, by="department").values():
+            assert type(value) in (int, float)
+
+
+
+def test_int_value_kept_exact():
+    class Entity(Constant):
+        class A(Constant):
+            id = 2 ** 60 + 1
+            dept_id = 1
+            tags = ["a", ]
+
+        class B(Constant):
+            id = 2 ** 60 + 2
+            dept_id = 2
+            tags = ["b", ]
+
+        class C(Constant):
+            name = "c"
+
+    groups = Entity.GroupBy("dept_id")
+    assert list(groups) == [1, 2]
+    assert all(type(key) is int for key in groups)
+    assert Entity.Aggregate("id", "sum") == 2 ** 61 + 3
+    assert Entity.Aggregate("dept_id", "max") == 2
+    assert type(Entity.Aggregate("dept_id", "max")) is int
+    assert dict(Entity.Aggregate("id", "max", by="dept_id")) == \
+        {1: 2 ** 60 + 1, 2: 2 ** 60 + 2}
+
+    with raises(TypeError) as excinfo:
+        Entity.GroupBy("tags")
+    assert "unhashable" in str(excinfo.value)
+    with raises(TypeError):
+        Entity.Aggregate("id", "sum", by="tags")
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from constant2 import Constant
+
+
+class Status(Constant):
+    class Active(Constant):
+        id = 1
+        code = "A"
+        score = 0.5
+        tags = ["x", "y"]
+
+    class Inactive(Constant):
+        id = 2
+        code = "I"
+        score = 1.5
+        tags = ["z", ]
+
+    class Archived(Constant):
+        id = 3
+        code = "A"
+        score = 0.5000000001
+        tags = ["x", "y"]
+
+
+def test_exact_match():
+    assert Status.GetFirst("id", 2) is Status.Inactive
+    assert Status.GetFirst("id", 4) is None
+    assert Status.GetAll("code", "A") == [Status.Active, Status.Archived]
+    assert Status.GetAll("code", "A", sort_by="id") == [
+        Status.Active, Status.Archived,
+    ]
+    assert Status.GetFirst("missing", 1) is None
+
+
+def test_unhashable_value():
+    assert Status.GetAll("tags", ["x", "y"]) == [
+        Status.Active, Status.Archived,
+    ]
+    assert Status.GetFirst("tags", ["z", ]) is Status.Inactive
+    assert Status.GetFirst("tags", ["w", ]) is None
+
+
+def test_float_tolerance():
+    assert Status.GetAll("score", 0.5) == [Status.Active, Status.Archived]
+    assert Status.GetAll("score", 0.5, e=0) == [Status.Active, ]
+    assert Status.GetFirst("score", 1.5000001, e=0.001) is Status.Inactive
+
+
+def test_returned_list_is_a_copy():
+    matched = Status.GetAll("code", "I")
+    matched.append(None)
+    assert Status.GetAll("code", "I") == [Status.Inactive, ]
+
+
+def test_invalidate():
+    class Color(Constant):
+        class Red(Constant):
+            id = 1
+
+        class Blue(Constant):
+            id = 2
+
+    assert Color.GetFirst("id", 1) is Color.Red
+
+    # change the nested class
+    Color.Red.id = 3
+    assert Color.GetFirst("id", 1) is None
+    assert Color.GetFirst("id", 3) is Color.Red
+
+    # add a nested class
+    class Green(Constant):
+        id = 1
+
+    Color.Green = Green
+    assert Color.GetFirst("id", 1) is Green
+
+    # remove a nested class
+    del Color.Green
+    assert Color.GetFirst("id", 1) is None
+
+
+class Threshold(Constant):
+    value = None
+
+
+class ThresholdLevel(Constant):
+    class Low(Threshold):
+        value = 0.1
+
+    class Medium(Threshold):
+        value = 0.5
+
+    class High(Threshold):
+        value = 0.9
+
+    class Max(Threshold):
+        value = float("inf")
+
+    class Unknown(Threshold):
+        pass
+
+    class Disabled(Threshold):
+        value = float("nan")
+
+
+def test_float_tolerance_sorted_index():
+    assert ThresholdLevel.GetFirst("value", 0.5) is ThresholdLevel.Medium
+    assert ThresholdLevel.GetFirst("value", 0.50001) is None
+    assert ThresholdLevel.GetFirst("value", 0.50001, e=0.001) is \
+        ThresholdLevel.Medium
+    assert ThresholdLevel.GetFirst("value", float("inf")) is ThresholdLevel.Max
+    assert ThresholdLevel.GetFirst("value", float("nan")) is None
+
+
+def test_GetRange():
+    assert ThresholdLevel.GetRange("value", 0.1, 0.5) == [
+        ThresholdLevel.Low, ThresholdLevel.Medium,
+    ]
+    assert ThresholdLevel.GetRange("value", lo=0.5) == [
+        ThresholdLevel.Medium, ThresholdLevel.High, ThresholdLevel.Max,
+    ]
+    assert ThresholdLevel.GetRange("value", hi=0.2) == [ThresholdLevel.Low, ]
+    assert ThresholdLevel.GetRange("value", 0.6, 0.8) == []
+    assert ThresholdLevel.GetRange("value", 0.8, 0.6) == []
+
+
+def test_get_range():
+    level = ThresholdLevel()
+    assert level.get_range("value", 0.1, 0.5) == [level.Low, level.Medium]
+
+    level.Low.value = 0.7
+    assert level.get_range("value", 0.5, 0.9) == [
+        level.Medium, level.Low, level.High,
+    ]
+
+
+def test_instance():
+    status = Status()
+    assert status.get_first("id", 2) is status.Inactive
+    assert status.get_all("code", "A") == [status.Active, status.Archived]
+    assert status.get_all("score", 0.5, e=0) == [status.Active, ]
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from constant2 import Constant
+from constant2 import _join
+
+
+class Employee(Constant):
+    department = None
+    manager = None
+    tags = list()
+
+
+class EmployeeEntity(Constant):
+    class Alice(Employee):
+        pass
+
+    class Bob(Employee):
+        pass
+
+    class Cathy(Employee):
+        pass
+
+
+class Department(Constant):
+    employees = list()
+
+
+class DepartmentEntity(Constant):
+    class HR(Department):
+        pass
+
+    class IT(Department):
+        pass
+
+
+class Tag(Constant):
+    employees = list()
+
+
+class TagEntity(Constant):
+    class Junior(Tag):
+        pass
+
+    class Senior(Tag):
+        pass
+
+    class Python(Tag):
+        pass
+
+
+EmployeeEntity.Alice.department = DepartmentEntity.IT
+EmployeeEntity.Bob.department = DepartmentEntity.IT
+EmployeeEntity.Cathy.department = DepartmentEntity.HR
+EmployeeEntity.Alice.tags = [TagEntity.Senior, TagEntity.Python]
+EmployeeEntity.Bob.tags = [TagEntity.Junior, TagEntity.Python]
+EmployeeEntity.Cathy.tags = [TagEntity.Senior, ]
+EmployeeEntity.BackAssignMany([
+    (DepartmentEntity, "department", "employees"),
+    (TagEntity, "tags", "employees"),
+])
+
+
+def test_Join():
+    assert DepartmentEntity.IT.Join("employees", "tags") == frozenset([
+        TagEntity.Senior, TagEntity.Junior, TagEntity.Python,
+    ])
+    assert EmployeeEntity.Alice.Join("department", "employees") == frozenset([
+        EmployeeEntity.Alice, EmployeeEntity.Bob,
+    ])
+    assert EmployeeEntity.Alice.Join("department") == frozenset([
+        DepartmentEntity.IT,
+    ])
+    assert EmployeeEntity.Alice.Join() == frozenset([EmployeeEntity.Alice, ])
+    assert EmployeeEntity.Alice.Join("manager", "tags") == frozenset()
+    assert EmployeeEntity.Alice.Join("unknown") == frozenset()
+
+
+def test_Join_after_change():
+    class Node(Constant):
+        next = None
+
+    class Graph(Constant):
+        class A(Node):
+            pass
+
+        class B(Node):
+            pass
+
+        class C(Node):
+            pass
+
+    Graph.A.next = Graph.B
+    assert Graph.A.Join("next", "next") == frozenset()
+
+    Graph.B.next = [Graph.C, ]
+    assert Graph.A.Join("next", "next") == frozenset([Graph.C, ])
+
+
+def test_Traverse():
+    class Node(Constant):
+        next = None
+
+    class Graph(Constant):
+        class A(Node):
+            pass
+
+        class B(Node):
+            pass
+
+        class C(Node):
+            pass
+
+    Graph.A.next = Graph.B
+    Graph.B.next = Graph.C
+    assert Graph.A.Traverse("next") == frozenset([Graph.B, Graph.C])
+    assert Graph.A.Traverse("next", max_depth=1) == frozenset([Graph.B, ])
+
+    # cycle
+    Graph.C.next = [Graph.A, Graph.B]
+    assert Graph.A.Traverse("next") == frozenset([Graph.A, Graph.B, Graph.C])
+
+
+def test_memo_kept_after_unrelated_change(monkeypatch):
+    monkeypatch.setattr(_join, "_memo", _join.Cache(0, _join.MEMO_SIZE))
+
+    class Unrelated(Constant):
+        x = 1
+
+    result = EmployeeEntity.Alice.Join("department", "employees")
+    n_entry = len(_join._memo)
+    assert n_entry == 2
+    Unrelated.x = 2
+    assert EmployeeEntity.Alice.Join("department", "employees") is result
+    assert _join._memo.stats.hits == 1
+
+
+def test_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(_join, "MEMO_SIZE", 4)
+    monkeypatch.setattr(_join, "_memo", _join.Cache(0, 4))
+    for entity in (EmployeeEntity.Alice, EmployeeEntity.Bob,
+                   EmployeeEntity.Cathy):
+        entity.Join("department", "employees")
+    assert len(_join._memo) == 4
+    assert EmployeeEntity.Alice.Join("department", "employees") == \
+        EmployeeEntity.Alice.Join("department", "employees")
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
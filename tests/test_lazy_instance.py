@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import pickle
+import pytest
+from constant2 import Constant
+
+
+class Config(Constant):
+    name = "config"
+    data = dict(a=1)
+
+    class Setting(Constant):
+        data = dict(a=1)
+
+        class Logging(Constant):
+            level = "INFO"
+
+
+class LazyConfig(Constant):
+    __lazy__ = True
+
+    class Setting(Constant):
+        timeout = 10
+
+
+def test_nested_instance_created_on_access():
+    config = Config(lazy=True)
+    assert "Setting" not in config.__dict__
+    assert "data" not in config.__dict__
+    assert isinstance(config, Config)
+
+    setting = config.Setting
+    assert isinstance(setting, Config.Setting)
+    assert config.Setting is setting
+    assert "Logging" not in setting.__dict__
+    assert setting.Logging.level == "INFO"
+
+
+def test_copy_on_access():
+    config1 = Config(lazy=True)
+    config1.data["a"] = 2
+    config1.Setting.data["a"] = 2
+    config1.name = "config1"
+
+    config2 = Config(lazy=True)
+    assert config2.data["a"] == 1
+    assert config2.Setting.data["a"] == 1
+    assert config2.name == "config"
+    assert Config.data["a"] == 1
+    assert Config.name == "config"
+
+
+def test_same_api_as_eager():
+    config = Config(lazy=True)
+    eager_config = Config()
+    assert config.items() == eager_config.items()
+    assert config.Setting.items() == eager_config.Setting.items()
+    assert config.subclasses() == [("Setting", config.Setting), ]
+    assert repr(config) == repr(eager_config)
+    assert config.to_dict() == {"name": "config", "data": {"a": 1}}
+
+
+def test_class_default():
+    config = LazyConfig()
+    assert "Setting" not in config.__dict__
+    assert config.Setting.timeout == 10
+
+    config = LazyConfig(lazy=False)
+    assert "Setting" in config.__dict__
+
+
+def test_class_modified():
+    class Color(Constant):
+        class Red(Constant):
+            id = 1
+
+    color = Color(lazy=True)
+
+    class Blue(Constant):
+        id = 2
+
+    Color.Blue = Blue
+    color = Color(lazy=True)
+    assert color.Blue.id == 2
+
+
+def test_class_modified_after_instance_created():
+    class Point(Constant):
+        x = 1
+        tags = ["a", ]
+
+    lazy_point = Point(lazy=True)
+    eager_point = Point()
+    Point.x = 10
+    Point.tags = ["b", ]
+    assert lazy_point.x == eager_point.x == 1
+    assert lazy_point.tags == eager_point.tags == ["a", ]
+    assert Point(lazy=True).x == 10
+
+
+class Pickled(Constant):
+    name = "pickled"
+    data = dict(a=1)
+
+    class Setting(Constant):
+        timeout = 10
+
+
+@pytest.mark.skipif(
+    sys.version_info[0] < 3,
+    reason="python2 pickles nested class by __name__, not __qualname__")
+def test_pickle():
+    config = Pickled(lazy=True)
+    config.data["a"] = 2
+    loaded = pickle.loads(pickle.dumps(config))
+    assert isinstance(loaded, Pickled)
+    assert loaded.__class__.__dict__.get("__lazy_instance__")
+    assert loaded.items() == config.items()
+    assert loaded.Setting.timeout == 10
+    assert loaded.__creation_index__ == config.__creation_index__
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+
+
+class Food(Constant):
+    id = 0
+
+    class Fruit(Constant):
+        id = 1
+
+        class Apple(Constant):
+            id = 2
+
+        class Banana(Constant):
+            id = 3
+
+    class Meat(Constant):
+        id = 4
+
+
+def is_created(klass, attr):
+    return attr in klass.__dict__
+
+
+def test_lazy_load():
+    food = Constant.load(Food.dump(), lazy=True)
+    assert not is_created(food, "Fruit")
+
+    # non-class attributes don't create nested class
+    assert food.Items() == [("id", 0), ]
+    assert food.Keys() == ["id", ]
+    assert food.ToDict() == {"id": 0}
+    assert not is_created(food, "Fruit")
+    assert not is_created(food, "Meat")
+
+    # created on first access
+    fruit = food.Fruit
+    assert is_created(food, "Fruit")
+    assert food.Fruit is fruit
+    assert fruit.id == 1
+    assert not is_created(fruit, "Apple")
+    assert not is_created(food, "Meat")
+
+    # Subclasses creates one level
+    assert food.Subclasses(sort_by="id") == [
+        ("Fruit", food.Fruit), ("Meat", food.Meat),
+    ]
+    assert not is_created(fruit, "Apple")
+
+    assert food.Fruit.GetFirst("id", 3) is food.Fruit.Banana
+    assert food.dump() == Food.dump()
+
+    with raises(AttributeError):
+        food.Vegetable
+
+
+def test_lazy_load_instance():
+    food = Constant.load(Food.dump(), lazy=True)()
+    assert food.Fruit.Apple.id == 2
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from constant2 import Constant
+from constant2 import _constant2
+
+
+class Item(Constant):
+    id = None
+    name = None
+
+
+class ItemType(Constant):
+    class Weapon(Item):
+        id = 1
+        name = "weapon"
+
+    class Armor(Item):
+        id = 2
+        name = "armor"
+
+
+def test_no_reflection_on_read(monkeypatch):
+    def get_all_attributes(klass):  # pragma: no cover
+        raise AssertionError("reflection should not happen")
+
+    monkeypatch.setattr(_constant2, "get_all_attributes", get_all_attributes)
+
+    assert ItemType.Weapon.Items() == [("id", 1), ("name", "weapon")]
+    assert ItemType.Weapon.Keys() == ["id", "name"]
+    assert ItemType.Weapon.Values() == [1, "weapon"]
+    assert ItemType.Weapon.ToDict() == {"id": 1, "name": "weapon"}
+    assert ItemType.Subclasses() == [
+        ("Armor", ItemType.Armor), ("Weapon", ItemType.Weapon),
+    ]
+    assert ItemType().Weapon.items() == [("id", 1), ("name", "weapon")]
+
+
+def test_built_on_first_read():
+    class Config(Constant):
+        a = 1
+
+        class Setting(Constant):
+            pass
+
+    assert "__manifest__" not in Config.__dict__
+    assert Config in _constant2.iter_parents(Config.Setting)
+    assert Config.Items() == [("a", 1)]
+    assert "__manifest__" in Config.__dict__
+
+
+def test_returned_list_is_a_copy():
+    items = ItemType.Weapon.Items()
+    items.append(("weight", 10))
+    assert ItemType.Weapon.Items() == [("id", 1), ("name", "weapon")]
+
+
+def test_invalidate_on_setattr_and_delattr():
+    class Config(Constant):
+        a = 1
+
+        class Setting(Constant):
+            pass
+
+    assert Config.Items() == [("a", 1)]
+
+    Config.b = 2
+    assert Config.Items() == [("a", 1), ("b", 2)]
+
+    class Logging(Constant):
+        pass
+
+    Config.Logging = Logging
+    assert Config.Subclasses() == [
+        ("Logging", Logging), ("Setting", Config.Setting),
+    ]
+
+    del Config.a
+    del Config.Setting
+    assert Config.Items() == [("b", 2)]
+    assert Config.Subclasses() == [("Logging", Logging), ]
+
+
+def test_invalidate_derived_class():
+    class Base(Constant):
+        a = 1
+
+    class Derived(Base):
+        b = 2
+
+    assert Derived.Items() == [("a", 1), ("b", 2)]
+    Base.a = 3
+    assert Derived.Items() == [("a", 3), ("b", 2)]
+
+
+def test_manifest_is_the_same_as_reflection():
+    class Plain(object):
+        pass
+
+    class Base(Constant):
+        a = 1
+        b = [1, 2]
+        plain = Plain
+
+        class Nested(Constant):
+            pass
+
+        @property
+        def prop(self):
+            return 1
+
+    class Derived(Base):
+        a = 2
+        b = len
+        plain = 3
+        Nested = None
+
+        class Other(Constant):
+            pass
+
+        @staticmethod
+        def static():
+            pass
+
+        @classmethod
+        def klass_method(cls):
+            pass
+
+    class Multi(Derived, ItemType):
+        pass
+
+    for klass in (Base, Derived, Multi):
+        manifest = _constant2._get_manifest(klass)
+        expected = _constant2._build_manifest(klass)
+        assert manifest.names == expected.names
+        assert manifest.items == expected.items
+        assert manifest.subclasses == expected.subclasses
+    assert Derived in _constant2.iter_parents(Derived.Other)
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
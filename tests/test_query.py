@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+from constant2._query import Condition
+
+
+class Product(Constant):
+    id = None
+    category = None
+    price = None
+    weight = 1
+    tags = list()
+
+
+class ProductEntity(Constant):
+    class P1_Apple(Product):
+        id = 1
+        category = "food"
+        price = 3.5
+        weight = 0.2
+        tags = ["fruit", "new"]
+
+    class P2_Rice(Product):
+        id = 2
+        category = "food"
+        price = 12
+        weight = 5
+
+    class P3_Chair(Product):
+        id = 3
+        category = "furniture"
+        price = 45
+        weight = 8
+        tags = ["new", ]
+
+    class P4_Lamp(Product):
+        id = 4
+        category = "furniture"
+        price = 20.0
+        tags = ["light", ]
+
+    class P5_Pen(Product):
+        id = 5
+        category = "office"
+        price = 1
+
+
+def test_condition():
+    assert (Condition("price", 1).attr, Condition("price", 1).op) == \
+        ("price", "eq")
+    assert Condition("price__gte", 1).op == "gte"
+    assert Condition("__name__", "P1_Apple").attr == "__name__"
+    assert Condition("price__unknown", 1).attr == "price__unknown"
+    with raises(TypeError):
+        Condition("price__pred", 1)
+
+
+def test_Where():
+    P = ProductEntity
+    assert P.Where(category="food").all() == [P.P1_Apple, P.P2_Rice]
+    assert P.Where(category="food", price__gt=5).all() == [P.P2_Rice, ]
+    assert P.Where(category__in=["office", "food"]).all() == [
+        P.P1_Apple, P.P2_Rice, P.P5_Pen,
+    ]
+    assert P.Where(price__between=(3, 20)).all() == [
+        P.P1_Apple, P.P2_Rice, P.P4_Lamp,
+    ]
+    assert P.Where(price__gte=20, price__lt=45).all() == [P.P4_Lamp, ]
+    assert P.Where(price__lte=1).all() == [P.P5_Pen, ]
+    assert P.Where(category__ne="food", weight=1).all() == [
+        P.P4_Lamp, P.P5_Pen,
+    ]
+    assert P.Where(tags__pred=lambda tags: "new" in tags).all() == [
+        P.P1_Apple, P.P3_Chair,
+    ]
+    assert P.Where(tags=["light", ]).all() == [P.P4_Lamp, ]
+    assert P.Where(price=3.5000001).all() == [P.P1_Apple, ]
+    assert P.Where(color="red").all() == []
+    assert len(P.Where().all()) == 5
+
+
+def test_terminal():
+    P = ProductEntity
+    query = P.Where(category="furniture")
+    assert query.first() is P.P3_Chair
+    assert query.count() == 2
+    assert [klass for klass in query] == [P.P3_Chair, P.P4_Lamp]
+    assert P.Where(category="toy").first() is None
+    assert P.Where(category="toy").count() == 0
+
+
+def test_use_most_selective_index():
+    P = ProductEntity
+    query = P.Where(category="food", id=2, price__pred=lambda x: x > 0)
+    candidates, conditions = query._plan()
+    assert candidates == [P.P2_Rice, ]
+    assert [c.attr for c in conditions] == ["category", "price"]
+
+    query = P.Where(tags__pred=lambda x: True)
+    candidates, conditions = query._plan()
+    assert len(candidates) == 5
+
+
+def test_where():
+    product_entity = ProductEntity()
+    product_entity.P5_Pen.category = "food"
+    assert product_entity.where(category="food", price__lt=5).all() == [
+        product_entity.P1_Apple, product_entity.P5_Pen,
+    ]
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
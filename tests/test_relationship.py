@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gc
+import weakref
+import pytest
+from constant2 import Constant
+from constant2 import _relationship
+
+
+def make_entities():
+    class Employee(Constant):
+        department = None
+        tags = list()
+
+    class EmployeeEntity(Constant):
+        class Alice(Employee):
+            pass
+
+        class Bob(Employee):
+            pass
+
+        class Cathy(Employee):
+            pass
+
+    class Department(Constant):
+        employees = list()
+
+    class DepartmentEntity(Constant):
+        class HR(Department):
+            pass
+
+        class IT(Department):
+            pass
+
+    class Tag(Constant):
+        employees = list()
+
+    class TagEntity(Constant):
+        class Junior(Tag):
+            pass
+
+        class Senior(Tag):
+            pass
+
+    return EmployeeEntity, DepartmentEntity, TagEntity
+
+
+def test_incremental_update():
+    EmployeeEntity, DepartmentEntity, _ = make_entities()
+    alice, bob, cathy = \
+        EmployeeEntity.Alice, EmployeeEntity.Bob, EmployeeEntity.Cathy
+    hr, it = DepartmentEntity.HR, DepartmentEntity.IT
+
+    alice.department = it
+    cathy.department = it
+    DepartmentEntity.BackAssign(EmployeeEntity, "department", "employees")
+    assert it.employees == [alice, cathy]
+    assert hr.employees == []
+
+    # no need to call BackAssign again
+    bob.department = it
+    assert it.employees == [alice, bob, cathy]
+
+    alice.department = hr
+    assert hr.employees == [alice, ]
+    assert it.employees == [bob, cathy]
+
+    del bob.department
+    assert it.employees == [cathy, ]
+
+
+def test_many_to_one_both_side():
+    EmployeeEntity, DepartmentEntity, _ = make_entities()
+    alice, bob = EmployeeEntity.Alice, EmployeeEntity.Bob
+    hr, it = DepartmentEntity.HR, DepartmentEntity.IT
+
+    alice.department = hr
+    DepartmentEntity.BackAssign(EmployeeEntity, "department", "employees")
+    EmployeeEntity.BackAssign(
+        DepartmentEntity, "employees", "department", is_many_to_one=True)
+    assert hr.employees == [alice, ]
+    assert alice.department is hr
+
+    alice.department = it
+    assert hr.employees == []
+    assert it.employees == [alice, ]
+    assert alice.department is it
+
+    it.employees = [alice, bob]
+    assert bob.department is it
+
+
+def test_entity_added():
+    EmployeeEntity, DepartmentEntity, _ = make_entities()
+    EmployeeEntity.Alice.department = DepartmentEntity.HR
+    DepartmentEntity.BackAssign(EmployeeEntity, "department", "employees")
+
+    class Dave(Constant):
+        department = DepartmentEntity.HR
+
+    EmployeeEntity.Dave = Dave
+    assert DepartmentEntity.HR.employees == [EmployeeEntity.Alice, Dave]
+
+    del EmployeeEntity.Alice
+    assert DepartmentEntity.HR.employees == [Dave, ]
+
+
+def test_BackAssignMany():
+    EmployeeEntity, DepartmentEntity, TagEntity = make_entities()
+    EmployeeEntity.Alice.department = DepartmentEntity.HR
+    EmployeeEntity.Alice.tags = [TagEntity.Senior, TagEntity.Senior]
+    EmployeeEntity.Bob.tags = [TagEntity.Junior, TagEntity.Senior]
+
+    EmployeeEntity.BackAssignMany([
+        (DepartmentEntity, "department", "employees"),
+        (TagEntity, "tags", "employees"),
+    ])
+    assert DepartmentEntity.HR.employees == [EmployeeEntity.Alice, ]
+    assert TagEntity.Senior.employees == [
+        EmployeeEntity.Alice, EmployeeEntity.Bob]
+
+    EmployeeEntity.Bob.tags = [TagEntity.Junior, ]
+    assert TagEntity.Senior.employees == [EmployeeEntity.Alice, ]
+    assert TagEntity.Junior.employees == [EmployeeEntity.Bob, ]
+
+
+def test_registry_does_not_keep_container_alive():
+    EmployeeEntity, DepartmentEntity, _ = make_entities()
+    EmployeeEntity.Alice.department = DepartmentEntity.IT
+    DepartmentEntity.BackAssign(EmployeeEntity, "department", "employees")
+    assert DepartmentEntity.IT.employees == [EmployeeEntity.Alice, ]
+    assert EmployeeEntity in _relationship._registry
+
+    refs = [weakref.ref(EmployeeEntity), weakref.ref(DepartmentEntity)]
+    del EmployeeEntity, DepartmentEntity
+    gc.collect()
+    assert [ref() for ref in refs] == [None, None]
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import sys
+import json
+from collections import OrderedDict
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+
+
+class Food(Constant):
+    class Fruit(Constant):
+        id = 1
+        tags = ["sweet", ]
+
+        class Apple(Constant):
+            id = 2
+            colors = {"red", }
+
+    class Meat(Constant):
+        id = 3
+
+
+def make_deep_tree(depth):
+    klass = type(str("Node%s" % depth), (Constant,), {"id": depth})
+    for i in range(depth - 1, -1, -1):
+        klass = type(str("Node%s" % i), (Constant,), {"id": i, "child": klass})
+    return klass
+
+
+def test_load_nested_class():
+    tree = Constant.load(Food.dump())
+    assert tree.Fruit.Apple.id == 2
+    assert tree.dump() == Food.dump()
+
+    # nested class named by the attribute name
+    tree = Constant.load({
+        "Food": {"__classname__": "Food", "Meat": {"__classname__": "Meat"}},
+    })
+    assert tree.Subclasses() == [("Meat", tree.Meat)]
+
+    with raises(ValueError):
+        Constant.load({"Food": {"id": 1}})
+
+
+def test_deep_tree():
+    depth = sys.getrecursionlimit() + 100
+    tree = make_deep_tree(depth)
+    data = tree.dump()
+
+    loaded = Constant.load(data)
+    node = loaded
+    for _ in range(depth):
+        node = node.child
+    assert node.id == depth
+
+    buffer = io.StringIO()
+    tree.dump_stream(buffer)
+    assert buffer.getvalue().endswith("}}" * (depth + 1))
+
+    # the json parser is recursive
+    buffer = io.StringIO()
+    make_deep_tree(200).dump_stream(buffer)
+    buffer.seek(0)
+    node = Constant.load_stream(buffer)
+    for _ in range(200):
+        node = node.child
+    assert node.id == 200
+
+
+def test_cycle():
+    class Node(Constant):
+        class Child(Constant):
+            pass
+
+    Node.Child.parent = Node
+    with raises(ValueError):
+        Node.dump()
+    with raises(ValueError):
+        Node.dump_stream(io.StringIO())
+
+
+def test_stream():
+    buffer = io.StringIO()
+    Food.dump_stream(buffer)
+    data = json.loads(buffer.getvalue(), object_pairs_hook=OrderedDict)
+    assert data["Food"]["Fruit"]["Fruit"]["tags"] == ["sweet", ]
+    assert list(data["Food"]) == ["__classname__", "Fruit", "Meat"]
+
+    buffer.seek(0)
+    tree = Constant.load_stream(buffer)
+    assert tree.Fruit.Apple.colors == {"red", }
+    assert tree.Fruit.tags == ["sweet", ]
+    assert tree.Meat.id == 3
+    assert tree.dump() == Food.dump()
+
+    with raises(ValueError):
+        Constant.load_stream(io.StringIO(u'{"a": 1}'))
+
+
+def test_stream_file(tmpdir):
+    path = str(tmpdir.join("food.json"))
+    with io.open(path, "w", encoding="utf-8") as f:
+        Food.dump_stream(f)
+    with io.open(path, "r", encoding="utf-8") as f:
+        assert Constant.load_stream(f).dump() == Food.dump()
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from constant2 import Constant
+
+
+class Fruit(Constant):
+    id = None
+    tags = list()
+
+    def describe(self):
+        return "fruit %s" % self.id
+
+    @staticmethod
+    def kind():
+        return "fruit"
+
+
+class Food(Constant):
+    class Fruit(Constant):
+        class Apple(Fruit):
+            id = 1
+            tags = ["red", ]
+
+        class Banana(Fruit):
+            id = 2
+            weight = 0.5
+
+    class Meat(Constant):
+        id = 3
+
+
+Food.Fruit.Apple.similar = Food.Fruit.Banana
+
+
+def test_snapshot_restore(tmpdir):
+    path = str(tmpdir.join("food.snapshot"))
+    assert Constant.Restore(path) is None
+
+    Food.Fruit.GetFirst("id", 2)  # build an index
+    Food.Snapshot(path, source="v1")
+    assert Constant.Restore(path, source="v2") is None
+
+    food = Constant.Restore(path, source="v1")
+    assert food is not Food
+    assert food.__name__ == "Food"
+    assert food.dump() == Food.dump()
+
+    apple = food.Lookup("Fruit.Apple")
+    assert apple.tags == ["red", ]
+    assert issubclass(apple, Fruit)
+    assert apple.similar is food.Fruit.Banana
+    assert apple.kind() == "fruit"
+    assert food.Fruit.GetFirst("id", 2) is food.Fruit.Banana
+    assert food.Fruit.GetFirst("weight", 0.5) is food.Fruit.Banana
+    assert food.Fruit.Where(id__in=[1, 2]).all() == [
+        food.Fruit.Apple, food.Fruit.Banana,
+    ]
+
+    # restored tree works as usual
+    instance = food()
+    assert instance.Fruit.Apple.describe() == "fruit 1"
+    food.Fruit.Apple.id = 4
+    assert food.Fruit.GetFirst("id", 4) is food.Fruit.Apple
+    assert Food.Fruit.Apple.id == 1
+
+
+def test_snapshot_frozen_tree(tmpdir):
+    path = str(tmpdir.join("frozen.snapshot"))
+    leaves = dict(
+        ("Leaf%s" % i, type(str("Leaf%s" % i), (Constant,), {"id": i}))
+        for i in range(10)
+    )
+    tree = type(str("Tree"), (Constant,), leaves).Freeze()
+    tree.Snapshot(path)
+
+    restored = Constant.Restore(path)
+    assert restored.dump() == tree.dump()
+    assert restored.GetFirst("id", 3) is restored.Leaf3
+    with pytest.raises(AttributeError):
+        restored.Leaf3.id = 4
+
+
+def make_tree():
+    leaves = dict(
+        ("Leaf%s" % i, type(
+            str("Leaf%s" % i), (Constant,), {"id": i, "group": i % 3}))
+        for i in range(10)
+    )
+    return type(str("Tree"), (Constant,), leaves)
+
+
+def test_snapshot_after_group_by(tmpdir):
+    path = str(tmpdir.join("tree.snapshot"))
+    tree = make_tree()
+    tree.GroupBy("group")
+    tree.Aggregate("id", "sum", by="group")
+    tree.Aggregate("id", lambda values: len(values))
+    tree.ToColumns()
+    tree.GetFirst("id", 3)
+    tree.Snapshot(path)
+
+    restored = Constant.Restore(path)
+    assert restored.GetFirst("id", 3) is restored.Leaf3
+    assert restored.GroupBy("group")[1] == (
+        restored.Leaf1, restored.Leaf4, restored.Leaf7)
+
+
+def test_failed_snapshot_removes_tmp_file(tmpdir, monkeypatch):
+    from constant2 import _snapshot
+
+    def dump(*args, **kwargs):
+        raise IOError("disk full")
+
+    path = str(tmpdir.join("tree.snapshot"))
+    tree = make_tree()
+    monkeypatch.setattr(_snapshot.pickle, "dump", dump)
+    with pytest.raises(IOError):
+        tree.Snapshot(path)
+    assert tmpdir.listdir() == []
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+
+
+def make_tasks():
+    class Tasks(Constant):
+        class Deploy(Constant):
+            priority = 3
+
+        class Build(Constant):
+            priority = 5
+
+        class Lint(Constant):
+            priority = 1
+
+        class Test(Constant):
+            priority = 4
+
+        class Docs(Constant):
+            priority = 2
+
+    return Tasks
+
+
+def names(pairs):
+    return [attr for attr, _ in pairs]
+
+
+def test_Subclasses_cached():
+    Tasks = make_tasks()
+    assert names(Tasks.Subclasses()) == \
+        ["Build", "Deploy", "Docs", "Lint", "Test"]
+    assert names(Tasks.Subclasses(sort_by="priority", reverse=True)) == \
+        ["Build", "Test", "Deploy", "Docs", "Lint"]
+    assert ("subclasses", "priority", True) in Tasks.__cache__
+
+    # returned list is a copy
+    Tasks.Subclasses(sort_by="priority").pop()
+    assert len(Tasks.Subclasses(sort_by="priority")) == 5
+
+    # changing a sort key or adding a child invalidates the view
+    Tasks.Lint.priority = 10
+    assert names(Tasks.Subclasses(sort_by="priority", reverse=True))[0] == \
+        "Lint"
+
+    class Release(Constant):
+        priority = 0
+
+    Tasks.Release = Release
+    assert names(Tasks.Subclasses(sort_by="priority"))[0] == "Release"
+
+    del Tasks.Release
+    assert "Release" not in names(Tasks.Subclasses(sort_by="priority"))
+
+
+def test_IterSubclasses():
+    Tasks = make_tasks()
+
+    # not cached, selected by heap
+    assert names(Tasks.IterSubclasses(
+        sort_by="priority", reverse=True, limit=2)) == ["Build", "Test"]
+    assert names(Tasks.IterSubclasses(
+        sort_by="priority", offset=1, limit=2)) == ["Docs", "Deploy"]
+    assert ("subclasses", "priority", False) not in Tasks.__cache__
+
+    # same result from the cached view
+    Tasks.Subclasses(sort_by="priority")
+    assert names(Tasks.IterSubclasses(
+        sort_by="priority", offset=1, limit=2)) == ["Docs", "Deploy"]
+    assert names(Tasks.IterSubclasses(sort_by="priority", offset=3)) == \
+        ["Test", "Build"]
+    assert names(Tasks.IterSubclasses(limit=0)) == []
+    assert names(Tasks.IterSubclasses(offset=10, limit=2)) == []
+
+    tasks = Tasks()
+    pairs = list(tasks.iter_subclasses(sort_by="priority", limit=1))
+    assert pairs == [("Lint", tasks.Lint)]
+
+    with raises(ValueError):
+        Tasks.IterSubclasses(offset=-1)
+    with raises(ValueError):
+        Tasks.IterSubclasses(limit=-1)
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import threading
+
+import pytest
+from constant2 import Constant
+from constant2._index import get_cache, get_index
+
+
+def make_entity(n):
+    attrs = dict()
+    for i in range(n):
+        name = str("E%s" % i)
+        attrs[name] = type(name, (Constant,), {"id": i, "group": i % 4})
+    return type(str("Entity"), (Constant,), attrs)
+
+
+def run_threads(n_thread, target):
+    threads = [threading.Thread(target=target) for _ in range(n_thread)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_creation_index_is_unique():
+    Entity = make_entity(2)
+    indexes = list()
+
+    def create():
+        for _ in range(200):
+            indexes.append(Entity.E0().__creation_index__)
+
+    run_threads(32, create)
+    assert len(set(indexes)) == len(indexes) == 32 * 200
+
+
+def test_concurrent_lookup():
+    Entity = make_entity(200)
+    errors = list()
+
+    def lookup():
+        for i in range(200):
+            if Entity.GetFirst("id", i) is not getattr(Entity, "E%s" % i):
+                errors.append(i)
+            if len(Entity.GetAll("group", i % 4)) != 50:
+                errors.append(i)
+
+    run_threads(32, lookup)
+    assert errors == []
+
+
+def test_index_built_once():
+    Entity = make_entity(50)
+    indexes = list()
+    run_threads(32, lambda: indexes.append(get_index(Entity, "hash", "id")))
+    assert len(set(map(id, indexes))) == 1
+
+
+def test_stale_cache_is_not_seen():
+    Entity = make_entity(3)
+    cache = get_cache(Entity)
+    Entity.GetFirst("id", 1)
+    Entity.E1.id = 10
+    # value computed from the old tree goes to the old dict
+    assert get_cache(Entity) is not cache
+    assert Entity.GetFirst("id", 10) is Entity.E1
+    assert Entity.GetFirst("id", 1) is None
+
+
+@pytest.mark.skipif(
+    sys.version_info[0] < 3,
+    reason="sys.setswitchinterval and threading.Barrier are python3 only")
+def test_lazy_load_materialized_once():
+    data = make_entity(20).dump()
+    # switch thread often, so the threads do race
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        _access_lazy_loaded(data)
+    finally:
+        sys.setswitchinterval(interval)
+
+
+def _access_lazy_loaded(data):
+    for _ in range(20):
+        Entity = Constant.load(data, lazy=True)
+        barrier = threading.Barrier(16)
+        subclasses, errors = list(), list()
+
+        def access():
+            barrier.wait()
+            try:
+                for i in range(20):
+                    subclasses.append(getattr(Entity, "E%s" % i))
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+
+        run_threads(16, access)
+        assert errors == []
+        assert len(set(map(id, subclasses))) == 20
+        assert Entity.E3.id == 3
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])
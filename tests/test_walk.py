@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from pytest import raises
+from constant2 import Constant
+
+
+class Food(Constant):
+    class Fruit(Constant):
+        class Apple(Constant):
+            class RedApple(Constant):
+                pass
+
+            class GreenApple(Constant):
+                pass
+
+        class Banana(Constant):
+            pass
+
+    class Meat(Constant):
+        class Beef(Constant):
+            pass
+
+
+def test_Walk():
+    assert [path for path, _ in Food.Walk()] == [
+        "Fruit",
+        "Fruit.Apple",
+        "Fruit.Apple.GreenApple",
+        "Fruit.Apple.RedApple",
+        "Fruit.Banana",
+        "Meat",
+        "Meat.Beef",
+    ]
+    assert [path for path, _ in Food.Walk(order="bfs")] == [
+        "Fruit",
+        "Meat",
+        "Fruit.Apple",
+        "Fruit.Banana",
+        "Meat.Beef",
+        "Fruit.Apple.GreenApple",
+        "Fruit.Apple.RedApple",
+    ]
+    assert dict(Food.Walk())["Fruit.Apple"] is Food.Fruit.Apple
+    assert list(Food.Meat.Beef.Walk()) == []
+    with raises(ValueError):
+        Food.Walk(order="random")
+
+
+def test_Walk_cycle():
+    class Node(Constant):
+        class Child(Constant):
+            pass
+
+    Node.Child.Parent = Node
+    assert list(Node.Walk()) == [("Child", Node.Child)]
+    assert list(Node.Walk(order="bfs")) == [("Child", Node.Child)]
+
+
+def test_Lookup():
+    assert Food.Lookup("Fruit.Apple.RedApple") is Food.Fruit.Apple.RedApple
+    assert Food.Lookup("Meat") is Food.Meat
+    assert Food.Lookup("Fruit.Kiwi") is None
+    assert Food.Fruit.Lookup("Apple.GreenApple") is Food.Fruit.Apple.GreenApple
+
+
+def test_IterPrefix():
+    assert [path for path, _ in Food.IterPrefix("Fruit.Apple")] == [
+        "Fruit.Apple",
+        "Fruit.Apple.GreenApple",
+        "Fruit.Apple.RedApple",
+    ]
+    assert len(list(Food.IterPrefix(""))) == 7
+    assert list(Food.IterPrefix("Fruit.App")) == []
+
+
+def test_invalidate():
+    class Tree(Constant):
+        class Branch(Constant):
+            class Leaf(Constant):
+                pass
+
+    assert Tree.Lookup("Branch.Leaf") is Tree.Branch.Leaf
+
+    class Bud(Constant):
+        pass
+
+    Tree.Branch.Bud = Bud
+    assert Tree.Lookup("Branch.Bud") is Bud
+
+    del Tree.Branch.Leaf
+    assert Tree.Lookup("Branch.Leaf") is None
+
+
+if __name__ == "__main__":
+    import os
+
+    basename = os.path.basename(__file__)
+    pytest.main([basename, "-s", "--tb=native"])